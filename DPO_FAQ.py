@@ -1,22 +1,31 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-from pathlib import Path
-import yaml
-from datetime import datetime
-import re
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from faq import extract_faq
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Словарь с CSS/XPath-селекторами для извлечения данных со страницы
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.page__content-title"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']"),
     "section_titles": (By.CSS_SELECTOR, "h2.page_faq__item-title"),
-    "section_content": (By.XPATH, "./following-sibling::div[contains(@class, 'page_faq__item-desc')][1]//*[self::p or self::li]")
+    "section_desc": (By.CSS_SELECTOR, "div.page_faq__item-desc"),
+    "section_toggle": (By.CSS_SELECTOR, "div.page_faq__item-toggle"),
+    "section_content": (By.CSS_SELECTOR, "div.page_faq__item-desc p, div.page_faq__item-desc li")
+}
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["FAQ", "Образование"],
+    "tags": ["ДПО", "вопросы и ответы", "дистанционное обучение"],
+    "description_fallback": SELECTORS["section_content"],
+    "description_join": True,
 }
 
 # Функция для настройки и получения веб-драйвера Chrome
@@ -28,82 +37,24 @@ def get_driver():
     chrome_options.add_argument("--no-sandbox")  # Отключение песочницы для совместимости
     chrome_options.add_argument("--window-size=1920,1080")  # Установка размера окна браузера
     # Инициализация драйвера Chrome с заданными опциями
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            section_elements = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located(SELECTORS["section_content"])
-            )
-            intro_text = " ".join([elem.text.strip() for elem in section_elements if elem.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["FAQ", "Образование"]
-    metadata["tags"] = ["ДПО", "вопросы и ответы", "дистанционное обучение"]
-
-    return metadata
-
-# Функция для парсинга одной секции страницы
-def parse_section(driver, section_element):
-    content = []
-    try:
-        # Извлечение текста заголовка секции
-        title = section_element.text.strip()
-        # Удаление текста вложенного элемента toggle, если он присутствует
-        toggle_div = section_element.find_elements(By.CSS_SELECTOR, "div.page_faq__item-toggle")
-        if toggle_div:
-            toggle_text = toggle_div[0].text.strip()
-            title = title.replace(toggle_text, "").strip()
-        print(f"Найден заголовок секции: {title}")
-
-        # Извлечение контента секции (параграфы <p> и элементы списка <li>)
-        content_elements = section_element.find_elements(*SELECTORS["section_content"])
-        for element in content_elements:
-            element_text = element.get_attribute('innerText').strip()
-            if element_text:
-                # Добавление символа • для элементов списка
-                if element.tag_name == "li":
-                    content.append(f"• {element_text}")
-                else:
-                    content.append(element_text)
-        print(f"Найден контент для секции '{title}': {content}")
-
-        # Возвращаем словарь с заголовком и контентом секции
-        return {"title": title, "content": content}
-    except Exception as e:
-        print(f"Ошибка при парсинге секции: {str(e)}")
-        return None
+    return read_metadata(driver, url, **METADATA)
 
 # Функция для парсинга всей страницы
 def parse_page(driver, url):
     # Загрузка страницы по указанному URL
-    driver.get(url)
+    fetch_page(driver, url)
     try:
         # Ожидание загрузки основного заголовка (максимум 15 секунд)
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -115,7 +66,7 @@ def parse_page(driver, url):
 
     # Извлечение основного заголовка страницы
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -125,13 +76,20 @@ def parse_page(driver, url):
 
     # Парсинг всех секций страницы
     try:
-        section_elements = WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["section_titles"])
         )
-        for section_element in section_elements:
-            section = parse_section(driver, section_element)
-            if section:
-                result.append(("section", section))
+        # Все вопросы и ответы извлекаются одним обращением к браузеру
+        sections = extract_faq(
+            driver,
+            SELECTORS["section_titles"][1],
+            SELECTORS["section_desc"][1],
+            parts_selector="p, li",
+            strip_selector=SELECTORS["section_toggle"][1],
+        )
+        for section in sections:
+            print(f"Найден заголовок секции: {section['title']}")
+            result.append(("section", section))
     except Exception as e:
         print(f"Ошибка при парсинге секций: {str(e)}")
 
@@ -140,27 +98,13 @@ def parse_page(driver, url):
 
 # Функция для сохранения данных в Markdown-файл
 def save_to_markdown(data, url, metadata, filename="DPO_FAQ.md"):
-    content = []
-
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    for item in data:
-        if item[0] == "title":
-            content.append(f"# {item[1]}")
-            content.append(f"[Перейти к странице]({url})")
-        elif item[0] == "section":
-            section = item[1]
-            content.append(f"## {section['title']}")
-            content.extend([line for line in section['content'] if line.strip()])
-
-    # Объединяем с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    # Сохранение результата в Markdown-файл
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(final_content)
+    with MarkdownWriter(output_root() / filename) as md:
+        md.front_matter(metadata)
+        for item in data:
+            if item[0] == "title":
+                md.title(item[1], url)
+            elif item[0] == "section":
+                md.section(item[1]['title'], item[1]['content'])
 
     print(f"Контент записан в файл: {filename}")
     return filename
@@ -168,18 +112,28 @@ def save_to_markdown(data, url, metadata, filename="DPO_FAQ.md"):
 # Основной блок программы
 if __name__ == "__main__":
     # URL страницы для парсинга
-    TARGET_URL = "https://academydpo.org/faq"
+    TARGET_URL = site_url("https://academydpo.org/faq", __file__)
 
     # Инициализация драйвера
     driver = get_driver()
     try:
         # Парсинг страницы и получение данных
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
-        # Сохранение данных в Markdown-файл
-        output_file = save_to_markdown(parsed_data, page_url, metadata)
-        print(f"Файл {output_file} успешно сохранен!")
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Сохранение данных в Markdown-файл (только для изменившихся страниц)
+        if store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_FAQ.md"):
+            output_file = save_to_markdown(parsed_data, page_url, metadata)
+            print(f"Файл {output_file} успешно сохранен!")
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         # Закрытие драйвера для освобождения ресурсов
         driver.quit()
\ No newline at end of file
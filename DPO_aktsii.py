@@ -1,16 +1,14 @@
 # Импорт библиотек для работы с Selenium, управления ChromeDriver и работы с файлами
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import time
-from pathlib import Path
-import yaml
-from datetime import datetime
-import re
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC, Service, ChromeDriverManager
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 
 # 🔧 Функция настройки веб-драйвера в headless-режиме
@@ -20,15 +18,17 @@ def get_driver():
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 
 # 📄 Словарь селекторов для парсинга страницы акций
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.stock__title"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']"),
     "intro_paragraph": (By.XPATH, "(//div[contains(@class, 'stock__desc')])[1]//p"),
     "section_titles": (By.CSS_SELECTOR, "h2.stock__block-title"),
     "toggle_button": (By.XPATH,
@@ -40,41 +40,18 @@ SELECTORS = {
     "final_paragraph": (By.XPATH, "(//div[contains(@class, 'stock__desc')])[last()]//p")
 }
 
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Акции", "Образование"],
+    "tags": ["ДПО", "дистанционное обучение", "акции"],
+    "description_fallback": SELECTORS["intro_paragraph"],
+    "description_join": True,
+}
+
 
 # 🧠 Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            intro_elements = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located(SELECTORS["intro_paragraph"])
-            )
-            intro_text = " ".join([elem.text.strip() for elem in intro_elements if elem.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Акции", "Образование"]
-    metadata["tags"] = ["ДПО", "дистанционное обучение", "акции"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 
 # 🧠 Функция парсинга одной секции акции
@@ -85,13 +62,13 @@ def parse_section(driver, section_element):
         print(f"Найден заголовок секции: {title}")
 
         try:
-            toggle_button = WebDriverWait(driver, 10).until(
+            toggle_button = WebDriverWait(driver, wait_timeout(10)).until(
                 EC.element_to_be_clickable(section_element.find_element(*SELECTORS["toggle_button"]))
             )
             print(f"Найдена кнопка для секции: {title}")
             driver.execute_script("arguments[0].click();", toggle_button)
             print(f"Клик по кнопке для секции: {title}")
-            desc_container = WebDriverWait(driver, 10).until(
+            desc_container = WebDriverWait(driver, wait_timeout(10)).until(
                 EC.visibility_of(section_element.find_element(*SELECTORS["section_desc_container"]))
             )
             print(f"Контейнер описания виден для секции: {title}")
@@ -109,7 +86,7 @@ def parse_section(driver, section_element):
             print(f"Нет информации stock__block-info в секции {title}: {str(e)}")
 
         try:
-            desc_elements = WebDriverWait(driver, 10).until(
+            desc_elements = WebDriverWait(driver, wait_timeout(10)).until(
                 EC.visibility_of_all_elements_located(section_element.find_elements(*SELECTORS["section_desc"]))
             )
             for elem in desc_elements:
@@ -140,9 +117,9 @@ def parse_section(driver, section_element):
 
 # 🧠 Функция парсинга страницы
 def parse_page(driver, url):
-    driver.get(url)
+    fetch_page(driver, url)
     try:
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -153,7 +130,7 @@ def parse_page(driver, url):
     result = []
 
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -162,7 +139,7 @@ def parse_page(driver, url):
         print(f"Ошибка при парсинге основного заголовка: {str(e)}")
 
     try:
-        intro_elements = WebDriverWait(driver, 15).until(
+        intro_elements = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["intro_paragraph"])
         )
         intro_text = [elem.text.strip() for elem in intro_elements if elem.text.strip()]
@@ -173,7 +150,7 @@ def parse_page(driver, url):
         print(f"Ошибка при парсинге вводного параграфа: {str(e)}")
 
     try:
-        section_elements = WebDriverWait(driver, 15).until(
+        section_elements = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["section_titles"])
         )
         for section_element in section_elements:
@@ -184,7 +161,7 @@ def parse_page(driver, url):
         print(f"Ошибка при парсинге секций: {str(e)}")
 
     try:
-        final_elements = WebDriverWait(driver, 15).until(
+        final_elements = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["final_paragraph"])
         )
         final_text = [elem.text.strip() for elem in final_elements if elem.text.strip()]
@@ -204,43 +181,48 @@ def parse_page(driver, url):
 
 # 💾 Функция сохранения результатов в Markdown-файл
 def save_to_txt(data, metadata, filename="DPO_aktsii.md"):
-    save_path = Path.cwd() / filename
-    content = []
-
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    for item in data:
-        if item[0] == "title":
-            content.append(f"# {item[1]}")
-            content.append(f"[Открыть страницу]({metadata['url']})")
-        elif item[0] == "content":
-            content.extend([line.strip() for line in item[1] if line.strip()])
-        elif item[0] == "section":
-            section = item[1]
-            content.append(f"## {section['title']}")
-            content.extend([line.strip() for line in section['content'] if line.strip()])
-
-    # Объединяем с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    with open(save_path, 'w', encoding='utf-8') as f:
-        f.write(final_content)
+    save_path = output_root() / filename
+
+    with MarkdownWriter(save_path) as md:
+        md.front_matter(metadata)
+        for item in data:
+            if item[0] == "title":
+                md.title(item[1], metadata['url'])
+            elif item[0] == "content":
+                md.lines(line.strip() for line in item[1])
+            elif item[0] == "section":
+                section = item[1]
+                md.section(section['title'], (line.strip() for line in section['content']))
 
     print(f"✅ Результаты сохранены в файл: {save_path}")
     return save_path
 
 
+def render_record(record):
+    """Перерисовывает Markdown по записи страницы из хранилища (режим --render-only)."""
+    return save_to_txt(record["data"], record["metadata"])
+
+
 # 🚀 Запуск парсера
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/aktsii"
+    TARGET_URL = site_url("https://academydpo.org/aktsii", __file__)
 
     driver = get_driver()
     try:
         parsed_data, metadata = parse_page(driver, TARGET_URL)
-        save_to_txt(parsed_data, metadata)
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if store_page(__file__, parsed_data, TARGET_URL, metadata, output_root() / "DPO_aktsii.md"):
+            save_to_txt(parsed_data, metadata)
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         driver.quit()
\ No newline at end of file
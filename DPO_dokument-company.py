@@ -1,21 +1,29 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from pathlib import Path
-import yaml
-from datetime import datetime
-import re
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from documents import document_items
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Словарь селекторов
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.page__content-title"),
-    "meta_title": (By.TAG_NAME, "title"),  # Для извлечения <title>
-    "meta_description": (By.XPATH, "//meta[@name='description']"),  # Для извлечения meta description
     "document_list": (By.CSS_SELECTOR, "div.page__content-desc > ol > li > a")
 }
 
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Документы", "Образование"],
+    "tags": ["ДПО", "документы компании", "дистанционное обучение"],
+    "description_fallback": SELECTORS["document_list"],
+    "description_join": True,
+}
+
 # Функция для настройки и получения веб-драйвера Chrome
 def get_driver():
     chrome_options = Options()
@@ -23,49 +31,22 @@ def get_driver():
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            document_elements = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located(SELECTORS["document_list"])
-            )
-            intro_text = " ".join([elem.text.strip() for elem in document_elements if elem.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Документы", "Образование"]
-    metadata["tags"] = ["ДПО", "документы компании", "дистанционное обучение"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 # Функция для парсинга страницы
 def parse_page(driver, url):
-    driver.get(url)
+    fetch_page(driver, url)
     try:
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -77,7 +58,7 @@ def parse_page(driver, url):
 
     # Извлечение основного заголовка
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -87,7 +68,7 @@ def parse_page(driver, url):
 
     # Извлечение списка документов
     try:
-        document_links = WebDriverWait(driver, 15).until(
+        document_links = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["document_list"])
         )
         documents = []
@@ -105,37 +86,39 @@ def parse_page(driver, url):
 
 # Функция для сохранения данных в Markdown-файл
 def save_to_markdown(data, url, metadata, filename="DPO_dokument-company.md"):
-    content = []
-
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    for item in data:
-        if item[0] == "title":
-            content.append(f"# {item[1]}")
-            content.append(f"[Перейти к странице]({url})")
-        elif item[0] == "content":
-            content.append("## Список документов")
-            content.extend([f"- {doc}" for doc in item[1] if doc.strip()])
-
-    # Объединяем с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(final_content)
+    with MarkdownWriter(output_root() / filename) as md:
+        md.front_matter(metadata)
+        for item in data:
+            if item[0] == "title":
+                md.title(item[1], url)
+            elif item[0] == "content":
+                md.heading("Список документов", 2)
+                md.items(item[1])
     print(f"Контент записан в файл: {filename}")
     return filename
 
 # Основной блок программы
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/dokument-company"
+    TARGET_URL = site_url("https://academydpo.org/dokument-company", __file__)
     driver = get_driver()
     try:
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
-        output_file = save_to_markdown(parsed_data, page_url, metadata)
-        print(f"Файл {output_file} успешно сохранен!")
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Тексты связанных PDF прикладываются к записи страницы
+        parsed_data += document_items(parsed_data)
+        # Markdown перерисовывается только для изменившихся страниц
+        if store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_dokument-company.md"):
+            output_file = save_to_markdown(parsed_data, page_url, metadata)
+            print(f"Файл {output_file} успешно сохранен!")
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         driver.quit()
\ No newline at end of file
@@ -1,22 +1,29 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from pathlib import Path
-import yaml
-from datetime import datetime
-import re
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Словарь с CSS-селекторами для извлечения данных
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.page__content-title"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']"),
     "content_paragraphs": (By.CSS_SELECTOR, "div.page__content-desc p")
 }
 
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Финансово-хозяйственная деятельность", "Образование"],
+    "tags": ["ДПО", "финансы", "дистанционное обучение"],
+    "description_fallback": SELECTORS["content_paragraphs"],
+    "description_join": True,
+}
+
 # Функция для настройки и получения веб-драйвера Chrome
 def get_driver():
     # Настройка опций для браузера Chrome
@@ -26,51 +33,24 @@ def get_driver():
     chrome_options.add_argument("--no-sandbox")  # Отключение песочницы для совместимости
     chrome_options.add_argument("--window-size=1920,1080")  # Установка размера окна браузера
     # Инициализация драйвера Chrome
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            content_elements = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located(SELECTORS["content_paragraphs"])
-            )
-            intro_text = " ".join([elem.text.strip() for elem in content_elements if elem.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Финансово-хозяйственная деятельность", "Образование"]
-    metadata["tags"] = ["ДПО", "финансы", "дистанционное обучение"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 # Функция для парсинга страницы
 def parse_page(driver, url):
     # Загрузка страницы по указанному URL
-    driver.get(url)
+    fetch_page(driver, url)
     try:
         # Ожидание загрузки основного заголовка (15 секунд)
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -82,7 +62,7 @@ def parse_page(driver, url):
 
     # Извлечение основного заголовка
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -92,7 +72,7 @@ def parse_page(driver, url):
 
     # Извлечение параграфов контента
     try:
-        content_elements = WebDriverWait(driver, 15).until(
+        content_elements = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["content_paragraphs"])
         )
         content_text = [elem.text.strip() for elem in content_elements if elem.text.strip()]
@@ -107,27 +87,15 @@ def parse_page(driver, url):
 
 # Функция для сохранения данных в Markdown-файл
 def save_to_markdown(data, url, metadata, filename="DPO_finhozdeyat.md"):
-    content = []
-
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    for item in data:
-        if item[0] == "title":
-            # Добавление заголовка в формате Markdown и ссылки на страницу
-            content.append(f"# {item[1]}")
-            content.append(f"[Перейти к странице]({url})")
-        elif item[0] == "content":
-            # Добавление параграфов контента
-            content.extend([line for line in item[1] if line.strip()])
-
-    # Объединяем с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    # Сохранение в файл с кодировкой UTF-8
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(final_content)
+    with MarkdownWriter(output_root() / filename) as md:
+        md.front_matter(metadata)
+        for item in data:
+            if item[0] == "title":
+                # Заголовок и ссылка на страницу
+                md.title(item[1], url)
+            elif item[0] == "content":
+                # Параграфы контента
+                md.lines(item[1])
 
     print(f"Контент записан в файл: {filename}")
     return filename
@@ -135,18 +103,28 @@ def save_to_markdown(data, url, metadata, filename="DPO_finhozdeyat.md"):
 # Основной блок программы
 if __name__ == "__main__":
     # URL страницы для парсинга
-    TARGET_URL = "https://academydpo.org/finansovo-hozyajstvennaya-deyatelnost"
+    TARGET_URL = site_url("https://academydpo.org/finansovo-hozyajstvennaya-deyatelnost", __file__)
 
     # Инициализация драйвера
     driver = get_driver()
     try:
         # Парсинг страницы и получение данных
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
-        # Сохранение данных в Markdown-файл
-        output_file = save_to_markdown(parsed_data, page_url, metadata)
-        print(f"Файл {output_file} успешно сохранен!")
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Сохранение данных в Markdown-файл (только для изменившихся страниц)
+        if store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_finhozdeyat.md"):
+            output_file = save_to_markdown(parsed_data, page_url, metadata)
+            print(f"Файл {output_file} успешно сохранен!")
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         # Закрытие драйвера для освобождения ресурсов
         driver.quit()
\ No newline at end of file
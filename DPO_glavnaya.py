@@ -1,29 +1,16 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from lazy_selenium import webdriver, Options, By, Service, ChromeDriverManager
 import time
 import logging
-from pathlib import Path
 import sys
-import yaml
-from datetime import datetime
-import re
-
-# Настройка кодировки консоли на UTF-8
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
-
-# Настройка логирования только в консоль
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from console import setup_console
+from retry import fetch_page, EXIT_RETRY
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Функция настройки веб-драйвера
 def get_driver():
@@ -34,7 +21,11 @@ def get_driver():
         chrome_options.add_argument('--disable-gpu')  # Отключение GPU
         chrome_options.add_argument('--no-sandbox')  # Отключение песочницы
         chrome_options.add_argument('--window-size=1920,1080')  # Размер окна
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        driver = open_tab()
+        if driver is None:
+            apply_browser_profile(chrome_options)
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+            driver = attach_backend(driver)
         logging.info("Веб-драйвер успешно создан")
         return driver
     except Exception as e:
@@ -46,12 +37,6 @@ elements_to_parse = {
     "page_title": [
         {"type": "css", "value": "section.desc_page h2.desc_page-title"},
     ],
-    "meta_title": [
-        {"type": "css", "value": "title"},
-    ],
-    "meta_description": [
-        {"type": "xpath", "value": "//meta[@name='description']"},
-    ],
     "page_text": [
         {"type": "css", "value": "section.desc_page div.desc_page-text p"},
     ],
@@ -89,52 +74,21 @@ elements_to_parse = {
     },
 }
 
+# Метаданные страницы: title и description берутся из <head>, текст страницы — запасной вариант для description
+METADATA = {
+    "categories": ["Главная страница", "Образование"],
+    "tags": ["ДПО", "дистанционное обучение", "курсы"],
+    "description_fallback": [(By.CSS_SELECTOR, selector["value"]) for selector in elements_to_parse["page_text"] if selector["type"] == "css"],
+    "description_join": True,
+}
+
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_elements = []
-        for selector in elements_to_parse["meta_title"]:
-            if selector["type"] == "css":
-                elements = driver.find_elements(By.CSS_SELECTOR, selector["value"])
-                title_elements.extend([el.get_attribute("innerText").strip() for el in elements if el.get_attribute("innerText").strip()])
-        metadata["title"] = title_elements[0] if title_elements else "Без названия"
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении заголовка страницы: {e}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_elements = []
-        for selector in elements_to_parse["meta_description"]:
-            if selector["type"] == "xpath":
-                elements = driver.find_elements(By.XPATH, selector["value"])
-                desc_elements.extend([el.get_attribute("content").strip() for el in elements if el.get_attribute("content").strip()])
-        metadata["description"] = desc_elements[0] if desc_elements else ""
-        if not metadata["description"]:
-            raise Exception("Meta description отсутствует")
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении meta description: {e}")
-        try:
-            text_elements = []
-            for selector in elements_to_parse["page_text"]:
-                if selector["type"] == "css":
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector["value"])
-                    text_elements.extend([el.text.strip() for el in elements if el.text.strip()])
-            intro_text = " ".join(text_elements)
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Главная страница", "Образование"]
-    metadata["tags"] = ["ДПО", "дистанционное обучение", "курсы"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 # Функция парсинга веб-страницы
 def parse_website(url, driver):
-    """Парсинг веб-страницы."""
+    """Парсинг веб-страницы. Возвращает None при критической ошибке."""
     results = {
         "url": url,
         "metadata": {},
@@ -148,7 +102,7 @@ def parse_website(url, driver):
     }
 
     try:
-        driver.get(url)
+        fetch_page(driver, url)
         time.sleep(2)  # Ожидание загрузки
         logging.info(f"Страница загружена: {url}")
 
@@ -333,66 +287,45 @@ def parse_website(url, driver):
         return results
     except Exception as e:
         logging.error(f"Критическая ошибка при парсинге {url}: {e}")
-        return results
+        # Частично заполненный результат не публикуется: оркестратор повторит запуск
+        return None
+
+# Разделы-списки страницы в порядке вывода: (ключ результатов, заголовок)
+LIST_SECTIONS = (
+    ("links", "Ссылки"),
+    ("education_features", "Особенности обучения"),
+    ("learning_forms", "Формы обучения"),
+    ("medical_education", "Медицинское образование"),
+    ("construction_courses", "Строительные курсы"),
+    ("special_courses", "Специальные курсы"),
+)
 
 # Функция сохранения результатов в Markdown-файл
 def save_results_to_file(results, filename="DPO_glavnaya.md"):
     """Сохраняет результаты в Markdown-файл."""
     try:
-        save_path = Path(r"D:\python_work\DPO\DPO") / filename
-        with open(save_path, "w", encoding="utf-8") as f:
+        save_path = output_root() / filename
+        with MarkdownWriter(save_path) as md:
             for res in results:
-                # Формируем YAML-метаданные
-                yaml_metadata = yaml.dump(res["metadata"], allow_unicode=True, sort_keys=False)
-                f.write(f"---\n{yaml_metadata}---\n")
+                md.front_matter(res["metadata"])
 
                 # Заголовок страницы
-                f.write(f"# Страница: {res['url']}\n")
-                f.write(f"[Открыть страницу]({res['url']})\n")
-                f.write(f"{'='*80}\n")
+                md.heading(f"Страница: {res['url']}")
+                md.page_link(res['url'])
 
                 # Секции с заголовками и текстом
                 for section in res["sections"]:
-                    if section["title"]:
-                        f.write(f"## {section['title']}\n")
-                    if section["text"]:
-                        f.write(f"{section['text']}\n")
-
-                # Ссылки
-                if res["links"]:
-                    f.write("## Ссылки\n")
-                    for link in res["links"]:
-                        f.write(f"- [{link['text']}]({link['url']})\n")
-
-                # Особенности обучения
-                if res["education_features"]:
-                    f.write("## Особенности обучения\n")
-                    for item in res["education_features"]:
-                        f.write(f"- {item}\n")
-
-                # Формы обучения
-                if res["learning_forms"]:
-                    f.write("## Формы обучения\n")
-                    for item in res["learning_forms"]:
-                        f.write(f"- {item}\n")
-
-                # Медицинское образование
-                if res["medical_education"]:
-                    f.write("## Медицинское образование\n")
-                    for item in res["medical_education"]:
-                        f.write(f"- [{item['text']}]({item['url']})\n")
-
-                # Строительные курсы
-                if res["construction_courses"]:
-                    f.write("## Строительные курсы\n")
-                    for item in res["construction_courses"]:
-                        f.write(f"- [{item['text']}]({item['url']})\n")
-
-                # Специальные курсы
-                if res["special_courses"]:
-                    f.write("## Специальные курсы\n")
-                    for item in res["special_courses"]:
-                        f.write(f"- [{item['text']}]({item['url']})\n")
+                    md.section(section["title"], [section["text"]])
+
+                # Ссылки, списки и курсы — по разделам, пустые разделы пропускаются
+                for key, heading in LIST_SECTIONS:
+                    if res[key]:
+                        md.heading(heading, 2)
+                        for entry in res[key]:
+                            if isinstance(entry, dict):
+                                md.item(entry["text"], entry.get("url"))
+                            else:
+                                md.item(entry)
 
         logging.info(f"Результаты сохранены в файл: {save_path}")
         return save_path
@@ -400,13 +333,18 @@ def save_results_to_file(results, filename="DPO_glavnaya.md"):
         logging.error(f"Ошибка при сохранении файла {filename}: {e}")
         return None
 
+def render_record(record):
+    """Перерисовывает Markdown по записи страницы из хранилища (режим --render-only)."""
+    return save_results_to_file([{**dict(record["data"]), "metadata": record["metadata"]}])
+
 # Список URL-адресов для парсинга
 urls = [
-    "https://academydpo.org/",
+    site_url("https://academydpo.org/", __file__),
 ]
 
 # Основной блок выполнения программы
 if __name__ == "__main__":
+    setup_console()
     logging.info("Запуск скрипта DPO_glavnaya.py")
     driver = get_driver()
     if driver is None:
@@ -418,13 +356,27 @@ if __name__ == "__main__":
         try:
             logging.info(f"Парсинг страницы: {url}")
             data = parse_website(url, driver)
-            all_results.append(data)
+            if data is not None:
+                all_results.append(data)
         except Exception as e:
             logging.error(f"Ошибка при обработке {url}: {e}")
 
     driver.quit()
     logging.info("Веб-драйвер закрыт")
 
+    # Ни одна страница не получена — пустой файл не публикуется, оркестратор повторит запуск
+    if not all_results:
+        logging.error("Ошибка: не удалось получить контент со страницы")
+        sys.exit(EXIT_RETRY)
+
+    # Markdown перерисовывается только для изменившихся страниц
+    page_data = [(key, value) for res in all_results for key, value in res.items() if key != "metadata"]
+    page_metadata = all_results[0]["metadata"] if all_results else {}
+    apply_page_overrides(__file__, page_metadata)
+    if not store_page(__file__, page_data, urls[0], page_metadata, output_root() / "DPO_glavnaya.md"):
+        logging.info("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
+        sys.exit(0)
+
     saved_file = save_results_to_file(all_results)
     if saved_file:
         logging.info(f"Скрипт успешно завершен, файл создан: {saved_file}")
@@ -1,13 +1,14 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from pathlib import Path
-import yaml
-from datetime import datetime
-import re
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Функция для настройки и получения веб-драйвера Chrome
 def get_driver():
@@ -16,7 +17,11 @@ def get_driver():
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 # Словарь с CSS-селекторами для извлечения данных
@@ -27,51 +32,25 @@ SELECTORS = {
     "table_rows": (By.CSS_SELECTOR, "table.recvisit_table tbody tr"),
     "row_title": (By.CSS_SELECTOR, "td:nth-child(1)"),
     "row_data": (By.CSS_SELECTOR, "td:nth-child(2)"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']")
+}
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Контакты", "Образование"],
+    "tags": ["ДПО", "контакты", "дистанционное обучение"],
+    "description_fallback": SELECTORS["activity_text"],
 }
 
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            activity_text = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located(SELECTORS["activity_text"])
-            )
-            intro_text = activity_text.text.strip()
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Контакты", "Образование"]
-    metadata["tags"] = ["ДПО", "контакты", "дистанционное обучение"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 # Функция для парсинга страницы
 def parse_page(driver, url):
-    driver.get(url)
+    fetch_page(driver, url)
     try:
         # Ожидание загрузки таблицы (15 секунд)
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["table_rows"])
         )
     except Exception as e:
@@ -83,7 +62,7 @@ def parse_page(driver, url):
 
     # Извлечение информации об офисе
     try:
-        office_position = WebDriverWait(driver, 15).until(
+        office_position = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["office_position"])
         ).text.strip()
         result.append(("office_position", office_position))
@@ -92,7 +71,7 @@ def parse_page(driver, url):
         print(f"Ошибка при парсинге заголовка офиса: {str(e)}")
 
     try:
-        office_address = WebDriverWait(driver, 15).until(
+        office_address = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["office_address"])
         ).text.strip()
         result.append(("office_address", office_address))
@@ -102,7 +81,7 @@ def parse_page(driver, url):
 
     # Извлечение текста о деятельности
     try:
-        activity_text = WebDriverWait(driver, 15).until(
+        activity_text = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["activity_text"])
         ).text.strip()
         result.append(("activity_text", activity_text))
@@ -112,7 +91,7 @@ def parse_page(driver, url):
 
     # Парсинг таблицы
     try:
-        rows = WebDriverWait(driver, 15).until(
+        rows = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["table_rows"])
         )
         table_content = []
@@ -145,43 +124,42 @@ def parse_page(driver, url):
 
 # Функция для сохранения данных в Markdown-файл
 def save_to_markdown(data, url, metadata, filename="DPO_kontakty.md"):
-    content = []
-
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    content.append(f"# Контакты\n[Перейти к странице]({url})")
-
-    for item in data:
-        if item[0] == "office_position":
-            content.append(f"## {item[1]}")
-        elif item[0] == "office_address":
-            content.append(f"{item[1]}")
-        elif item[0] == "activity_text":
-            content.append(f"**{item[1]}**")
-        elif item[0] == "content":
-            content.append("## Реквизиты")
-            content.extend(item[1])
-
-    # Объединяем с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(final_content)
+    with MarkdownWriter(output_root() / filename) as md:
+        md.front_matter(metadata)
+        md.title("Контакты", url)
+        for item in data:
+            if item[0] == "office_position":
+                md.heading(item[1], 2)
+            elif item[0] == "office_address":
+                md.line(item[1])
+            elif item[0] == "activity_text":
+                md.line(f"**{item[1]}**")
+            elif item[0] == "content":
+                md.section("Реквизиты", item[1])
 
     print(f"Контент записан в файл: {filename}")
     return filename
 
 # Основной блок программы
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/kontakty"
+    TARGET_URL = site_url("https://academydpo.org/kontakty", __file__)
     driver = get_driver()
     try:
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
-        output_file = save_to_markdown(parsed_data, page_url, metadata)
-        print(f"Файл {output_file} успешно сохранен!")
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_kontakty.md"):
+            output_file = save_to_markdown(parsed_data, page_url, metadata)
+            print(f"Файл {output_file} успешно сохранен!")
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         driver.quit()
\ No newline at end of file
@@ -1,19 +1,19 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from pathlib import Path
-import yaml
-from datetime import datetime
-import re
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from faq import extract_faq
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Словарь селекторов для страницы MBA
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.category__title"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']"),
     "features_list": (By.CSS_SELECTOR, "ul"),
     "description_paragraphs": (By.CSS_SELECTOR, "div.category__info-body > p"),
     "course_subtitle": (By.CSS_SELECTOR, "h2.category__title"),
@@ -23,6 +23,17 @@ SELECTORS = {
     "faq_text": (By.CSS_SELECTOR, "div.faq_block_text")
 }
 
+# Единственное ожидание разбора: первый раздел программы (описание), если страница ещё дорисовывается
+SECTION_WAIT = 10
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["MBA", "Образование"],
+    "tags": ["ДПО", "MBA", "дистанционное обучение"],
+    "description_fallback": SELECTORS["description_paragraphs"],
+    "description_join": True,
+}
+
 # Функция для настройки и получения веб-драйвера Chrome
 def get_driver():
     chrome_options = Options()
@@ -30,49 +41,22 @@ def get_driver():
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            paragraphs = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located(SELECTORS["description_paragraphs"])
-            )
-            intro_text = " ".join([p.text.strip() for p in paragraphs if p.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["MBA", "Образование"]
-    metadata["tags"] = ["ДПО", "MBA", "дистанционное обучение"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 # Функция для парсинга страницы
 def parse_page(driver, url):
-    driver.get(url)
+    fetch_page(driver, url)
     try:
-        WebDriverWait(driver, 20).until(
+        WebDriverWait(driver, wait_timeout(20)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -80,30 +64,37 @@ def parse_page(driver, url):
         return [], url, {}
 
     metadata = extract_metadata(driver, url)
+    return extract_program(driver), url, metadata
+
+# Функция для извлечения контента уже загруженной страницы программы (используется и каталогом программ)
+def extract_program(driver):
+    # Одно ограниченное ожидание первого раздела, затем разделы ищутся без ожиданий:
+    # отсутствующий раздел не задерживает разбор на время таймаута
+    try:
+        WebDriverWait(driver, wait_timeout(SECTION_WAIT)).until(
+            EC.presence_of_element_located(SELECTORS["description_paragraphs"])
+        )
+    except Exception:
+        # Описания нет: разделы ищутся в уже загруженной части страницы
+        pass
     result = []
 
     # Извлечение основного заголовка
     try:
-        main_title = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located(SELECTORS["main_title"])
-        ).text.strip()
+        main_title = driver.find_element(*SELECTORS["main_title"]).text.strip()
         result.append(("title", main_title))
-        print(f"Основной заголовок: {main_title}")
     except Exception as e:
         print(f"Ошибка при парсинге заголовка: {str(e)}")
 
     # Извлечение списка особенностей
     try:
-        features = WebDriverWait(driver, 20).until(
-            EC.presence_of_all_elements_located(SELECTORS["features_list"])
-        )
+        features = driver.find_elements(*SELECTORS["features_list"])
         feature_texts = []
         for ul in features:
             li_elements = ul.find_elements(By.TAG_NAME, "li")
             feature_texts.extend([f"• {li.text.strip()}" for li in li_elements if li.text.strip()])
         if feature_texts:
             result.append(("features", feature_texts))
-            print(f"Особенности: {feature_texts}")
         else:
             print("Список особенностей пуст или не найден")
     except Exception as e:
@@ -111,13 +102,10 @@ def parse_page(driver, url):
 
     # Извлечение параграфов описания
     try:
-        paragraphs = WebDriverWait(driver, 20).until(
-            EC.presence_of_all_elements_located(SELECTORS["description_paragraphs"])
-        )
+        paragraphs = driver.find_elements(*SELECTORS["description_paragraphs"])
         paragraph_texts = [p.text.strip() for p in paragraphs if p.text.strip()]
         if paragraph_texts:
             result.append(("description", paragraph_texts))
-            print(f"Параграфы описания: {paragraph_texts}")
         else:
             print("Параграфы описания пусты или не найдены")
     except Exception as e:
@@ -125,22 +113,15 @@ def parse_page(driver, url):
 
     # Извлечение подзаголовка курса
     try:
-        course_subtitle = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located(SELECTORS["course_subtitle"])
-        ).text.strip()
+        course_subtitle = driver.find_element(*SELECTORS["course_subtitle"]).text.strip()
         result.append(("course_subtitle", course_subtitle))
-        print(f"Подзаголовок курса: {course_subtitle}")
     except Exception as e:
         print(f"Ошибка при парсинге подзаголовка курса: {str(e)}")
 
     # Извлечение заголовков и текста деталей курса
     try:
-        detail_titles = WebDriverWait(driver, 20).until(
-            EC.presence_of_all_elements_located(SELECTORS["course_details_titles"])
-        )
-        detail_paragraphs = WebDriverWait(driver, 20).until(
-            EC.presence_of_all_elements_located(SELECTORS["course_details_paragraphs"])
-        )
+        detail_titles = driver.find_elements(*SELECTORS["course_details_titles"])
+        detail_paragraphs = driver.find_elements(*SELECTORS["course_details_paragraphs"])
         detail_texts = []
         for title, paragraph in zip(detail_titles, detail_paragraphs):
             title_text = title.text.strip()
@@ -149,73 +130,67 @@ def parse_page(driver, url):
                 detail_texts.append((title_text, paragraph_text))
         if detail_texts:
             result.append(("course_details", detail_texts))
-            print(f"Детали курса: {detail_texts}")
         else:
             print("Детали курса пусты или не найдены")
     except Exception as e:
         print(f"Ошибка при парсинге деталей курса: {str(e)}")
 
-    # Извлечение FAQ
+    # Извлечение FAQ: все пары «вопрос — ответ» одним обращением к браузеру
     try:
-        faq_title = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located(SELECTORS["faq_title"])
-        ).text.strip()
-        faq_text = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located(SELECTORS["faq_text"])
-        ).text.strip()
-        faq_combined = [f"• {faq_title}:\n{faq_text}"]
-        result.append(("faq", faq_combined))
-        print(f"FAQ: {faq_combined}")
+        faq_items = extract_faq(driver, SELECTORS["faq_title"][1], SELECTORS["faq_text"][1])
+        faq_combined = []
+        for item in faq_items:
+            answer = "\n".join(item["content"])
+            faq_combined.append(f"• {item['title']}:\n{answer}")
+        if faq_combined:
+            result.append(("faq", faq_combined))
     except Exception as e:
         print(f"Ошибка при парсинге FAQ: {str(e)}")
 
-    return result, url, metadata
+    return result
 
 # Функция для сохранения данных в Markdown-файл
 def save_to_markdown(data, url, metadata, filename="DPO_master-of-business-administration-mba.md"):
-    content = []
-
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    for item in data:
-        if item[0] == "title":
-            content.append(f"# {item[1]}")
-            content.append(f"[Перейти к странице]({url})")
-        elif item[0] == "features":
-            content.append("## Особенности")
-            content.extend(item[1])
-        elif item[0] == "description":
-            content.append("## Описание")
-            content.extend(item[1])
-        elif item[0] == "course_subtitle":
-            content.append(f"## {item[1]}")
-        elif item[0] == "course_details":
-            content.append("## Детали курса")
-            for title, text in item[1]:
-                content.append(f"### {title}\n{text}")
-        elif item[0] == "faq":
-            content.append("## FAQ")
-            content.extend(item[1])
-
-    # Объединяем с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(final_content)
+    with MarkdownWriter(output_root() / filename) as md:
+        md.front_matter(metadata)
+        for item in data:
+            if item[0] == "title":
+                md.title(item[1], url)
+            elif item[0] == "features":
+                md.section("Особенности", item[1])
+            elif item[0] == "description":
+                md.section("Описание", item[1])
+            elif item[0] == "course_subtitle":
+                md.heading(item[1], 2)
+            elif item[0] == "course_details":
+                md.heading("Детали курса", 2)
+                for title, text in item[1]:
+                    md.section(title, [text], level=3)
+            elif item[0] == "faq":
+                md.section("FAQ", item[1])
     print(f"Контент записан в файл: {filename}")
     return filename
 
 # Основной блок программы
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/master-of-business-administration-mba"
+    TARGET_URL = site_url("https://academydpo.org/master-of-business-administration-mba", __file__)
     driver = get_driver()
     try:
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
-        output_file = save_to_markdown(parsed_data, page_url, metadata)
-        print(f"Файл {output_file} успешно сохранен!")
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_master-of-business-administration-mba.md"):
+            output_file = save_to_markdown(parsed_data, page_url, metadata)
+            print(f"Файл {output_file} успешно сохранен!")
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         driver.quit()
\ No newline at end of file
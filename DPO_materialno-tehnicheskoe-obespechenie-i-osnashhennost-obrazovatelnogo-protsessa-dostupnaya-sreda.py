@@ -1,34 +1,20 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from pathlib import Path
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC, Service, ChromeDriverManager
 import sys
 import logging
-import yaml
-from datetime import datetime
-import re
-
-# Настройка кодировки консоли на UTF-8
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from console import setup_console
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Словарь с CSS-селекторами
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.page__content-title"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']"),
     "content_desc": (By.CSS_SELECTOR, "div.page__content-desc"),
     "table_rows": (By.CSS_SELECTOR, "div.table table tbody tr"),
     "row_title": (By.CSS_SELECTOR, "td:nth-child(1)"),
@@ -37,6 +23,14 @@ SELECTORS = {
     "unordered_lists": (By.CSS_SELECTOR, "div.page__content-desc ul")
 }
 
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Доступная среда", "Образование"],
+    "tags": ["ДПО", "доступная среда", "дистанционное обучение"],
+    "description_fallback": (By.CSS_SELECTOR, "div.page__content-desc p"),
+    "description_join": True,
+}
+
 def get_driver():
     """Создает и настраивает веб-драйвер."""
     try:
@@ -45,7 +39,11 @@ def get_driver():
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--window-size=1920,1080")
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        driver = open_tab()
+        if driver is None:
+            apply_browser_profile(chrome_options)
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+            driver = attach_backend(driver)
         logging.info("Веб-драйвер успешно создан")
         return driver
     except Exception as e:
@@ -54,46 +52,14 @@ def get_driver():
 
 def extract_metadata(driver, url):
     """Извлекает метаданные страницы."""
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении заголовка страницы: {e}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении meta description: {e}")
-        try:
-            content_desc = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located(SELECTORS["content_desc"])
-            )
-            content_elements = content_desc.find_elements(By.TAG_NAME, "p")
-            intro_text = " ".join([elem.text.strip() for elem in content_elements if elem.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Доступная среда", "Образование"]
-    metadata["tags"] = ["ДПО", "доступная среда", "дистанционное обучение"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 def parse_page(driver, url):
     """Парсит страницу и возвращает данные."""
     try:
-        driver.get(url)
+        fetch_page(driver, url)
         logging.info(f"Загрузка страницы: {url}")
-        WebDriverWait(driver, 30).until(EC.presence_of_element_located(SELECTORS["main_title"]))
+        WebDriverWait(driver, wait_timeout(30)).until(EC.presence_of_element_located(SELECTORS["main_title"]))
     except Exception as e:
         logging.error(f"Ошибка загрузки страницы: {e}")
         return [], url, {}
@@ -103,7 +69,7 @@ def parse_page(driver, url):
 
     # Извлечение заголовка
     try:
-        main_title = WebDriverWait(driver, 30).until(
+        main_title = WebDriverWait(driver, wait_timeout(30)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -113,7 +79,7 @@ def parse_page(driver, url):
 
     # Извлечение содержимого
     try:
-        content_desc = WebDriverWait(driver, 30).until(
+        content_desc = WebDriverWait(driver, wait_timeout(30)).until(
             EC.presence_of_element_located(SELECTORS["content_desc"])
         )
         content_elements = content_desc.find_elements(By.XPATH, "./*")
@@ -178,31 +144,17 @@ def parse_page(driver, url):
 def save_to_markdown(data, url, metadata, filename="DPO_materialno-tehnicheskoe-obespechenie-i-osnashhennost-obrazovatelnogo-protsessa-dostupnaya-sreda.md"):
     """Сохраняет данные в Markdown-файл."""
     try:
-        save_path = Path(r"D:\python_work\dpo\dpo") / filename
-        content = []
-
-        # Формируем YAML-метаданные
-        yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-        content.append(f"---\n{yaml_metadata}---")
-
-        # Добавление заголовка и ссылки
-        for item in data:
-            if item[0] == "title":
-                content.append(f"# {item[1]}\n[Перейти к странице]({url})")
-                break
-        else:
-            content.append(f"# Материально-техническое обеспечение\n[Перейти к странице]({url})")
-
-        # Добавление содержимого
-        for item in data:
-            if item[0] == "content":
-                content.extend(item[1])
-
-        # Объединяем с одним переносом строки
-        final_content = "\n".join(line for line in content if line.strip())
-
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(final_content)
+        save_path = output_root() / filename
+        title = next((item[1] for item in data if item[0] == "title"), "Материально-техническое обеспечение")
+
+        with MarkdownWriter(save_path) as md:
+            md.front_matter(metadata)
+            # Заголовок и ссылка
+            md.title(title, url)
+            # Содержимое
+            for item in data:
+                if item[0] == "content":
+                    md.lines(item[1])
         logging.info(f"Контент записан в файл: {save_path}")
         return save_path
     except Exception as e:
@@ -210,7 +162,8 @@ def save_to_markdown(data, url, metadata, filename="DPO_materialno-tehnicheskoe-
         return None
 
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/materialno-tehnicheskoe-obespechenie-i-osnashhennost-obrazovatelnogo-protsessa-dostupnaya-sreda"
+    setup_console()
+    TARGET_URL = site_url("https://academydpo.org/materialno-tehnicheskoe-obespechenie-i-osnashhennost-obrazovatelnogo-protsessa-dostupnaya-sreda", __file__)
     logging.info("Запуск скрипта PDO_materialno_tehnicheskoe_obespechenie_i_osnashhennost_obrazovatelnogo_protsessa_dostupnaya_sreda.py")
     driver = get_driver()
     if driver is None:
@@ -218,6 +171,14 @@ if __name__ == "__main__":
         sys.exit(1)
     try:
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
+        if not parsed_data:
+            logging.error("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if not store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_materialno-tehnicheskoe-obespechenie-i-osnashhennost-obrazovatelnogo-protsessa-dostupnaya-sreda.md"):
+            logging.info("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
+            sys.exit(0)
         output_file = save_to_markdown(parsed_data, page_url, metadata)
         if output_file:
             logging.info(f"Файл {output_file} успешно сохранен!")
@@ -1,28 +1,16 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from pathlib import Path
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC, Service, ChromeDriverManager
 import sys
 import logging
-import yaml
-from datetime import datetime
-import re
-
-# Настройка кодировки консоли на UTF-8
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from console import setup_console
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 def get_driver():
     """Создает и настраивает веб-драйвер."""
@@ -32,7 +20,11 @@ def get_driver():
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--window-size=1920,1080")
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        driver = open_tab()
+        if driver is None:
+            apply_browser_profile(chrome_options)
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+            driver = attach_backend(driver)
         logging.info("Веб-драйвер успешно создан")
         return driver
     except Exception as e:
@@ -43,55 +35,26 @@ SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.page__content-title"),
     "section_titles": (By.CSS_SELECTOR, "h2"),
     "content_paragraphs": (By.CSS_SELECTOR, ".page__content-desc > *"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']"),
+}
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Материально-техническое обеспечение", "Образование"],
+    "tags": ["ДПО", "материально-техническое обеспечение", "дистанционное обучение"],
+    "title_fallback": SELECTORS["main_title"],
+    "description_fallback": (By.CSS_SELECTOR, ".page__content-desc p"),
 }
 
 def extract_metadata(driver, url):
     """Извлекает метаданные страницы."""
-    metadata = {
-        "title": "",
-        "description": "",
-        "url": url,
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "categories": ["Материально-техническое обеспечение", "Образование"],
-        "tags": ["ДПО", "материально-техническое обеспечение", "дистанционное обучение"]
-    }
-
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении заголовка страницы: {e}")
-        try:
-            main_title = driver.find_element(*SELECTORS["main_title"]).text.strip()
-            metadata["title"] = main_title
-        except:
-            metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении meta description: {e}")
-        try:
-            first_paragraph = driver.find_element(By.CSS_SELECTOR, ".page__content-desc p").text.strip()
-            metadata["description"] = re.sub(r'[#*\[\]]', '', first_paragraph)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 def parse_page(driver, url):
     """Парсит страницу и возвращает данные."""
     logging.info(f"Начинаем парсинг страницы: {url}")
     try:
-        driver.get(url)
-        WebDriverWait(driver, 15).until(
+        fetch_page(driver, url)
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -137,76 +100,62 @@ def parse_page(driver, url):
 def save_to_markdown(data, url, metadata, filename="DPO_matertehnichobespechenieiosnashhennost.md"):
     """Сохраняет результаты в Markdown-файл с точным форматированием."""
     try:
-        save_path = Path(r"D:\python_work\dpo\dpo") / filename
-        content_blocks = []
-
-        # Формируем YAML-метаданные
-        yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False, width=float("inf"))
-        content_blocks.append(f"---\n{yaml_metadata}---")
-
-        # Заголовок страницы
-        content_blocks.append(f"# {metadata['title']}\n[Перейти к странице]({url})")
+        save_path = output_root() / filename
+
+        with MarkdownWriter(save_path) as md:
+            md.front_matter(metadata, width=float("inf"))
+            # Заголовок страницы
+            md.title(metadata['title'], url)
+
+            # Раздел записывается, как только начинается следующий; между разделами — пустая строка
+            written = 0
+
+            def write_section(section):
+                nonlocal written
+                if written:
+                    md.blank()
+                if section['title']:
+                    md.line(section['title'])
+                md.lines(section['content'])
+                written += 1
+
+            current_section = None
+            for item_type, item_content in data:
+                item_content = item_content.strip()
+                if not item_content:
+                    continue
+
+                if item_type == "title":
+                    continue  # Уже обработали в заголовке
+
+                elif item_type == "section_title":
+                    if current_section:
+                        write_section(current_section)
+                    current_section = {
+                        'title': f"## {item_content}",
+                        'content': []
+                    }
+
+                elif item_type == "paragraph":
+                    if not current_section:
+                        current_section = {'title': None, 'content': []}
+                    if current_section['content'] and current_section['content'][-1].endswith('.'):
+                        # Объединяем с предыдущим абзацем
+                        current_section['content'][-1] = f"{current_section['content'][-1]} {item_content}"
+                    else:
+                        current_section['content'].append(item_content)
+
+                elif item_type == "list":
+                    if not current_section:
+                        current_section = {'title': None, 'content': []}
+                    # Убираем лишние переносы в списках
+                    list_items = [f"• {line.strip('• ')}" for line in item_content.split('\n') if line.strip()]
+                    current_section['content'].extend(list_items)
+
+            # Последний раздел
+            if current_section:
+                write_section(current_section)
 
-        # Обрабатываем основной контент
-        current_section = None
-        for item_type, item_content in data:
-            item_content = item_content.strip()
-            if not item_content:
-                continue
-
-            if item_type == "title":
-                continue  # Уже обработали в заголовке
-
-            elif item_type == "section_title":
-                if current_section:
-                    content_blocks.append(current_section)
-                current_section = {
-                    'title': f"## {item_content}",
-                    'content': []
-                }
-
-            elif item_type == "paragraph":
-                if not current_section:
-                    current_section = {'title': None, 'content': []}
-                if current_section['content'] and current_section['content'][-1].endswith('.'):
-                    # Объединяем с предыдущим абзацем
-                    current_section['content'][-1] = f"{current_section['content'][-1]} {item_content}"
-                else:
-                    current_section['content'].append(item_content)
-
-            elif item_type == "list":
-                if not current_section:
-                    current_section = {'title': None, 'content': []}
-                # Убираем лишние переносы в списках
-                list_items = [f"• {line.strip('• ')}" for line in item_content.split('\n') if line.strip()]
-                current_section['content'].extend(list_items)
-
-        # Добавляем последнюю секцию
-        if current_section:
-            content_blocks.append(current_section)
-
-        # Формируем итоговый контент
-        final_content = []
-        for section in content_blocks:
-            if isinstance(section, str):
-                final_content.append(section)
-                continue
-            if section['title']:
-                final_content.append(section['title'])
-            for item in section['content']:
-                if item.startswith('•'):
-                    final_content.append(item)
-                else:
-                    final_content.append(item)
-            # Добавляем пустую строку после секции, если она не последняя
-            if section != content_blocks[-1]:
-                final_content.append("")
-
-        # Объединяем с одним переносом строки
-        final_content = "\n".join(line for line in final_content if line.strip() or line == "")
-
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(final_content)
         logging.info(f"Контент записан в файл: {save_path}")
         return save_path
 
@@ -215,7 +164,8 @@ def save_to_markdown(data, url, metadata, filename="DPO_matertehnichobespechenie
         return None
 
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/materialno-tehnicheskoe-obespechenie-i-osnashhennost"
+    setup_console()
+    TARGET_URL = site_url("https://academydpo.org/materialno-tehnicheskoe-obespechenie-i-osnashhennost", __file__)
     logging.info("Запуск скрипта DPO_matertehnichobespechenieiosnashhennost.py")
     driver = get_driver()
     if driver is None:
@@ -225,7 +175,12 @@ if __name__ == "__main__":
         parsed_content, page_url, metadata = parse_page(driver, TARGET_URL)
         if not parsed_content:
             logging.error("Ошибка: не удалось получить контент со страницы")
-            sys.exit(1)
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if not store_page(__file__, parsed_content, page_url, metadata, output_root() / "DPO_matertehnichobespechenieiosnashhennost.md"):
+            logging.info("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
+            sys.exit(0)
         output_file = save_to_markdown(parsed_content, page_url, metadata)
         if output_file:
             logging.info(f"Парсинг завершен успешно. Результат сохранен в: {output_file}")
@@ -1,35 +1,29 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from pathlib import Path
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC, Service, ChromeDriverManager
 import sys
 import logging
-import yaml
-from datetime import datetime
-import re
-
-# Настройка кодировки консоли на UTF-8
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from console import setup_console
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Словарь селекторов для страницы https://academydpo.org/mezhdunarodnoe-sotrudnichestvo
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.page__content-title"),
     "paragraphs": (By.CSS_SELECTOR, "div.page__content-desc > p"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']")
+}
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Международное сотрудничество", "Образование"],
+    "tags": ["ДПО", "международное сотрудничество", "дистанционное обучение"],
+    "title_fallback": SELECTORS["main_title"],
+    "description_fallback": SELECTORS["paragraphs"],
 }
 
 def get_driver():
@@ -40,7 +34,11 @@ def get_driver():
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--window-size=1920,1080")
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        driver = open_tab()
+        if driver is None:
+            apply_browser_profile(chrome_options)
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+            driver = attach_backend(driver)
         logging.info("Веб-драйвер успешно создан")
         return driver
     except Exception as e:
@@ -49,49 +47,14 @@ def get_driver():
 
 def extract_metadata(driver, url):
     """Извлекает метаданные страницы."""
-    metadata = {
-        "title": "",
-        "description": "",
-        "url": url,
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "categories": ["Международное сотрудничество", "Образование"],
-        "tags": ["ДПО", "международное сотрудничество", "дистанционное обучение"]
-    }
-
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении заголовка страницы: {e}")
-        try:
-            main_title = driver.find_element(*SELECTORS["main_title"]).text.strip()
-            metadata["title"] = main_title
-        except:
-            metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении meta description: {e}")
-        try:
-            first_paragraph = driver.find_element(*SELECTORS["paragraphs"]).text.strip()
-            metadata["description"] = re.sub(r'[#*\[\]]', '', first_paragraph)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 def parse_page(driver, url):
     """Парсит страницу и возвращает данные."""
     logging.info(f"Начинаем парсинг страницы: {url}")
     try:
-        driver.get(url)
-        WebDriverWait(driver, 15).until(
+        fetch_page(driver, url)
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -103,7 +66,7 @@ def parse_page(driver, url):
 
     # Извлечение основного заголовка
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -113,7 +76,7 @@ def parse_page(driver, url):
 
     # Извлечение параграфов
     try:
-        paragraphs = WebDriverWait(driver, 15).until(
+        paragraphs = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["paragraphs"])
         )
         paragraph_texts = [p.text.strip() for p in paragraphs if p.text.strip()]
@@ -129,27 +92,16 @@ def parse_page(driver, url):
 def save_to_markdown(data, url, metadata, filename="DPO_mezhdunarodnoe-sotrudnichestvo.md"):
     """Сохраняет данные в Markdown-файл."""
     try:
-        save_path = Path(r"D:\python_work\dpo\dpo") / filename
-        content = []
-
-        # Формируем YAML-метаданные
-        yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False, width=float("inf"))
-        content.append(f"---\n{yaml_metadata}---")
-
-        # Формируем контент в логическом порядке
-        for item in data:
-            if item[0] == "title":
-                content.append(f"# {item[1]}")
-                content.append(f"[Перейти к странице]({url})")
-            elif item[0] == "content":
-                content.append("## Описание")
-                content.extend(item[1])
-
-        # Объединяем с одним переносом строки
-        final_content = "\n".join(line for line in content if line.strip())
-
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(final_content)
+        save_path = output_root() / filename
+
+        with MarkdownWriter(save_path) as md:
+            md.front_matter(metadata, width=float("inf"))
+            # Контент в логическом порядке
+            for item in data:
+                if item[0] == "title":
+                    md.title(item[1], url)
+                elif item[0] == "content":
+                    md.section("Описание", item[1])
         logging.info(f"Контент записан в файл: {save_path}")
         return save_path
     except Exception as e:
@@ -158,7 +110,8 @@ def save_to_markdown(data, url, metadata, filename="DPO_mezhdunarodnoe-sotrudnic
 
 # Основной блок программы
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/mezhdunarodnoe-sotrudnichestvo"
+    setup_console()
+    TARGET_URL = site_url("https://academydpo.org/mezhdunarodnoe-sotrudnichestvo", __file__)
     logging.info("Запуск скрипта DPO_mezhdunarodnoe-sotrudnichestvo.py")
     driver = get_driver()
     if driver is None:
@@ -166,6 +119,14 @@ if __name__ == "__main__":
         sys.exit(1)
     try:
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
+        if not parsed_data:
+            logging.error("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if not store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_mezhdunarodnoe-sotrudnichestvo.md"):
+            logging.info("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
+            sys.exit(0)
         output_file = save_to_markdown(parsed_data, page_url, metadata)
         if output_file:
             logging.info(f"Файл {output_file} успешно сохранен!")
@@ -1,35 +1,30 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from pathlib import Path
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC, Service, ChromeDriverManager
 import sys
 import logging
-import yaml
-from datetime import datetime
-
-# Настройка кодировки консоли на UTF-8
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from console import setup_console
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Словарь селекторов
 SELECTORS = {
     "main_title": (By.CSS_SELECTOR, "h1.page__content-title"),
     "paragraphs": (By.CSS_SELECTOR, "div.page__content-desc > p"),
     "underline_text": (By.CSS_SELECTOR, "div.page__content-desc > u"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']")
+}
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Руководство", "Педагогический состав", "Образование"],
+    "tags": ["ДПО", "руководство", "преподаватели", "администрация"],
+    "title_fallback": SELECTORS["main_title"],
+    "description_fallback": SELECTORS["paragraphs"],
 }
 
 def get_driver():
@@ -40,7 +35,11 @@ def get_driver():
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--window-size=1920,1080")
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        driver = open_tab()
+        if driver is None:
+            apply_browser_profile(chrome_options)
+            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+            driver = attach_backend(driver)
         logging.info("Веб-драйвер успешно создан")
         return driver
     except Exception as e:
@@ -49,49 +48,14 @@ def get_driver():
 
 def extract_metadata(driver, url):
     """Извлекает метаданные страницы."""
-    metadata = {
-        "title": "",
-        "description": "",
-        "url": url,
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "categories": ["Руководство", "Педагогический состав", "Образование"],
-        "tags": ["ДПО", "руководство", "преподаватели", "администрация"]
-    }
-
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении заголовка страницы: {e}")
-        try:
-            main_title = driver.find_element(*SELECTORS["main_title"]).text.strip()
-            metadata["title"] = main_title
-        except:
-            metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        logging.warning(f"Ошибка при извлечении meta description: {e}")
-        try:
-            first_paragraph = driver.find_element(*SELECTORS["paragraphs"]).text.strip()
-            metadata["description"] = first_paragraph[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 def parse_page(driver, url):
     """Парсит страницу и возвращает данные."""
     logging.info(f"Начинаем парсинг страницы: {url}")
     try:
-        driver.get(url)
-        WebDriverWait(driver, 15).until(
+        fetch_page(driver, url)
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -103,7 +67,7 @@ def parse_page(driver, url):
 
     # Извлечение основного заголовка
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -113,7 +77,7 @@ def parse_page(driver, url):
 
     # Извлечение подзаголовка (underline)
     try:
-        underline_text = WebDriverWait(driver, 15).until(
+        underline_text = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["underline_text"])
         ).text.strip()
         result.append(("subtitle", underline_text))
@@ -123,7 +87,7 @@ def parse_page(driver, url):
 
     # Извлечение параграфов
     try:
-        paragraphs = WebDriverWait(driver, 15).until(
+        paragraphs = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["paragraphs"])
         )
         paragraph_texts = []
@@ -164,51 +128,30 @@ def parse_page(driver, url):
     logging.info(f"Парсинг завершен. Получено {len(result)} элементов контента")
     return result, url, metadata
 
+# Поля карточки сотрудника в порядке вывода
+PERSON_FIELDS = ("education", "total_experience", "position_experience", "graduated",
+                 "additional_education", "phone", "email")
+
 def save_to_markdown(data, url, metadata, filename="DPO_rukovodstvo-i-pedagogicheskij-sostav.md"):
     """Сохраняет данные в Markdown-файл."""
     try:
-        save_path = Path(r"D:\python_work\dpo\dpo") / filename
-        content = []
-
-        # Формируем YAML-метаданные
-        yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False, width=float("inf"))
-        content.append(f"---\n{yaml_metadata}---")
-
-        # Обработка элементов для форматирования в Markdown
-        for item in data:
-            if item[0] == "title":
-                content.append(f"# {item[1]}")
-                content.append(f"[Перейти к странице]({url})")
-            elif item[0] == "subtitle":
-                content.append(f"## {item[1]}")
-            elif item[0] == "content":
-                for person in item[1]:
-                    if isinstance(person, dict):
-                        content.append(f"## {person.get('title', '')}")
-                        if "education" in person:
-                            content.append(f"- {person['education']}")
-                        if "total_experience" in person:
-                            content.append(f"- {person['total_experience']}")
-                        if "position_experience" in person:
-                            content.append(f"- {person['position_experience']}")
-                        if "graduated" in person:
-                            content.append(f"- {person['graduated']}")
-                        if "additional_education" in person:
-                            content.append(f"- {person['additional_education']}")
-                        if "phone" in person:
-                            content.append(f"- {person['phone']}")
-                        if "email" in person:
-                            content.append(f"- {person['email']}")
-                        content.append("")  # Пустая строка для разделения персон
-
-        # Объединяем с одним переносом строки
-        final_content = "\n".join(line for line in content if line.strip())
-
-        # Создаём директорию, если она не существует
-        save_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(save_path, 'w', encoding='utf-8') as f:
-            f.write(final_content)
+        save_path = output_root() / filename
+
+        with MarkdownWriter(save_path) as md:
+            md.front_matter(metadata, width=float("inf"))
+            # Элементы страницы в порядке следования
+            for item in data:
+                if item[0] == "title":
+                    md.title(item[1], url)
+                elif item[0] == "subtitle":
+                    md.heading(item[1], 2)
+                elif item[0] == "content":
+                    for person in item[1]:
+                        if isinstance(person, dict):
+                            md.heading(person.get('title', ''), 2)
+                            for key in PERSON_FIELDS:
+                                if key in person:
+                                    md.item(person[key])
         logging.info(f"Контент записан в файл: {save_path}")
         return save_path
     except Exception as e:
@@ -217,7 +160,8 @@ def save_to_markdown(data, url, metadata, filename="DPO_rukovodstvo-i-pedagogich
 
 # Основной блок программы
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/rukovodstvo-i-pedagogicheskij-sostav"
+    setup_console()
+    TARGET_URL = site_url("https://academydpo.org/rukovodstvo-i-pedagogicheskij-sostav", __file__)
     logging.info("Запуск скрипта DPO_rukovodstvo-i-pedagogicheskij-sostav.py")
     driver = get_driver()
     if driver is None:
@@ -227,7 +171,12 @@ if __name__ == "__main__":
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
         if not parsed_data:
             logging.error("Ошибка: не удалось получить контент со страницы")
-            sys.exit(1)
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if not store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_rukovodstvo-i-pedagogicheskij-sostav.md"):
+            logging.info("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
+            sys.exit(0)
         output_file = save_to_markdown(parsed_data, page_url, metadata)
         if output_file:
             logging.info(f"Файл {output_file} успешно сохранен!")
@@ -1,13 +1,15 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC
 import re
-from pathlib import Path
-import yaml
-from datetime import datetime
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 
 # Функция для настройки и получения веб-драйвера Chrome
 def get_driver():
@@ -16,7 +18,11 @@ def get_driver():
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 # Словарь с CSS/XPath-селекторами для извлечения данных
@@ -25,8 +31,14 @@ SELECTORS = {
     "intro_paragraphs": (By.XPATH, "//div[contains(@class, 'page__content-desc')]//p[not(preceding-sibling::h2) and not(preceding-sibling::h3)]"),
     "sub_titles": (By.CSS_SELECTOR, "div.page__content-desc h2, div.page__content-desc h3"),
     "list_items": (By.XPATH, "./li"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']")
+}
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Образование", "Прием и перевод"],
+    "tags": ["ДПО", "вакантные места", "прием", "перевод"],
+    "description_fallback": SELECTORS["intro_paragraphs"],
+    "description_join": True,
 }
 
 # Функция для нормализации текста
@@ -37,38 +49,7 @@ def normalize_text(text):
 
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            intro_elements = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located(SELECTORS["intro_paragraphs"])
-            )
-            intro_text = " ".join([elem.text.strip() for elem in intro_elements if elem.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Образование", "Прием и перевод"]
-    metadata["tags"] = ["ДПО", "вакантные места", "прием", "перевод"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 # Функция для парсинга одной секции
 def parse_section(driver, sub_title_element):
@@ -100,9 +81,9 @@ def parse_section(driver, sub_title_element):
 
 # Функция для парсинга страницы
 def parse_page(driver, url):
-    driver.get(url)
+    fetch_page(driver, url)
     try:
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -113,7 +94,7 @@ def parse_page(driver, url):
     result = []
 
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -122,7 +103,7 @@ def parse_page(driver, url):
         print(f"Ошибка при парсинге основного заголовка: {str(e)}")
 
     try:
-        intro_elements = WebDriverWait(driver, 15).until(
+        intro_elements = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["intro_paragraphs"])
         )
         intro_text = [normalize_text(elem.text) for elem in intro_elements if elem.text.strip()]
@@ -136,7 +117,7 @@ def parse_page(driver, url):
         print(f"Ошибка при парсинге вводных параграфов: {str(e)}")
 
     try:
-        sub_title_elements = WebDriverWait(driver, 15).until(
+        sub_title_elements = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["sub_titles"])
         )
         for sub_title_element in sub_title_elements:
@@ -151,44 +132,40 @@ def parse_page(driver, url):
 
 # Функция для сохранения данных в Markdown-файл
 def save_to_markdown(data, url, metadata, filename="DPO_vakantnye-mesta-dlya-priema-perevoda.md"):
-    content = []
-
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    for item in data:
-        if item[0] == "title":
-            content.append(f"# {item[1]}")
-            content.append(f"[Перейти к странице]({url})")
-        elif item[0] == "content":
-            content.extend(item[1])
-        elif item[0] == "section":
-            section = item[1]
-            if section["tag"] == "h2":
-                content.append(f"## {section['title']}")
-            else:
-                content.append(f"### {section['title']}")
-            content.extend(section["content"])
-
-    # Фильтрация пустых строк и объединение с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(final_content)
+    with MarkdownWriter(output_root() / filename) as md:
+        md.front_matter(metadata)
+        for item in data:
+            if item[0] == "title":
+                md.title(item[1], url)
+            elif item[0] == "content":
+                md.lines(item[1])
+            elif item[0] == "section":
+                section = item[1]
+                md.section(section['title'], section["content"], level=2 if section["tag"] == "h2" else 3)
 
     print(f"Контент записан в файл: {filename}")
     return filename
 
 # Основной блок программы
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/vakantnye-mesta-dlya-priema-perevoda"
+    TARGET_URL = site_url("https://academydpo.org/vakantnye-mesta-dlya-priema-perevoda", __file__)
     driver = get_driver()
     try:
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
-        output_file = save_to_markdown(parsed_data, page_url, metadata)
-        print(f"Файл {output_file} успешно сохранен!")
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_vakantnye-mesta-dlya-priema-perevoda.md"):
+            output_file = save_to_markdown(parsed_data, page_url, metadata)
+            print(f"Файл {output_file} успешно сохранен!")
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         driver.quit()
\ No newline at end of file
@@ -1,12 +1,14 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from pathlib import Path
-import yaml
-from datetime import datetime
+from lazy_selenium import webdriver, Options, By, WebDriverWait, EC
+import sys
+from markdown_render import MarkdownWriter
+from change_detection import store_page
+from page_meta import read_metadata
+from browser_profile import apply_browser_profile
+from cdp_driver import attach_backend, open_tab
+from retry import fetch_page, EXIT_RETRY
+from timings import wait_timeout
+from site_profiles import site_url, output_root, apply_page_overrides
 import re
 
 # Словарь селекторов
@@ -16,8 +18,14 @@ SELECTORS = {
     "sub_title_h2": (By.CSS_SELECTOR, "div.page__content-desc > h2"),
     "paragraphs": (By.CSS_SELECTOR, "div.page__content-desc > p"),
     "list_items": (By.CSS_SELECTOR, "div.page__content-desc > ul > li"),
-    "meta_title": (By.TAG_NAME, "title"),
-    "meta_description": (By.XPATH, "//meta[@name='description']")
+}
+
+# Метаданные страницы: title и description берутся из <head>, селекторы — запасной вариант, если их там нет
+METADATA = {
+    "categories": ["Образование", "Прием и перевод"],
+    "tags": ["ДПО", "вакантные места", "прием", "перевод"],
+    "description_fallback": SELECTORS["paragraphs"],
+    "description_join": True,
 }
 
 # Функция для настройки и получения веб-драйвера Chrome
@@ -27,7 +35,11 @@ def get_driver():
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=chrome_options)
+    driver = open_tab()
+    if driver is None:
+        apply_browser_profile(chrome_options)
+        driver = webdriver.Chrome(options=chrome_options)
+        driver = attach_backend(driver)
     return driver
 
 # Функция для нормализации текста
@@ -38,44 +50,13 @@ def normalize_text(text):
 
 # Функция для извлечения метаданных
 def extract_metadata(driver, url):
-    metadata = {}
-    try:
-        title_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_title"])
-        )
-        metadata["title"] = title_element.get_attribute("innerText").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении заголовка страницы: {str(e)}")
-        metadata["title"] = "Без названия"
-
-    try:
-        desc_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(SELECTORS["meta_description"])
-        )
-        metadata["description"] = desc_element.get_attribute("content").strip()
-    except Exception as e:
-        print(f"Ошибка при извлечении meta description: {str(e)}")
-        try:
-            paragraph_elements = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located(SELECTORS["paragraphs"])
-            )
-            intro_text = " ".join([elem.text.strip() for elem in paragraph_elements if elem.text.strip()])
-            metadata["description"] = re.sub(r'[#*\[\]]', '', intro_text)[:160].strip() + "..."
-        except:
-            metadata["description"] = "Описание отсутствует"
-
-    metadata["url"] = url
-    metadata["date"] = datetime.now().strftime("%Y-%m-%d")
-    metadata["categories"] = ["Образование", "Прием и перевод"]
-    metadata["tags"] = ["ДПО", "вакантные места", "прием", "перевод"]
-
-    return metadata
+    return read_metadata(driver, url, **METADATA)
 
 # Функция для парсинга страницы
 def parse_page(driver, url):
-    driver.get(url)
+    fetch_page(driver, url)
     try:
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         )
     except Exception as e:
@@ -87,7 +68,7 @@ def parse_page(driver, url):
 
     # Извлечение основного заголовка
     try:
-        main_title = WebDriverWait(driver, 15).until(
+        main_title = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["main_title"])
         ).text.strip()
         result.append(("title", main_title))
@@ -97,7 +78,7 @@ def parse_page(driver, url):
 
     # Извлечение подзаголовка h3
     try:
-        sub_title_h3 = WebDriverWait(driver, 15).until(
+        sub_title_h3 = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_element_located(SELECTORS["sub_title_h3"])
         ).text.strip()
         result.append(("sub_title_h3", sub_title_h3))
@@ -107,7 +88,7 @@ def parse_page(driver, url):
 
     # Извlection подзаголовков h2
     try:
-        sub_titles_h2 = WebDriverWait(driver, 15).until(
+        sub_titles_h2 = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["sub_title_h2"])
         )
         sub_titles_h2_texts = [normalize_text(h2.text) for h2 in sub_titles_h2 if h2.text.strip()]
@@ -120,7 +101,7 @@ def parse_page(driver, url):
 
     # Извлечение параграфов и списка
     try:
-        paragraphs = WebDriverWait(driver, 15).until(
+        paragraphs = WebDriverWait(driver, wait_timeout(15)).until(
             EC.presence_of_all_elements_located(SELECTORS["paragraphs"])
         )
         paragraph_texts = []
@@ -161,7 +142,6 @@ def parse_page(driver, url):
 
 # Функция для сохранения данных в Markdown-файл
 def save_to_markdown(data, url, metadata, filename="DPO_vakantnye-mesta-dlya-priema-perevoda1.md"):
-    content = []
     content_parts = {
         "title": None,
         "sub_title_h3": None,
@@ -173,55 +153,53 @@ def save_to_markdown(data, url, metadata, filename="DPO_vakantnye-mesta-dlya-pri
     for item in data:
         if item[0] in content_parts:
             content_parts[item[0]] = item[1]
+    paragraphs = content_parts["content"]
+    sub_titles = content_parts["sub_titles_h2"]
+
+    with MarkdownWriter(output_root() / filename) as md:
+        md.front_matter(metadata)
+
+        # Контент в логическом порядке
+        if content_parts["title"]:
+            md.title(content_parts['title'], url)
+
+        if content_parts["sub_title_h3"]:
+            md.heading(content_parts['sub_title_h3'], 2)
+
+        # Первый параграф (со списком) и следующий за ним
+        md.lines(paragraphs[:2])
+
+        # Первый подзаголовок h2 и связанные параграфы
+        if sub_titles:
+            md.section(sub_titles[0], paragraphs[2:5])
+
+        # Второй подзаголовок h2 и оставшиеся параграфы
+        if len(sub_titles) > 1:
+            md.section(sub_titles[1], paragraphs[5:])
 
-    # Формируем YAML-метаданные
-    yaml_metadata = yaml.dump(metadata, allow_unicode=True, sort_keys=False)
-    content.append(f"---\n{yaml_metadata}---")
-
-    # Формируем контент в логическом порядке
-    if content_parts["title"]:
-        content.append(f"# {content_parts['title']}")
-        content.append(f"[Перейти к странице]({url})")
-
-    if content_parts["sub_title_h3"]:
-        content.append(f"## {content_parts['sub_title_h3']}")
-
-    # Добавляем первый параграф (с списком) и следующий параграф
-    if content_parts["content"] and len(content_parts["content"]) > 0:
-        content.append(content_parts["content"][0])  # Параграф со списком
-        if len(content_parts["content"]) > 1:
-            content.append(content_parts["content"][1])  # Параграф после списка
-
-    # Добавляем первый подзаголовок h2 и связанные параграфы
-    if content_parts["sub_titles_h2"] and len(content_parts["sub_titles_h2"]) > 0:
-        content.append(f"## {content_parts['sub_titles_h2'][0]}")
-        for i in range(2, 5):
-            if i < len(content_parts["content"]):
-                content.append(content_parts["content"][i])
-
-    # Добавляем второй подзаголовок h2 и оставшиеся параграфы
-    if content_parts["sub_titles_h2"] and len(content_parts["sub_titles_h2"]) > 1:
-        content.append(f"## {content_parts['sub_titles_h2'][1]}")
-        for i in range(5, len(content_parts["content"])):
-            content.append(content_parts["content"][i])
-
-    # Фильтрация пустых строк и объединение с одним переносом строки
-    final_content = "\n".join(line for line in content if line.strip())
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(final_content)
     print(f"Контент записан в файл: {filename}")
     return filename
 
 # Основной блок программы
 if __name__ == "__main__":
-    TARGET_URL = "https://academydpo.org/vakantnye-mesta-dlya-priema-perevoda"
+    TARGET_URL = site_url("https://academydpo.org/vakantnye-mesta-dlya-priema-perevoda", __file__)
     driver = get_driver()
     try:
         parsed_data, page_url, metadata = parse_page(driver, TARGET_URL)
-        output_file = save_to_markdown(parsed_data, page_url, metadata)
-        print(f"Файл {output_file} успешно сохранен!")
+        # Пустой результат не публикуется: оркестратор повторит страницу позже
+        if not parsed_data:
+            print("Ошибка: не удалось получить контент со страницы")
+            sys.exit(EXIT_RETRY)
+        apply_page_overrides(__file__, metadata)
+        # Markdown перерисовывается только для изменившихся страниц
+        if store_page(__file__, parsed_data, page_url, metadata, output_root() / "DPO_vakantnye-mesta-dlya-priema-perevoda1.md"):
+            output_file = save_to_markdown(parsed_data, page_url, metadata)
+            print(f"Файл {output_file} успешно сохранен!")
+        else:
+            print("Страница не изменилась с прошлого запуска, Markdown-файл не перезаписывается")
     except Exception as e:
         print(f"Ошибка при парсинге: {str(e)}")
+        # Страница не получена (например, исчерпаны попытки загрузки): оркестратор повторит её
+        sys.exit(EXIT_RETRY)
     finally:
         driver.quit()
\ No newline at end of file
@@ -0,0 +1,210 @@
+# Локальный кэш изображений (логотипов): хранение по хешу содержимого, миниатюры и поиск дубликатов
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import metrics
+import records
+import site_profiles
+from http_pool import get_session
+
+# Каталог файлов рядом с Markdown-файлами, чтобы ссылки вида assets/<хеш>.png работали офлайн
+ASSETS_DIR_NAME = "assets"
+THUMBS_DIR_NAME = "thumbs"
+# Индекс: адрес -> хеш и заголовки для условных запросов, хеш -> расширение, миниатюра, перцептивный хеш
+INDEX_NAME = "_assets.json"
+
+MAX_ASSET_BYTES = 5 * 1024 * 1024
+DOWNLOAD_CHUNK = 64 * 1024
+TIMEOUT = (5, 20)
+THUMB_SIZE = (128, 128)
+THUMB_WORKERS = min(4, os.cpu_count() or 1)
+# Изображения, чьи перцептивные хеши отличаются не больше чем на столько бит, попадают в журнал как похожие;
+# файлы не объединяются — близкий dHash бывает и у разных логотипов
+PERCEPTUAL_DISTANCE = 2
+
+
+def assets_dir():
+    """Каталог с файлами изображений сайта."""
+    return site_profiles.output_root() / ASSETS_DIR_NAME
+
+
+def index_path():
+    """Путь к индексу изображений в каталоге записей."""
+    return records.records_dir() / INDEX_NAME
+
+
+def load_index():
+    """Загружает индекс {"urls": {...}, "files": {...}}."""
+    try:
+        with open(index_path(), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    index.setdefault("urls", {})
+    index.setdefault("files", {})
+    return index
+
+
+def save_index(index):
+    """Сохраняет индекс (через временный файл)."""
+    path = index_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _extension(url, content_type):
+    """Расширение файла по Content-Type, а если его нет — по адресу."""
+    ext = mimetypes.guess_extension((content_type or "").split(";")[0].strip()) if content_type else None
+    if not ext:
+        ext = Path(urlsplit(url).path).suffix.lower() or ".bin"
+    return ".jpg" if ext == ".jpe" else ext
+
+
+def fetch(url, known):
+    """Условная загрузка: (адрес, None, заголовки) при 304, (адрес, содержимое, заголовки) при новом файле.
+
+    При ошибке возвращает (адрес, None, None).
+    """
+    headers = {}
+    if known.get("etag"):
+        headers["If-None-Match"] = known["etag"]
+    if known.get("last_modified"):
+        headers["If-Modified-Since"] = known["last_modified"]
+    try:
+        with get_session().get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            if response.status_code == 304:
+                metrics.count("assets_cache_hits")
+                return url, None, known
+            response.raise_for_status()
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > MAX_ASSET_BYTES:
+                logging.warning(f"Изображение {url} пропущено: {int(length)} байт больше лимита")
+                return url, None, None
+            # Загрузка прерывается, как только файл превысил лимит, даже без Content-Length
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                size += len(chunk)
+                if size > MAX_ASSET_BYTES:
+                    logging.warning(f"Изображение {url} пропущено: больше {MAX_ASSET_BYTES} байт")
+                    return url, None, None
+                chunks.append(chunk)
+            metrics.count("assets_cache_misses")
+            metrics.count("bytes_fetched", size)
+            return url, b"".join(chunks), {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content_type": response.headers.get("Content-Type"),
+            }
+    except Exception as e:
+        logging.error(f"Ошибка при загрузке изображения {url}: {e}")
+        return url, None, None
+
+
+def make_thumbnail(source, target):
+    """Создаёт миниатюру и возвращает перцептивный хеш (dHash, 64 бита) или None без Pillow.
+
+    Выполняется в отдельном процессе.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with Image.open(source) as image:
+        image.load()
+        gray = image.convert("L").resize((9, 8))
+        pixels = list(gray.getdata())
+        bits = 0
+        for row in range(8):
+            for col in range(8):
+                bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+        thumb = image.convert("RGBA") if image.mode in ("P", "LA") else image.copy()
+        thumb.thumbnail(THUMB_SIZE)
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        thumb.save(target, format="PNG")
+    return f"{bits:016x}"
+
+
+def _distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def cache_assets(urls, workers=None):
+    """Сохраняет изображения локально и возвращает {адрес: {"file", "thumb"}} с путями относительно output_root.
+
+    Неизменившиеся файлы не скачиваются (ETag/Last-Modified), одинаковое содержимое с разных адресов
+    хранится один раз. Визуально похожие изображения (по dHash) только попадают в журнал для ручной проверки.
+    """
+    urls = [url for url in dict.fromkeys(urls) if url]
+    if not urls:
+        return {}
+    index = load_index()
+    directory = assets_dir()
+    workers = workers or site_profiles.get_profile().get("http_pool_size", 10)
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as pool:
+        fetched = list(pool.map(lambda url: fetch(url, index["urls"].get(url, {})), urls))
+
+    new_files = []
+    downloaded = 0
+    for url, content, headers in fetched:
+        if content is None:
+            continue
+        downloaded += len(content)
+        digest = hashlib.sha256(content).hexdigest()
+        name = digest + _extension(url, headers.get("content_type"))
+        if digest not in index["files"]:
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / name).write_bytes(content)
+            index["files"][digest] = {"name": name}
+            new_files.append(digest)
+        index["urls"][url] = {"sha256": digest, "etag": headers.get("etag"), "last_modified": headers.get("last_modified")}
+    logging.info(f"Изображений: {len(urls)}, загружено заново: {len(new_files)}, получено байт: {downloaded}")
+
+    # Миниатюры и перцептивные хеши новых файлов считаются в пуле процессов
+    if new_files:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(THUMB_WORKERS, len(new_files))) as pool:
+            jobs = {
+                digest: pool.submit(make_thumbnail, directory / index["files"][digest]["name"],
+                                    directory / THUMBS_DIR_NAME / f"{digest}.png")
+                for digest in new_files
+            }
+            for digest, job in jobs.items():
+                try:
+                    phash = job.result()
+                except Exception as e:
+                    logging.warning(f"Не удалось создать миниатюру {index['files'][digest]['name']}: {e}")
+                    continue
+                if phash is None:
+                    continue
+                entry = index["files"][digest]
+                entry["thumb"] = f"{digest}.png"
+                entry["phash"] = phash
+                similar = [other_entry["name"] for other, other_entry in index["files"].items()
+                           if other != digest and other_entry.get("phash")
+                           and _distance(phash, other_entry["phash"]) <= PERCEPTUAL_DISTANCE]
+                if similar:
+                    logging.info(f"Изображение {entry['name']} похоже на: {', '.join(similar)}")
+    save_index(index)
+
+    result = {}
+    for url in urls:
+        digest = index["urls"].get(url, {}).get("sha256")
+        if digest not in index["files"]:
+            continue
+        entry = index["files"][digest]
+        result[url] = {
+            "file": f"{ASSETS_DIR_NAME}/{entry['name']}",
+            "thumb": f"{ASSETS_DIR_NAME}/{THUMBS_DIR_NAME}/{entry['thumb']}" if entry.get("thumb") else None,
+        }
+    return result
@@ -0,0 +1,185 @@
+# Учёт процессов, которые запускают скрипты (chromedriver, Chrome): память, CPU и завершение осиротевших
+import logging
+import threading
+import time
+from pathlib import Path
+
+# Как часто снимать замеры дерева процессов скрипта, секунд
+SAMPLE_INTERVAL = 0.5
+# Сколько ждать завершения процесса после terminate, прежде чем вызвать kill
+TERMINATE_GRACE = 3
+
+# Все процессы, замеченные за запуск: при выходе оркестратора оставшиеся в живых завершаются
+_TRACKED = {}
+_TRACKED_LOCK = threading.Lock()
+_WARNED = False
+
+
+def _psutil():
+    """psutil подключается лениво: без него замеры и поиск осиротевших процессов отключены."""
+    global _WARNED
+    try:
+        import psutil
+        return psutil
+    except ImportError:
+        if not _WARNED:
+            logging.warning("psutil не установлен: замеры ресурсов и завершение осиротевших браузеров отключены")
+            _WARNED = True
+        return None
+
+
+def _terminate(processes):
+    """Завершает процессы: сначала terminate, затем kill для не успевших. Возвращает число завершённых."""
+    psutil = _psutil()
+    alive = []
+    for process in processes:
+        try:
+            if process.is_running():
+                process.terminate()
+                alive.append(process)
+        except psutil.Error:
+            pass
+    if not alive:
+        return 0
+    _, still_alive = psutil.wait_procs(alive, timeout=TERMINATE_GRACE)
+    for process in still_alive:
+        try:
+            process.kill()
+        except psutil.Error:
+            pass
+    return len(alive)
+
+
+class ProcessMonitor:
+    """Следит за деревом процессов скрипта: пиковая память, время CPU, все запущенные им процессы.
+
+    Дерево опрашивается в фоновом потоке, поэтому процессы Chrome остаются известны и после того,
+    как их родитель (chromedriver или сам скрипт) завершился и они «отвязались» от дерева.
+    """
+
+    def __init__(self, pid, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.processes = {}
+        self.cpu = {}
+        self.peak_rss = 0
+        self.orphans = 0
+        self.started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        psutil = _psutil()
+        if psutil is None:
+            return
+        try:
+            self.root = psutil.Process(pid)
+        except psutil.Error:
+            return
+        self._track(self.root)
+        self._thread = threading.Thread(target=self._run, name=f"monitor-{pid}", daemon=True)
+        self._thread.start()
+
+    def _track(self, process):
+        if process.pid not in self.processes:
+            self.processes[process.pid] = process
+            with _TRACKED_LOCK:
+                _TRACKED[process.pid] = process
+
+    def sample(self):
+        """Один замер: новые потомки, суммарная память дерева и накопленное время CPU каждого процесса."""
+        psutil = _psutil()
+        try:
+            for child in self.root.children(recursive=True):
+                self._track(child)
+        except psutil.Error:
+            pass
+        rss = 0
+        for pid, process in list(self.processes.items()):
+            try:
+                with process.oneshot():
+                    rss += process.memory_info().rss
+                    times = process.cpu_times()
+                    self.cpu[pid] = times.user + times.system
+            except psutil.Error:
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _root_exited(self):
+        psutil = _psutil()
+        try:
+            return not self.root.is_running() or self.root.status() == psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            # Скрипт завершился: оставшиеся браузеры закрываются сразу, иначе они держат его stdout открытым
+            if self._root_exited():
+                self._cleanup()
+                return
+            self._stop.wait(self.interval)
+
+    def _cleanup(self):
+        # Сам скрипт не трогаем: его код возврата нужен оркестратору, а при таймауте его завершает run_script
+        self.orphans += _terminate(p for pid, p in self.processes.items() if pid != self.root.pid)
+
+    def stop(self):
+        """Останавливает замеры и завершает оставшиеся процессы дерева. Возвращает сводку или None без psutil."""
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        self._cleanup()
+        with _TRACKED_LOCK:
+            for pid in self.processes:
+                _TRACKED.pop(pid, None)
+        if self.orphans:
+            logging.warning(f"Завершено оставшихся процессов браузера: {self.orphans}")
+        return {
+            "seconds": round(time.monotonic() - self.started, 1),
+            "processes": len(self.processes),
+            "peak_rss_mb": round(self.peak_rss / 2 ** 20, 1),
+            "cpu_seconds": round(sum(self.cpu.values()), 1),
+            "orphans_killed": self.orphans,
+        }
+
+
+def kill_all():
+    """Завершает все ещё живые процессы, замеченные мониторами (вызывается при выходе оркестратора)."""
+    with _TRACKED_LOCK:
+        processes = list(_TRACKED.values())
+        _TRACKED.clear()
+    if not processes or _psutil() is None:
+        return 0
+    killed = _terminate(processes)
+    if killed:
+        logging.warning(f"При завершении работы остановлено процессов браузера: {killed}")
+    return killed
+
+
+def format_report(usage, title):
+    """Markdown-отчёт о ресурсах по страницам (самые тяжёлые по памяти — первыми)."""
+    lines = [f"# {title}", ""]
+    if not usage:
+        lines.append("Замеры недоступны (psutil не установлен).")
+        return "\n".join(lines) + "\n"
+    total_cpu = sum(item["cpu_seconds"] for item in usage.values())
+    total_orphans = sum(item["orphans_killed"] for item in usage.values())
+    lines.append(f"Страниц: {len(usage)}, CPU всего: {total_cpu:.1f} с, "
+                 f"пиковая память страницы: {max(item['peak_rss_mb'] for item in usage.values()):.1f} МБ, "
+                 f"завершено осиротевших процессов: {total_orphans}")
+    lines.append("")
+    lines.append("| Страница | Время, с | Процессов | Память (пик), МБ | CPU, с | Осиротевших |")
+    lines.append("|---|---|---|---|---|---|")
+    for page, item in sorted(usage.items(), key=lambda pair: -pair[1]["peak_rss_mb"]):
+        lines.append(f"| {page} | {item['seconds']} | {item['processes']} | {item['peak_rss_mb']} | "
+                     f"{item['cpu_seconds']} | {item['orphans_killed']} |")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report_path, usage, title="Ресурсы браузеров"):
+    """Записывает отчёт о ресурсах."""
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(format_report(usage, title))
@@ -0,0 +1,163 @@
+# Постоянные профили Chrome: дисковый кэш CSS/JS/шрифтов переживает запуск и переходит между страницами
+import logging
+import os
+import shutil
+import threading
+import time
+
+import site_profiles
+
+# Каталог профилей в каталоге результатов сайта: browser_profiles/slot-0, slot-1, ...
+PROFILES_DIR_NAME = "browser_profiles"
+CACHE_DIR_NAME = "cache"
+# Слотов больше, чем браузеров в оркестраторе: отдельные запуски скриптов и обход каталога тоже их занимают
+MAX_SLOTS = site_profiles.MAX_BROWSERS * 2
+# Предел дискового кэша одного профиля для Chrome и порог, после которого кэш очищается при запуске
+CACHE_SIZE = 200 * 1024 * 1024
+PRUNE_CACHE_SIZE = 300 * 1024 * 1024
+# Профиль, которым не пользовались столько дней, удаляется целиком
+PROFILE_MAX_AGE_DAYS = 14
+# Отключение на один запуск: DPO_PERSISTENT_BROWSER=0
+ENV_SWITCH = "DPO_PERSISTENT_BROWSER"
+
+# Занятые этим процессом слоты: {поток: (путь к профилю, открытый файл блокировки)}.
+# Блокировка держится до конца процесса и снимается системой, даже если процесс аварийно завершился
+_HELD = {}
+_HELD_LOCK = threading.Lock()
+
+
+def enabled(site=None):
+    """Включены ли постоянные профили (ключ persistent_browser профиля сайта, переопределяется переменной окружения)."""
+    switch = os.environ.get(ENV_SWITCH)
+    if switch is not None:
+        return switch not in ("0", "false", "no", "")
+    return bool(site_profiles.get_profile(site).get("persistent_browser", False))
+
+
+def profiles_dir(site=None):
+    """Каталог постоянных профилей сайта."""
+    return site_profiles.output_root(site) / PROFILES_DIR_NAME
+
+
+def _lock(handle):
+    """Неблокирующая эксклюзивная блокировка открытого файла. False, если файл уже заблокирован."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _try_slot(path):
+    """Пытается занять профиль; возвращает открытый файл блокировки или None."""
+    path.mkdir(parents=True, exist_ok=True)
+    handle = open(path / "slot.lock", "a+")
+    if _lock(handle):
+        return handle
+    handle.close()
+    return None
+
+
+def acquire_profile(site=None, key=None):
+    """Занимает свободный слот профиля для текущего потока и возвращает путь к нему (None, если все заняты).
+
+    Поток, перезапускающий браузер, получает свой же профиль: прежний Chrome к этому моменту закрыт.
+    Владельцем слота вместо потока может быть другой объект (key) — тогда слот освобождает release_profile.
+    """
+    key = threading.get_ident() if key is None else key
+    with _HELD_LOCK:
+        if key in _HELD:
+            return _HELD[key][0]
+        root = profiles_dir(site)
+        for slot in range(MAX_SLOTS):
+            path = root / f"slot-{slot}"
+            if any(held_path == path for held_path, _ in _HELD.values()):
+                continue
+            handle = _try_slot(path)
+            if handle is not None:
+                _HELD[key] = (path, handle)
+                os.utime(path)
+                return path
+    logging.warning(f"Все {MAX_SLOTS} профилей браузера заняты, используется временный профиль")
+    return None
+
+
+def release_profile(key):
+    """Освобождает слот, занятый с явным владельцем key."""
+    with _HELD_LOCK:
+        held = _HELD.pop(key, None)
+    if held is not None:
+        held[1].close()
+
+
+def apply_browser_profile(chrome_options, site=None, key=None):
+    """Добавляет к настройкам Chrome постоянный профиль с дисковым кэшем, если он включён для сайта."""
+    if not enabled(site):
+        return None
+    try:
+        path = acquire_profile(site, key)
+    except OSError as e:
+        logging.warning(f"Не удалось подготовить профиль браузера: {e}")
+        return None
+    if path is None:
+        return None
+    chrome_options.add_argument(f"--user-data-dir={path}")
+    chrome_options.add_argument(f"--disk-cache-dir={path / CACHE_DIR_NAME}")
+    chrome_options.add_argument(f"--disk-cache-size={CACHE_SIZE}")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--no-default-browser-check")
+    logging.info(f"Профиль браузера: {path}")
+    return path
+
+
+def _dir_size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def prune_profiles(site=None):
+    """Чистит свободные профили: давно не использованные удаляет, разросшийся кэш очищает.
+
+    Занятые профили (их блокировку держит работающий процесс) не трогаются. Возвращает число освобождённых байт.
+    """
+    root = profiles_dir(site)
+    if not root.exists():
+        return 0
+    freed = 0
+    now = time.time()
+    for path in sorted(root.glob("slot-*")):
+        # Возраст считается до блокировки: создание файла блокировки обновляет время изменения каталога
+        age = now - path.stat().st_mtime
+        handle = _try_slot(path)
+        if handle is None:
+            continue
+        try:
+            if age > PROFILE_MAX_AGE_DAYS * 86400:
+                size = _dir_size(path)
+                handle.close()
+                handle = None
+                shutil.rmtree(path, ignore_errors=True)
+                freed += size
+                logging.info(f"Удалён давно не использованный профиль браузера {path.name}")
+                continue
+            cache = path / CACHE_DIR_NAME
+            size = _dir_size(cache)
+            if size > PRUNE_CACHE_SIZE:
+                shutil.rmtree(cache, ignore_errors=True)
+                freed += size
+                logging.info(f"Очищен кэш профиля браузера {path.name}: {size / 2 ** 20:.0f} МБ")
+        finally:
+            if handle is not None:
+                handle.close()
+    return freed
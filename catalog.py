@@ -0,0 +1,175 @@
+# Каталог программ: обход направлений обучения со страницы /napravleniya и разбор страниц программ
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import threading
+from urllib.parse import urldefrag, urlsplit
+
+import retry
+import site_profiles
+from console import setup_console
+from lazy_selenium import WebDriverWait
+from timings import wait_timeout
+
+# Страницы программ устроены как страница MBA (category__title, category_info, FAQ) и разбираются её экстрактором
+program_page = importlib.import_module("DPO_master-of-business-administration-mba")
+
+# Настройки обхода по умолчанию; профиль сайта может переопределить их в ключе "catalog"
+CATALOG_DEFAULTS = {
+    "start_url": "https://academydpo.org/napravleniya",
+    # Ссылки берутся только из контентной части страниц, а не из меню и подвала
+    "link_selector": "div.page_line__body a[href], [class*='category'] a[href]",
+    # /napravleniya -> направление -> программа
+    "max_depth": 2,
+    "max_pages": 5000,
+    "browsers": 3,
+    "categories": ["Программы обучения", "Образование"],
+}
+
+# Браузер перезапускается после стольких страниц, чтобы не копить память Chrome
+PAGES_PER_BROWSER = 200
+# Ожидание загрузки одной страницы каталога
+PAGE_TIMEOUT = 20
+# Ссылки на файлы не обходятся
+SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".doc", ".docx", ".xls", ".xlsx", ".zip")
+
+_LINKS_SCRIPT = "return Array.from(document.querySelectorAll(arguments[0]), a => a.href);"
+
+
+def settings(site=None):
+    """Настройки обхода для сайта: значения по умолчанию с переопределениями профиля."""
+    return {**CATALOG_DEFAULTS, **site_profiles.get_profile(site).get("catalog", {})}
+
+
+def catalog_path(site=None):
+    """Путь к набору данных каталога текущего запуска."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return site_profiles.output_root(site) / "catalog" / f"programs_{timestamp}.jsonl"
+
+
+def normalize_link(href, host):
+    """Адрес для обхода без якоря или None, если ссылка ведёт на другой сайт или на файл."""
+    if not href:
+        return None
+    url = urldefrag(href)[0]
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or parts.hostname != host:
+        return None
+    if parts.path.lower().endswith(SKIP_EXTENSIONS):
+        return None
+    return url.rstrip("/")
+
+
+def visit(driver, url, follow_links, conf):
+    """Открывает страницу; возвращает (ссылки для обхода, запись программы или None)."""
+    retry.fetch_page(driver, url)
+    WebDriverWait(driver, wait_timeout(PAGE_TIMEOUT)).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+    links = driver.execute_script(_LINKS_SCRIPT, conf["link_selector"]) if follow_links else []
+    if not driver.find_elements(*program_page.SELECTORS["main_title"]):
+        return links, None
+    metadata = program_page.extract_metadata(driver, url)
+    metadata["categories"] = list(conf["categories"])
+    data = program_page.extract_program(driver)
+    return links, {"url": url, "metadata": metadata, "data": data}
+
+
+def crawl(site=None, path=None):
+    """Обходит каталог ограниченным пулом браузеров и пишет программы в JSON Lines. Возвращает число программ."""
+    conf = settings(site)
+    start_url = site_profiles.site_url(conf["start_url"], site=site).rstrip("/")
+    host = urlsplit(start_url).hostname
+    path = path or catalog_path(site)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".jsonl.tmp")
+
+    # Задание: (адрес, глубина, направление, попытка)
+    queue = retry.RetryQueue([(start_url, 0, None, 1)])
+    seen = {start_url}
+    lock = threading.Lock()
+    stats = {"pages": 0, "programs": 0, "failed": 0}
+
+    with open(tmp_path, "w", encoding="utf-8") as out:
+
+        def worker():
+            driver = None
+            used = 0
+            try:
+                while True:
+                    job = queue.get()
+                    if job is None:
+                        return
+                    url, depth, parent, attempt = job
+                    try:
+                        # Один браузер обслуживает много страниц и периодически перезапускается
+                        if driver is None or used >= PAGES_PER_BROWSER:
+                            if driver is not None:
+                                driver.quit()
+                            driver = program_page.get_driver()
+                            used = 0
+                        used += 1
+                        links, program = visit(driver, url, depth < conf["max_depth"], conf)
+                        with lock:
+                            stats["pages"] += 1
+                            for href in links:
+                                link = normalize_link(href, host)
+                                if link and link not in seen and len(seen) < conf["max_pages"]:
+                                    seen.add(link)
+                                    queue.put((link, depth + 1, url, 1))
+                            if program is not None:
+                                program["direction"] = parent
+                                out.write(json.dumps(program, ensure_ascii=False) + "\n")
+                                stats["programs"] += 1
+                    except Exception as e:
+                        # Браузер после ошибки может быть в неисправном состоянии — следующий запрос начнётся с нового
+                        if driver is not None:
+                            try:
+                                driver.quit()
+                            except Exception:
+                                pass
+                            driver = None
+                        if attempt < retry.MAX_ATTEMPTS:
+                            delay = retry.backoff_delay(attempt, retry.QUEUE_BASE_DELAY, retry.QUEUE_MAX_DELAY)
+                            logging.warning(f"Ошибка на странице {url}: {e}. Повтор через {delay:.1f} с")
+                            queue.put((url, depth, parent, attempt + 1), delay=delay)
+                        else:
+                            logging.error(f"Страница {url} пропущена после {attempt} попыток: {e}")
+                            with lock:
+                                stats["failed"] += 1
+                    finally:
+                        queue.task_done()
+            finally:
+                if driver is not None:
+                    driver.quit()
+
+        browsers = max(1, min(conf["browsers"], site_profiles.MAX_BROWSERS))
+        logging.info(f"Обход каталога с {start_url}: браузеров {browsers}, не больше {conf['max_pages']} страниц")
+        workers = [threading.Thread(target=worker, name=f"catalog-{n}") for n in range(browsers)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    os.replace(tmp_path, path)
+    logging.info(f"Каталог: страниц {stats['pages']}, программ {stats['programs']}, "
+                 f"не удалось открыть {stats['failed']}. Файл: {path}")
+    return stats["programs"]
+
+
+def main(argv=None):
+    setup_console()
+    parser = argparse.ArgumentParser(description="Обход направлений обучения и сбор каталога программ")
+    parser.add_argument("--site", choices=sorted(site_profiles.SITE_PROFILES), default=site_profiles.DEFAULT_SITE,
+                        help="профиль сайта")
+    args = parser.parse_args(argv)
+    # Экстрактор страницы программы берёт профиль сайта из окружения, как при запуске из оркестратора
+    os.environ["DPO_SITE"] = args.site
+    crawl(args.site)
+
+
+if __name__ == "__main__":
+    main()
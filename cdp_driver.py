@@ -0,0 +1,387 @@
+# Извлечение через Chrome DevTools Protocol: одно websocket-соединение со вкладкой вместо HTTP-запроса
+# к chromedriver на каждую команду. Браузер по-прежнему запускает chromedriver (профиль, опции, монитор те же),
+# а CdpDriver повторяет ту часть интерфейса WebDriver, которой пользуются парсеры.
+# В режиме вкладок (tab_host.py) скрипт не запускает свой Chrome, а открывает вкладку в общем браузере оркестратора
+import itertools
+import json
+import logging
+import os
+import time
+from urllib.request import Request, urlopen
+
+import command_stats
+import site_profiles
+from timings import wait_timeout
+
+# Включение для сайта: ключ driver_backend профиля ("webdriver" или "cdp"), на один запуск — DPO_DRIVER_BACKEND
+ENV_BACKEND = "DPO_DRIVER_BACKEND"
+# Адрес DevTools общего браузера, в котором скрипт открывает свою вкладку (задаёт оркестратор)
+ENV_BROWSER = "DPO_BROWSER_ADDRESS"
+# Ожидание загрузки страницы (как page load timeout WebDriver по умолчанию) и ответа на команду, секунд
+PAGE_LOAD_TIMEOUT = 300
+COMMAND_TIMEOUT = 30
+# Группа удалённых объектов: освобождается при переходе на другую страницу
+OBJECT_GROUP = "dpo"
+
+# Поиск элементов теми же способами, что и в WebDriver; this — окно (поиск по документу) или элемент
+_FIND_JS = """
+function(by, value, all) {
+    const root = (this === window) ? document : this;
+    let found;
+    if (by === "xpath") {
+        const snapshot = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        found = Array.from({length: snapshot.snapshotLength}, (_, i) => snapshot.snapshotItem(i));
+    } else if (by === "tag name") {
+        found = Array.from(root.getElementsByTagName(value));
+    } else if (by === "class name") {
+        found = Array.from(root.getElementsByClassName(value));
+    } else if (by === "id") {
+        found = Array.from(root.querySelectorAll("#" + CSS.escape(value)));
+    } else if (by === "name") {
+        found = Array.from(root.querySelectorAll("[name=\\"" + CSS.escape(value) + "\\"]"));
+    } else if (by === "link text" || by === "partial link text") {
+        found = Array.from(root.querySelectorAll("a")).filter(a => {
+            const text = (a.innerText || "").trim();
+            return by === "link text" ? text === value : text.includes(value);
+        });
+    } else {
+        found = Array.from(root.querySelectorAll(value));
+    }
+    return all ? found : (found[0] || null);
+}
+"""
+# Текст и тег всех найденных элементов одним вызовом (для find_elements)
+_PREFETCH_JS = "function() { return this.map(e => [e.innerText || '', e.tagName.toLowerCase()]); }"
+# Значение атрибута по правилам WebDriver: у href/src и подобных — свойство (абсолютный адрес), иначе атрибут
+_ATTRIBUTE_JS = """
+function(name) {
+    if (name === "class" || name === "className") return this.getAttribute("class");
+    const property = this[name];
+    if (typeof property === "boolean") return property ? "true" : null;
+    if (property !== undefined && property !== null && typeof property !== "object" && typeof property !== "function") {
+        return String(property);
+    }
+    return this.getAttribute(name);
+}
+"""
+_DISPLAYED_JS = """
+function() {
+    if (this.checkVisibility) return this.checkVisibility({checkOpacity: true, checkVisibilityCSS: true});
+    return !!(this.offsetWidth || this.offsetHeight || this.getClientRects().length);
+}
+"""
+
+
+class CdpError(Exception):
+    """Ошибка команды DevTools или исключение в скрипте страницы."""
+
+
+def backend(site=None):
+    """Выбранный способ извлечения: "webdriver" (по умолчанию) или "cdp"."""
+    return os.environ.get(ENV_BACKEND) or site_profiles.get_profile(site).get("driver_backend", "webdriver")
+
+
+def attach_backend(driver, site=None):
+    """Возвращает драйвер для парсера: CdpDriver поверх запущенного Chrome, если он выбран, иначе сам driver.
+
+    Если подключиться по DevTools не удалось, скрипт продолжает работать через WebDriver.
+    Команды возвращённого драйвера учитываются (command_stats).
+    """
+    if driver is None or backend(site) != "cdp":
+        return command_stats.instrument(driver)
+    try:
+        return command_stats.instrument(CdpDriver.attach(driver))
+    except Exception as e:
+        logging.warning(f"Не удалось подключиться к Chrome по DevTools, используется WebDriver: {e}")
+        return command_stats.instrument(driver)
+
+
+def open_tab():
+    """Драйвер новой вкладки в общем браузере оркестратора или None, если режим вкладок не включён.
+
+    Если вкладку открыть не удалось, скрипт запускает собственный Chrome как обычно.
+    """
+    address = os.environ.get(ENV_BROWSER)
+    if not address:
+        return None
+    try:
+        return command_stats.instrument(CdpDriver.new_tab(address))
+    except Exception as e:
+        logging.warning(f"Не удалось открыть вкладку в общем браузере {address}, запускается свой Chrome: {e}")
+        return None
+
+
+def _devtools_json(address, path, method="GET"):
+    """Запрос к HTTP-интерфейсу DevTools браузера (/json/...)."""
+    with urlopen(Request(f"http://{address}{path}", method=method), timeout=COMMAND_TIMEOUT) as response:
+        body = response.read()
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode("utf-8", "replace")
+
+
+def _no_such_element(message):
+    """Исключение, которое WebDriverWait пропускает при ожидании элемента."""
+    try:
+        from selenium.common.exceptions import NoSuchElementException
+    except ImportError:
+        return CdpError(message)
+    return NoSuchElementException(message)
+
+
+class CdpConnection:
+    """Websocket-соединение со вкладкой. Команды можно отправить пачкой и затем собрать ответы по номерам."""
+
+    def __init__(self, url):
+        import websocket  # websocket-client, зависимость selenium
+
+        self.ws = websocket.create_connection(url, timeout=COMMAND_TIMEOUT, suppress_origin=True)
+        self._ids = itertools.count(1)
+        self._responses = {}
+        self.events = []
+
+    def send(self, method, **params):
+        """Отправляет команду, не дожидаясь ответа. Возвращает её номер."""
+        command_id = next(self._ids)
+        self.ws.send(json.dumps({"id": command_id, "method": method, "params": params}))
+        return command_id
+
+    def _read(self, timeout):
+        self.ws.settimeout(timeout)
+        message = json.loads(self.ws.recv())
+        if "id" in message:
+            self._responses[message["id"]] = message
+        else:
+            self.events.append(message)
+
+    def result(self, command_id, timeout=COMMAND_TIMEOUT):
+        """Ждёт ответ на команду; события, пришедшие раньше, сохраняются в events."""
+        deadline = time.monotonic() + timeout
+        while command_id not in self._responses:
+            self._read(max(0.001, deadline - time.monotonic()))
+        message = self._responses.pop(command_id)
+        if "error" in message:
+            raise CdpError(f"{message['error'].get('message')} ({message['error'].get('code')})")
+        return message.get("result", {})
+
+    def call(self, method, **params):
+        return self.result(self.send(method, **params))
+
+    def pipeline(self, *commands):
+        """Отправляет команды (метод, параметры) подряд и собирает ответы — одно ожидание на всю пачку."""
+        ids = [self.send(method, **params) for method, params in commands]
+        return [self.result(command_id) for command_id in ids]
+
+    def wait_event(self, method, timeout):
+        """Ждёт событие method. Возвращает его параметры или None по таймауту."""
+        deadline = time.monotonic() + timeout
+        while True:
+            for index, event in enumerate(self.events):
+                if event.get("method") == method:
+                    return self.events.pop(index).get("params", {})
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                self._read(remaining)
+            except Exception as e:
+                if type(e).__name__ == "WebSocketTimeoutException":
+                    return None
+                raise
+
+    def close(self):
+        self.ws.close()
+
+
+class CdpElement:
+    """Элемент страницы по ссылке DevTools (objectId) с интерфейсом WebElement, которым пользуются парсеры."""
+
+    def __init__(self, driver, object_id, prefetched=None):
+        self._driver = driver
+        self.object_id = object_id
+        # Текст и тег, полученные вместе с поиском; действительны, пока страница не менялась через этот драйвер
+        self._prefetched = prefetched
+        self._generation = driver.generation
+
+    def _call(self, function, *args):
+        return self._driver.call_function(self.object_id, function, args)
+
+    def _cached(self, index):
+        if self._prefetched is not None and self._generation == self._driver.generation:
+            return self._prefetched[index]
+        return None
+
+    @property
+    def text(self):
+        cached = self._cached(0)
+        return cached if cached is not None else (self._call("function() { return this.innerText || ''; }") or "")
+
+    @property
+    def tag_name(self):
+        cached = self._cached(1)
+        return cached if cached is not None else self._call("function() { return this.tagName.toLowerCase(); }")
+
+    def get_attribute(self, name):
+        return self._call(_ATTRIBUTE_JS, name)
+
+    def is_displayed(self):
+        return bool(self._call(_DISPLAYED_JS))
+
+    def is_enabled(self):
+        return not self._call("function() { return !!this.disabled; }")
+
+    def click(self):
+        self._driver.generation += 1
+        self._call("function() { this.scrollIntoView({block: 'center'}); this.click(); }")
+
+    def find_element(self, by, value):
+        return self._driver.find_in(self.object_id, by, value)
+
+    def find_elements(self, by, value):
+        return self._driver.find_all_in(self.object_id, by, value)
+
+
+class CdpDriver:
+    """Драйвер поверх DevTools-соединения с одной вкладкой.
+
+    Поддерживает get, find_element(s), execute_script и quit, а также работу WebDriverWait/expected_conditions.
+    Поверх сессии chromedriver (attach) остальные атрибуты берутся у исходного WebDriver; вкладка общего
+    браузера (new_tab) закрывается при quit, сам браузер остаётся оркестратору.
+    """
+
+    def __init__(self, address, target, driver=None):
+        self.driver = driver
+        self.address = address
+        self.target_id = target["id"]
+        self.generation = 0
+        self._window = None
+        self.cdp = CdpConnection(target["webSocketDebuggerUrl"])
+        self.cdp.call("Page.enable")
+
+    @classmethod
+    def attach(cls, driver):
+        """Подключается к вкладке, которую открыл chromedriver."""
+        address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        page = next(target for target in _devtools_json(address, "/json/list") if target.get("type") == "page")
+        logging.info(f"Извлечение через DevTools: {address}")
+        return cls(address, page, driver)
+
+    @classmethod
+    def new_tab(cls, address):
+        """Открывает новую вкладку в общем браузере. У каждой вкладки своё соединение, события и ожидания."""
+        target = _devtools_json(address, "/json/new?about:blank", method="PUT")
+        try:
+            tab = cls(address, target)
+        except Exception:
+            _devtools_json(address, f"/json/close/{target['id']}")
+            raise
+        # Фоновые вкладки не должны притормаживать таймеры и отрисовку: страница считает себя активной
+        try:
+            tab.cdp.pipeline(("Emulation.setFocusEmulationEnabled", {"enabled": True}),
+                             ("Page.setWebLifecycleState", {"state": "active"}))
+        except CdpError as e:
+            logging.debug(f"Вкладка {target['id']}: не удалось включить активный режим: {e}")
+        logging.info(f"Вкладка {target['id']} в общем браузере {address}")
+        return tab
+
+    def __getattr__(self, name):
+        driver = self.__dict__.get("driver")
+        if driver is None:
+            raise AttributeError(name)
+        return getattr(driver, name)
+
+    def get(self, url):
+        """Открывает адрес и ждёт события load, как WebDriver со стратегией загрузки normal."""
+        self.generation += 1
+        self._window = None
+        self.cdp.events.clear()
+        self.cdp.call("Runtime.releaseObjectGroup", objectGroup=OBJECT_GROUP)
+        result = self.cdp.call("Page.navigate", url=url)
+        if result.get("errorText"):
+            raise CdpError(f"Не удалось открыть {url}: {result['errorText']}")
+        if self.cdp.wait_event("Page.loadEventFired", wait_timeout(PAGE_LOAD_TIMEOUT)) is None:
+            raise CdpError(f"Страница {url} не загрузилась за отведённое время")
+
+    def _window_id(self):
+        if self._window is None:
+            self._window = self.cdp.call("Runtime.evaluate", expression="window",
+                                         objectGroup=OBJECT_GROUP)["result"]["objectId"]
+        return self._window
+
+    def _call_raw(self, object_id, function, args, by_value):
+        arguments = [{"objectId": arg.object_id} if isinstance(arg, CdpElement) else {"value": arg} for arg in args]
+        result = self.cdp.call("Runtime.callFunctionOn", functionDeclaration=function, objectId=object_id,
+                               arguments=arguments, returnByValue=by_value, objectGroup=OBJECT_GROUP)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CdpError(details.get("exception", {}).get("description") or details.get("text"))
+        return result["result"]
+
+    def call_function(self, object_id, function, args=(), by_value=True):
+        """Вызывает функцию JavaScript с this = объект object_id; результат по значению."""
+        return self._call_raw(object_id, function, args, by_value).get("value")
+
+    def _find(self, object_id, by, value):
+        remote = self._call_raw(object_id, _FIND_JS, (by, value, False), by_value=False)
+        if remote.get("subtype") == "null" or "objectId" not in remote:
+            raise _no_such_element(f"Элемент не найден: {by}={value}")
+        return CdpElement(self, remote["objectId"])
+
+    def _find_all(self, object_id, by, value):
+        array = self._call_raw(object_id, _FIND_JS, (by, value, True), by_value=False)["objectId"]
+        # Ссылки на элементы и их текст с тегом запрашиваются одной пачкой
+        properties, prefetch = self.cdp.pipeline(
+            ("Runtime.getProperties", {"objectId": array, "ownProperties": True}),
+            ("Runtime.callFunctionOn", {"functionDeclaration": _PREFETCH_JS, "objectId": array,
+                                        "returnByValue": True}),
+        )
+        values = prefetch["result"].get("value") or []
+        elements = []
+        for prop in properties["result"]:
+            if prop["name"].isdigit() and "objectId" in prop.get("value", {}):
+                index = int(prop["name"])
+                elements.append((index, CdpElement(self, prop["value"]["objectId"],
+                                                   values[index] if index < len(values) else None)))
+        return [element for _, element in sorted(elements, key=lambda pair: pair[0])]
+
+    def find_element(self, by, value):
+        return self._retry_context(self._find, by, value)
+
+    def find_elements(self, by, value):
+        return self._retry_context(self._find_all, by, value)
+
+    def find_in(self, object_id, by, value):
+        return self._find(object_id, by, value)
+
+    def find_all_in(self, object_id, by, value):
+        return self._find_all(object_id, by, value)
+
+    def _retry_context(self, find, by, value):
+        """Поиск от окна; если страница сменилась сама (ссылка окна устарела), окно запрашивается заново."""
+        try:
+            return find(self._window_id(), by, value)
+        except CdpError as e:
+            if "Cannot find context" not in str(e) and "Could not find object" not in str(e):
+                raise
+            self._window = None
+            return find(self._window_id(), by, value)
+
+    def execute_script(self, script, *args):
+        """Выполняет скрипт как WebDriver: тело функции с arguments; элемент в ответе возвращается как CdpElement."""
+        self.generation += 1
+        remote = self._call_raw(self._window_id(), f"function() {{\n{script}\n}}", args, by_value=False)
+        if remote.get("subtype") == "node":
+            return CdpElement(self, remote["objectId"])
+        if "objectId" not in remote:
+            return remote.get("value")
+        return self.call_function(remote["objectId"], "function() { return this; }")
+
+    def quit(self):
+        try:
+            self.cdp.close()
+        finally:
+            if self.driver is not None:
+                self.driver.quit()
+            else:
+                _devtools_json(self.address, f"/json/close/{self.target_id}")
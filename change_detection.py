@@ -0,0 +1,174 @@
+# Поиск изменений между запусками по страницам и разделам
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import publish
+import records
+
+# Поля метаданных, которые меняются при каждом запуске и не должны влиять на сравнение
+VOLATILE_METADATA = ("date",)
+
+# Снимок хешей прошлого запуска хранится рядом с записями страниц
+SNAPSHOT_NAME = "_snapshot.json"
+
+
+def _digest(value):
+    """SHA-1 от канонического JSON-представления значения."""
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _items(data):
+    """Приводит данные парсера к списку пар (тип, содержимое)."""
+    if isinstance(data, dict):
+        return [(key, value) for key, value in data.items()]
+    items = []
+    for item in data or []:
+        if isinstance(item, (list, tuple)) and len(item) == 2 and isinstance(item[0], str):
+            items.append((item[0], item[1]))
+        else:
+            items.append(("item", item))
+    return items
+
+
+def section_hashes(data):
+    """Возвращает словарь {ключ раздела: хеш} для данных страницы.
+
+    Разделы с заголовком идентифицируются по заголовку, остальные — по типу и порядковому номеру,
+    поэтому вставка нового раздела не помечает изменёнными все последующие.
+    """
+    hashes = {}
+    counters = {}
+    for kind, payload in _items(data):
+        if isinstance(payload, dict) and payload.get("title"):
+            key = f"{kind}: {payload['title']}"
+        else:
+            counters[kind] = counters.get(kind, 0) + 1
+            key = f"{kind} #{counters[kind]}"
+        while key in hashes:
+            key += "'"
+        hashes[key] = _digest(payload)
+    return hashes
+
+
+def build_record(data, url, metadata):
+    """Формирует запись страницы с хешами для сравнения."""
+    stable_metadata = {k: v for k, v in (metadata or {}).items() if k not in VOLATILE_METADATA}
+    sections = section_hashes(data)
+    return {
+        "url": url,
+        "metadata": metadata or {},
+        "data": data,
+        "sections": sections,
+        "digest": _digest({"url": url, "metadata": stable_metadata, "sections": sections}),
+    }
+
+
+def store_page(script, data, url, metadata, output=None):
+    """Сохраняет записи страницы и сообщает, нужно ли перерисовывать Markdown.
+
+    Возвращает False, только если страница совпадает с прошлым запуском и файл output уже существует.
+    Пустой результат парсинга не перезаписывает прошлые записи.
+    """
+    if not data:
+        return True
+    record = build_record(data, url, metadata)
+    previous = records.load_record(script)
+    unchanged = previous is not None and previous.get("digest") == record["digest"]
+    if unchanged and output is not None and Path(output).exists():
+        publish.mark_unchanged(output)
+        return False
+    records.save_record(script, record)
+    return True
+
+
+def build_snapshot(directory=None):
+    """Собирает снимок {страница: {digest, sections}} из хранилища записей."""
+    return {
+        name: {"digest": record.get("digest"), "sections": record.get("sections", {})}
+        for name, record in records.iter_records(directory)
+    }
+
+
+def snapshot_path(directory=None):
+    """Путь к снимку прошлого запуска в каталоге записей."""
+    return Path(directory or records.records_dir()) / SNAPSHOT_NAME
+
+
+def load_snapshot(path):
+    """Загружает снимок прошлого запуска (пустой словарь, если его нет)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_snapshot(snapshot, path):
+    """Сохраняет снимок текущего запуска для следующего сравнения."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def diff_snapshots(previous, current):
+    """Сравнивает два снимка и возвращает изменения по страницам и разделам."""
+    diff = {"added": [], "removed": [], "changed": {}, "unchanged": []}
+    for name in sorted(set(previous) | set(current)):
+        if name not in previous:
+            diff["added"].append(name)
+            continue
+        if name not in current:
+            diff["removed"].append(name)
+            continue
+        old, new = previous[name], current[name]
+        # Совпадение общего хеша страницы — разделы можно не сравнивать
+        if old.get("digest") == new.get("digest"):
+            diff["unchanged"].append(name)
+            continue
+        old_sections, new_sections = old.get("sections", {}), new.get("sections", {})
+        diff["changed"][name] = {
+            "added": [key for key in new_sections if key not in old_sections],
+            "removed": [key for key in old_sections if key not in new_sections],
+            "changed": [key for key in new_sections
+                        if key in old_sections and old_sections[key] != new_sections[key]],
+        }
+    return diff
+
+
+def format_report(diff, title="Изменения"):
+    """Формирует компактный Markdown-отчёт об изменениях."""
+    lines = [f"# {title}", ""]
+    lines.append(f"Без изменений: {len(diff['unchanged'])}, изменено: {len(diff['changed'])}, "
+                 f"новых: {len(diff['added'])}, удалено: {len(diff['removed'])}")
+    lines.append("")
+    for name in diff["added"]:
+        lines.append(f"- {name}: новая страница")
+    for name in diff["removed"]:
+        lines.append(f"- {name}: страница пропала")
+    for name, sections in diff["changed"].items():
+        if not any(sections.values()):
+            lines.append(f"- {name}: изменены метаданные")
+            continue
+        lines.append(f"- {name}:")
+        for label, key in (("изменён", "changed"), ("добавлен", "added"), ("удалён", "removed")):
+            for section in sections[key]:
+                lines.append(f"  - {label}: {section}")
+    return "\n".join(lines) + "\n"
+
+
+def write_change_report(report_path, title="Изменения", directory=None):
+    """Сравнивает текущие записи с прошлым снимком, пишет отчёт и обновляет снимок."""
+    current = build_snapshot(directory)
+    diff = diff_snapshots(load_snapshot(snapshot_path(directory)), current)
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(format_report(diff, title))
+    save_snapshot(current, snapshot_path(directory))
+    return diff
@@ -0,0 +1,216 @@
+# Учёт команд драйвера: сколько обращений к браузеру делает страница, каких и откуда в коде парсера.
+# Драйвер скрипта оборачивается при создании (cdp_driver.attach_backend/open_tab); сводка уходит оркестратору
+import atexit
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Файл, в который скрипт страницы записывает сводку при выходе (задаёт оркестратор)
+ENV_STATS = "DPO_COMMAND_STATS"
+# Верхние границы корзин гистограммы задержек, мс; последняя корзина — всё, что дольше
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Сколько мест вызова показывать в отчёте для каждой страницы
+TOP_CALL_SITES = 10
+# Кадры драйвера и его обёрток: место вызова — первый кадр вне их
+_DRIVER_FRAMES = re.compile(r"[\\/](selenium|websocket)[\\/]|[\\/](cdp_driver|command_stats|lazy_selenium)\.py$")
+
+
+def _bucket(seconds):
+    milliseconds = seconds * 1000
+    for index, bound in enumerate(BUCKETS_MS):
+        if milliseconds <= bound:
+            return index
+    return len(BUCKETS_MS)
+
+
+def _new_entry():
+    return {"count": 0, "seconds": 0.0, "histogram": [0] * (len(BUCKETS_MS) + 1), "commands": {}}
+
+
+def call_site():
+    """Место в коде парсера, откуда ушла команда: "файл:строка функция"."""
+    frame = sys._getframe(1)
+    while frame is not None and _DRIVER_FRAMES.search(frame.f_code.co_filename):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{Path(frame.f_code.co_filename).name}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class CommandStats:
+    """Счётчики команд страницы: по типам, общая гистограмма задержек и то же по местам вызова."""
+
+    def __init__(self):
+        self.page = _new_entry()
+        self.call_sites = {}
+        self._lock = threading.Lock()
+
+    def record(self, command, seconds, site):
+        bucket = _bucket(seconds)
+        with self._lock:
+            for entry in (self.page, self.call_sites.setdefault(site, _new_entry())):
+                entry["count"] += 1
+                entry["seconds"] += seconds
+                entry["histogram"][bucket] += 1
+                entry["commands"][command] = entry["commands"].get(command, 0) + 1
+
+    def to_dict(self):
+        with self._lock:
+            return {**self.page, "seconds": round(self.page["seconds"], 3),
+                    "call_sites": {site: {**entry, "seconds": round(entry["seconds"], 3)}
+                                   for site, entry in self.call_sites.items()}}
+
+
+# Счётчики этого процесса (один скрипт — одна страница)
+STATS = CommandStats()
+_REGISTERED = False
+
+
+def _count_webdriver(driver):
+    """Все команды WebDriver, в том числе команды элементов, проходят через driver.execute."""
+    execute = driver.execute
+
+    def counted(driver_command, params=None):
+        site = call_site()
+        started = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            STATS.record(driver_command, time.perf_counter() - started, site)
+
+    driver.execute = counted
+
+
+def _count_cdp(connection):
+    """Команды DevTools считаются от отправки до ответа, поэтому пачка команд видна как одновременные запросы."""
+    send, result = connection.send, connection.result
+    pending = {}
+
+    def counted_send(method, **params):
+        command_id = send(method, **params)
+        pending[command_id] = (method, time.perf_counter(), call_site())
+        return command_id
+
+    def counted_result(command_id, *args, **kwargs):
+        try:
+            return result(command_id, *args, **kwargs)
+        finally:
+            if command_id in pending:
+                method, started, site = pending.pop(command_id)
+                STATS.record(method, time.perf_counter() - started, site)
+
+    connection.send = counted_send
+    connection.result = counted_result
+
+
+def instrument(driver):
+    """Включает учёт команд для драйвера скрипта (WebDriver или CdpDriver) и возвращает его же."""
+    global _REGISTERED
+    if driver is None or driver.__dict__.get("_command_stats"):
+        return driver
+    # CdpDriver: своё соединение DevTools и, при подключении к chromedriver, исходный WebDriver
+    targets = [driver.__dict__.get("cdp"), driver.__dict__.get("driver")] if "cdp" in driver.__dict__ else [driver]
+    for target in targets:
+        if target is None or target.__dict__.get("_command_stats"):
+            continue
+        if hasattr(target, "pipeline"):
+            _count_cdp(target)
+        elif hasattr(target, "execute"):
+            _count_webdriver(target)
+        target._command_stats = True
+    driver._command_stats = True
+    if not _REGISTERED:
+        atexit.register(dump)
+        _REGISTERED = True
+    return driver
+
+
+def dump():
+    """Сохраняет сводку для оркестратора (при выходе скрипта) или пишет её в журнал при ручном запуске."""
+    stats = STATS.to_dict()
+    path = os.environ.get(ENV_STATS)
+    if not path:
+        logging.info(f"Команд драйвера: {stats['count']} за {stats['seconds']:.2f} с")
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def collect(path):
+    """Читает сводку, записанную скриптом, и удаляет файл. None, если скрипт её не оставил."""
+    path = Path(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def percentile(histogram, fraction):
+    """Оценка перцентиля задержки по гистограмме (верхняя граница корзины), мс."""
+    total = sum(histogram)
+    if not total:
+        return 0
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= total * fraction:
+            return BUCKETS_MS[index] if index < len(BUCKETS_MS) else float("inf")
+    return float("inf")
+
+
+def _histogram_text(histogram):
+    labels = [f"≤{bound}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+    return ", ".join(f"{label}: {count}" for label, count in zip(labels, histogram) if count)
+
+
+def _top_commands(commands, limit=3):
+    return ", ".join(f"{name} ×{count}" for name, count in sorted(commands.items(), key=lambda pair: -pair[1])[:limit])
+
+
+def format_report(stats, title):
+    """Markdown-отчёт о командах драйвера по страницам (больше всего команд — первыми) и местам вызова."""
+    lines = [f"# {title}", ""]
+    if not stats:
+        lines.append("Нет данных о командах драйвера.")
+        return "\n".join(lines) + "\n"
+    histogram = [sum(counts) for counts in zip(*(item["histogram"] for item in stats.values()))]
+    lines.append(f"Страниц: {len(stats)}, команд всего: {sum(item['count'] for item in stats.values())}, "
+                 f"время в командах: {sum(item['seconds'] for item in stats.values()):.1f} с, "
+                 f"p50 ≤ {percentile(histogram, 0.5)} мс, p95 ≤ {percentile(histogram, 0.95)} мс")
+    lines.append("")
+    lines.append(f"Задержки, мс: {_histogram_text(histogram)}")
+    lines.append("")
+    lines.append("| Страница | Команд | Время, с | p50, мс | p95, мс | Частые команды |")
+    lines.append("|---|---|---|---|---|---|")
+    ordered = sorted(stats.items(), key=lambda pair: -pair[1]["count"])
+    for page, item in ordered:
+        lines.append(f"| {page} | {item['count']} | {item['seconds']:.2f} | {percentile(item['histogram'], 0.5)} | "
+                     f"{percentile(item['histogram'], 0.95)} | {_top_commands(item['commands'])} |")
+    for page, item in ordered:
+        if not item["call_sites"]:
+            continue
+        lines.extend(["", f"## {page}", "",
+                      "| Место вызова | Команд | Время, с | Команды | Задержки, мс |", "|---|---|---|---|---|"])
+        call_sites = sorted(item["call_sites"].items(), key=lambda pair: -pair[1]["count"])
+        for site, entry in call_sites[:TOP_CALL_SITES]:
+            lines.append(f"| {site} | {entry['count']} | {entry['seconds']:.2f} | {_top_commands(entry['commands'])} | "
+                         f"{_histogram_text(entry['histogram'])} |")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report_path, stats, title="Команды драйвера"):
+    """Записывает отчёт о командах драйвера."""
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(format_report(stats, title))
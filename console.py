@@ -0,0 +1,16 @@
+# Настройка консоли и логирования; вызывается из точки входа скрипта, а не при импорте модуля
+import logging
+import sys
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def setup_console(*handlers, log_format=LOG_FORMAT):
+    """Переключает консоль на UTF-8 и настраивает логирование в переданные обработчики и stdout."""
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+    logging.basicConfig(
+        level=logging.INFO,
+        format=log_format,
+        handlers=[*handlers, logging.StreamHandler(sys.stdout)]
+    )
@@ -0,0 +1,185 @@
+# Загрузка связанных документов (PDF) и извлечение их текста для записей страниц
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import records
+import site_profiles
+from http_pool import get_session
+from timings import wait_timeout
+
+# Документы крупнее этого размера не загружаются
+MAX_DOCUMENT_BYTES = 25 * 1024 * 1024
+DOWNLOAD_CHUNK = 64 * 1024
+# Таймаут соединения и чтения одного документа (чтение ограничено и дедлайном страницы)
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+# Процессы для извлечения текста: разбор PDF нагружает процессор, потоки здесь не помогают
+EXTRACT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Кэш извлечённого текста по SHA-256 содержимого лежит рядом с записями страниц
+CACHE_DIR_NAME = "documents"
+
+# Ссылка в формате Markdown, как её записывают скрипты: [текст](адрес)
+_LINK_RE = re.compile(r"^\[(.*)\]\((\S+)\)$")
+
+
+def cache_dir():
+    """Каталог кэша текстов документов."""
+    return records.records_dir() / CACHE_DIR_NAME
+
+
+def is_pdf(url, content=None):
+    """PDF определяется по сигнатуре содержимого, а до загрузки — по расширению в адресе."""
+    if content is not None:
+        return content[:5] == b"%PDF-"
+    return url.lower().split("?")[0].endswith(".pdf")
+
+
+def download(url):
+    """Загружает документ через общий пул соединений; None, если он недоступен или больше MAX_DOCUMENT_BYTES."""
+    try:
+        with get_session().get(url, stream=True, timeout=(CONNECT_TIMEOUT, wait_timeout(READ_TIMEOUT))) as response:
+            response.raise_for_status()
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > MAX_DOCUMENT_BYTES:
+                logging.warning(f"Документ {url} пропущен: {int(length)} байт больше лимита")
+                return None
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                size += len(chunk)
+                if size > MAX_DOCUMENT_BYTES:
+                    logging.warning(f"Документ {url} пропущен: больше {MAX_DOCUMENT_BYTES} байт")
+                    return None
+                chunks.append(chunk)
+            metrics.count("bytes_fetched", size)
+            return b"".join(chunks)
+    except Exception as e:
+        logging.error(f"Ошибка при загрузке документа {url}: {e}")
+        return None
+
+
+def extract_pdf_pages(content):
+    """Извлекает текст PDF постранично (выполняется в отдельном процессе)."""
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+def _extract_or_none(digest, content):
+    """Извлекает текст в текущем процессе; ошибка разбора — None."""
+    try:
+        return extract_pdf_pages(content)
+    except Exception as e:
+        logging.error(f"Ошибка при извлечении текста документа {digest[:12]}: {e}")
+        return None
+
+
+def load_cached(digest):
+    """Текст документа из кэша по хешу содержимого или None."""
+    try:
+        with open(cache_dir() / f"{digest}.json", "r", encoding="utf-8") as f:
+            return json.load(f)["pages"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_cached(digest, pages):
+    """Сохраняет текст документа в кэш (через временный файл)."""
+    path = cache_dir() / f"{digest}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pages": pages}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def ingest_documents(urls):
+    """Загружает документы параллельно и извлекает текст PDF.
+
+    Возвращает {адрес: {"sha256", "size", "pages"}} только для успешно обработанных документов.
+    Уже встречавшееся содержимое (по SHA-256) берётся из кэша без повторного разбора.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    pool_size = site_profiles.get_profile().get("http_pool_size", 10)
+    with ThreadPoolExecutor(max_workers=min(pool_size, len(urls))) as pool:
+        contents = dict(zip(urls, pool.map(download, urls)))
+
+    results = {}
+    pending = {}
+    for url, content in contents.items():
+        if content is None:
+            continue
+        if not is_pdf(url, content):
+            logging.info(f"Документ {url} не является PDF, текст не извлекается")
+            continue
+        digest = hashlib.sha256(content).hexdigest()
+        results[url] = {"sha256": digest, "size": len(content), "pages": load_cached(digest)}
+        if results[url]["pages"] is None:
+            pending.setdefault(digest, content)
+            metrics.count("documents_cache_misses")
+        else:
+            metrics.count("documents_cache_hits")
+
+    if pending:
+        logging.info(f"Извлечение текста из документов: {len(pending)}, из кэша: {len(results) - len(pending)}")
+        extracted = {}
+        if len(pending) == 1:
+            for digest, content in pending.items():
+                extracted[digest] = _extract_or_none(digest, content)
+        else:
+            # multiprocessing подключается только когда действительно нужен пул процессов
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(EXTRACT_WORKERS, len(pending))) as pool:
+                futures = {digest: pool.submit(extract_pdf_pages, content) for digest, content in pending.items()}
+                for digest, future in futures.items():
+                    try:
+                        extracted[digest] = future.result()
+                    except Exception as e:
+                        logging.error(f"Ошибка при извлечении текста документа {digest[:12]}: {e}")
+                        extracted[digest] = None
+        for digest, pages in extracted.items():
+            if pages is not None:
+                save_cached(digest, pages)
+                metrics.count("pdf_pages_parsed", len(pages))
+        for url, info in list(results.items()):
+            if info["pages"] is None:
+                info["pages"] = extracted.get(info["sha256"])
+                if info["pages"] is None:
+                    del results[url]
+    return results
+
+
+def document_items(data, kinds=("content",)):
+    """Находит ссылки на документы в списках страницы и возвращает разделы ("document", {...}) с их текстом."""
+    links = {}
+    for kind, payload in data:
+        if kind not in kinds or not isinstance(payload, list):
+            continue
+        for line in payload:
+            match = _LINK_RE.match(line.strip()) if isinstance(line, str) else None
+            # Расширение в адресе не обязательно: PDF распознаётся по содержимому после загрузки
+            if match and match.group(2).startswith(("http://", "https://")):
+                links.setdefault(match.group(2), match.group(1))
+    ingested = ingest_documents(links)
+    logging.info(f"Связанных документов: {len(links)}, текст получен: {len(ingested)}")
+    return [
+        ("document", {
+            "title": title,
+            "url": url,
+            "sha256": ingested[url]["sha256"],
+            "size": ingested[url]["size"],
+            "text": "\n\n".join(page.strip() for page in ingested[url]["pages"] if page.strip()),
+        })
+        for url, title in links.items() if url in ingested
+    ]
@@ -0,0 +1,45 @@
+# Извлечение пар «вопрос — ответ» за один проход по DOM
+
+# Скрипт выполняется в браузере одним вызовом: для каждого заголовка ищется ближайший следующий
+# соседний блок ответа, а если соседа нет — ответ с тем же порядковым номером в документе
+_FAQ_SCRIPT = """
+const [titleSelector, answerSelector, partsSelector, stripSelector] = arguments;
+const text = el => (el.innerText || el.textContent || "").trim();
+const answers = Array.from(document.querySelectorAll(answerSelector));
+return Array.from(document.querySelectorAll(titleSelector)).map((titleEl, index) => {
+    let title = text(titleEl);
+    if (stripSelector) {
+        titleEl.querySelectorAll(stripSelector).forEach(el => {
+            const extra = text(el);
+            if (extra) title = title.replace(extra, "").trim();
+        });
+    }
+    let answer = titleEl.nextElementSibling;
+    while (answer && !answer.matches(answerSelector)) answer = answer.nextElementSibling;
+    if (!answer) answer = answers[index] || null;
+    const parts = [];
+    if (answer) {
+        const elements = partsSelector ? Array.from(answer.querySelectorAll(partsSelector)) : [answer];
+        elements.forEach(el => {
+            const value = text(el);
+            if (value) parts.push([el.tagName.toLowerCase(), value]);
+        });
+    }
+    return [title, parts];
+});
+"""
+
+
+def extract_faq(driver, title_selector, answer_selector, parts_selector=None, strip_selector=None):
+    """Возвращает список {"title", "content"} для всех вопросов страницы за одно обращение к браузеру.
+
+    Селекторы — CSS. parts_selector делит ответ на абзацы (например, "p, li"), без него ответ
+    берётся целиком; элементы списка помечаются «• ». strip_selector удаляет из заголовка
+    текст вложенных служебных элементов (кнопок раскрытия и т. п.).
+    """
+    pairs = driver.execute_script(_FAQ_SCRIPT, title_selector, answer_selector, parts_selector, strip_selector) or []
+    items = []
+    for title, parts in pairs:
+        content = [f"• {value}" if tag == "li" else value for tag, value in parts]
+        items.append({"title": title, "content": content})
+    return items
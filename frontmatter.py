@@ -0,0 +1,137 @@
+# Быстрая запись YAML-метаданных (front matter) для Markdown-файлов
+import functools
+import re
+import sys
+
+# Ширина строки по умолчанию у эмиттера PyYAML
+DEFAULT_WIDTH = 80
+# libyaml принимает только целую ширину, float("inf") заменяется на «бесконечную» целую
+UNLIMITED_WIDTH = 10 ** 9
+
+_STR_TAG = "tag:yaml.org,2002:str"
+# Символы, которые эмиттер выводит без экранирования при allow_unicode=True
+_SAFE_RANGES = ((0x20, 0x7E), (0xA0, 0x2027), (0x202A, 0xD7FF), (0xE000, 0xFEFE), (0xFF00, 0xFFFD))
+# Индикаторы, с которых не может начинаться plain-скаляр
+_PLAIN_FIRST = set("#,[]{}&*!|>'\"%@`")
+# Индикаторы, запрещённые в начале plain-скаляра, только если за ними идёт пробел
+_PLAIN_FIRST_BEFORE_SPACE = set("?:-")
+
+
+@functools.lru_cache(maxsize=None)
+def _unsafe_chars():
+    """Регулярное выражение для символов вне _SAFE_RANGES (компилируется при первом использовании — около 10 мс)."""
+    return re.compile("[^" + "".join(f"{chr(low)}-{chr(high)}" for low, high in _SAFE_RANGES) + "]")
+
+
+@functools.lru_cache(maxsize=None)
+def _yaml():
+    """PyYAML подключается при первой записи метаданных: (модуль yaml, резолвер скаляров, быстрый Dumper)."""
+    import yaml
+    from yaml.resolver import Resolver
+
+    # C-эмиттер libyaml, если PyYAML собран с ним; иначе — чистый Python
+    fast_dumper = getattr(yaml, "CDumper", yaml.Dumper)
+    return yaml, Resolver(), fast_dumper
+
+
+def _scalar(value):
+    """Возвращает YAML-представление строки так, как его выведет эмиттер, или None для сложных случаев."""
+    if not isinstance(value, str):
+        return None
+    if value == "":
+        return "''"
+    if value != value.strip() or _unsafe_chars().search(value):
+        return None
+    yaml, resolver, _ = _yaml()
+    implicit_str = resolver.resolve(yaml.ScalarNode, value, (True, False)) == _STR_TAG
+    first_indicator = value[0] in _PLAIN_FIRST or (
+        value[0] in _PLAIN_FIRST_BEFORE_SPACE and (len(value) == 1 or value[1] == " "))
+    plain = (implicit_str and not first_indicator and not value.startswith(("---", "..."))
+             and ": " not in value and " #" not in value and not value.endswith(":"))
+    if plain:
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _fast_dump(metadata, width):
+    """Специализированный эмиттер для плоского словаря строк и списков строк.
+
+    Возвращает None, если значение требует переноса строк или экранирования —
+    такие случаи отдаются PyYAML, чтобы вывод оставался побайтно одинаковым.
+    """
+    if not isinstance(metadata, dict) or not metadata:
+        return None
+    lines = []
+    for key, value in metadata.items():
+        key_text = _scalar(key)
+        if key_text is None or key_text != key:
+            return None
+        if isinstance(value, list):
+            if not value:
+                lines.append(f"{key}: []")
+                continue
+            lines.append(f"{key}:")
+            for item in value:
+                item_text = _scalar(item)
+                if item_text is None:
+                    return None
+                lines.append(f"- {item_text}")
+        else:
+            value_text = _scalar(value)
+            if value_text is None:
+                return None
+            lines.append(f"{key}: {value_text}")
+    # Строки не длиннее ширины эмиттер никогда не переносит
+    if width is not None and any(len(line) > width for line in lines):
+        return None
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _plain_text(value):
+    """Проверяет, что все строки в значении состоят из символов, которые libyaml выводит так же, как PyYAML."""
+    if isinstance(value, str):
+        return not _unsafe_chars().search(value)
+    if isinstance(value, dict):
+        return all(_plain_text(k) and _plain_text(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return all(_plain_text(item) for item in value)
+    return True
+
+
+def dump_front_matter(metadata, width=None):
+    """Сериализует метаданные так же, как yaml.dump(metadata, allow_unicode=True, sort_keys=False, width=width)."""
+    limit = DEFAULT_WIDTH if width is None else width
+    fast = _fast_dump(metadata, None if limit == float("inf") else limit)
+    if fast is not None:
+        return fast
+    yaml, _, fast_dumper = _yaml()
+    # libyaml иначе экранирует управляющие и астральные символы, для них остаётся чистый Python
+    if not _plain_text(metadata):
+        return yaml.dump(metadata, allow_unicode=True, sort_keys=False, width=limit)
+    if limit == float("inf"):
+        limit = UNLIMITED_WIDTH
+    return yaml.dump(metadata, Dumper=fast_dumper, allow_unicode=True, sort_keys=False, width=limit)
+
+
+def _self_check():
+    """Сверяет быстрый путь с yaml.dump на метаданных из хранилища записей."""
+    import records
+
+    yaml = _yaml()[0]
+    checked = mismatched = 0
+    for name, record in records.iter_records():
+        metadata = record.get("metadata") or {}
+        for width in (None, float("inf")):
+            kwargs = {} if width is None else {"width": width}
+            expected = yaml.dump(metadata, allow_unicode=True, sort_keys=False, **kwargs)
+            checked += 1
+            if dump_front_matter(metadata, width=width) != expected:
+                mismatched += 1
+                print(f"Расхождение YAML для {name} (width={width})")
+    print(f"Проверено: {checked}, расхождений: {mismatched}")
+    return mismatched == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if _self_check() else 1)
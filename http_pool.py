@@ -0,0 +1,29 @@
+# Общий пул HTTP-соединений для загрузок вне браузера
+import threading
+
+import site_profiles
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """Возвращает общую для процесса requests.Session с пулом соединений из профиля сайта."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                # requests подключается при первой загрузке, а не при импорте модулей, которые им пользуются
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                pool_size = site_profiles.get_profile().get("http_pool_size", 10)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
@@ -0,0 +1,76 @@
+# Проверка времени импорта: модули страниц и точки входа импортируются без тяжёлых зависимостей и побочных эффектов.
+# Запуск: python importtime_check.py [--budget-ms 150] [модуль ...]
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+# Зависимости, которые должны подключаться только на пути выполнения, а не при импорте
+HEAVY_MODULES = ("selenium", "webdriver_manager", "yaml", "requests", "pdfplumber", "PIL", "psutil")
+# Бюджет времени импорта одного модуля вместе со всем, что он подтягивает, мс
+BUDGET_MS = 150
+# Точки входа, которые проверяются вместе со скриптами страниц
+ENTRY_POINTS = ("main", "catalog", "worker", "profiling")
+
+# Строка вывода -X importtime: "import time: <сам, мкс> | <всего, мкс> | <отступ><модуль>"
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def measure(module):
+    """Импортирует модуль в отдельном интерпретаторе с -X importtime.
+
+    Возвращает (время импорта в мс, {подключённый модуль: мкс вместе с вложенными}, текст ошибки или None).
+    """
+    code = f"__import__({module!r})"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=BASE_DIR, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    imported = {}
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            imported[match.group(3)] = int(match.group(2))
+    error = None
+    if result.returncode != 0:
+        error = [line for line in result.stderr.splitlines() if not line.startswith("import time:")][-1:]
+        error = error[0] if error else f"код возврата {result.returncode}"
+    return imported.get(module, 0) / 1000, imported, error
+
+
+def heavy_imports(imported):
+    """Тяжёлые пакеты, попавшие в импорт."""
+    return sorted({name.split(".")[0] for name in imported} & set(HEAVY_MODULES))
+
+
+def default_modules():
+    """Скрипты страниц и точки входа."""
+    return sorted(path.stem for path in BASE_DIR.glob("DPO_*.py")) + list(ENTRY_POINTS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время импорта модулей и отсутствие тяжёлых зависимостей")
+    parser.add_argument("modules", nargs="*", help="модули для проверки (по умолчанию все скрипты и точки входа)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="бюджет времени импорта модуля, мс")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    results = [(module, *measure(module)) for module in args.modules or default_modules()]
+    for module, ms, imported, error in sorted(results, key=lambda item: -item[1]):
+        problems = []
+        if error:
+            problems.append(f"ошибка импорта: {error}")
+        heavy = heavy_imports(imported)
+        if heavy:
+            problems.append(f"тяжёлые зависимости: {', '.join(heavy)}")
+        if ms > args.budget_ms:
+            problems.append(f"дольше бюджета {args.budget_ms:.0f} мс")
+        failures += bool(problems)
+        print(f"{ms:8.1f} мс  {module}" + (f"  <- {'; '.join(problems)}" if problems else ""))
+    print(f"Модулей: {len(results)}, с нарушениями: {failures}, "
+          f"всего {sum(item[1] for item in results):.0f} мс")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
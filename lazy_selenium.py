@@ -0,0 +1,46 @@
+# Selenium и webdriver_manager подгружаются при первом обращении: импорт скрипта ради SELECTORS их не тянет
+import importlib
+
+
+class By:
+    """Способы поиска элементов — те же строки, что в selenium.webdriver.common.by.By."""
+
+    ID = "id"
+    XPATH = "xpath"
+    LINK_TEXT = "link text"
+    PARTIAL_LINK_TEXT = "partial link text"
+    NAME = "name"
+    TAG_NAME = "tag name"
+    CLASS_NAME = "class name"
+    CSS_SELECTOR = "css selector"
+
+
+class _LazyModule:
+    """Модуль, который импортируется при первом обращении к его атрибуту."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def _lazy_class(module, name):
+    """Заменитель класса: модуль импортируется при первом создании объекта."""
+
+    def create(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+
+    create.__name__ = name
+    return create
+
+
+webdriver = _LazyModule("selenium.webdriver")
+EC = _LazyModule("selenium.webdriver.support.expected_conditions")
+WebDriverWait = _lazy_class("selenium.webdriver.support.ui", "WebDriverWait")
+Options = _lazy_class("selenium.webdriver.chrome.options", "Options")
+Service = _lazy_class("selenium.webdriver.chrome.service", "Service")
+ChromeDriverManager = _lazy_class("webdriver_manager.chrome", "ChromeDriverManager")
@@ -0,0 +1,197 @@
+# Проверка доступности ссылок, собранных со всех страниц запуска
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import records
+import site_profiles
+from http_pool import get_session
+
+# Кэш результатов проверки лежит рядом с записями страниц
+CACHE_NAME = "_links.json"
+# Рабочая ссылка перепроверяется раз в сутки, нерабочая — через час
+TTL_OK = 24 * 3600
+TTL_BROKEN = 3600
+# Запросов в секунду к одному хосту
+RATE_PER_HOST = 20
+# Таймаут соединения и ответа одной проверки
+TIMEOUT = (5, 10)
+# На эти ответы HEAD сервер часто отвечает ошибкой, хотя GET работает
+HEAD_UNSUPPORTED = {403, 405, 501}
+# Ответы, по которым нельзя судить о ссылке: в кэш не попадают и нерабочими не считаются
+INCONCLUSIVE = {429, 503}
+
+_URL_RE = re.compile(r"https?://[^\s<>\"')\]]+")
+
+
+class HostRateLimiter:
+    """Ограничивает частоту запросов к каждому хосту (не чаще rate в секунду)."""
+
+    def __init__(self, rate=RATE_PER_HOST):
+        self.interval = 1.0 / rate
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def cache_path(directory=None):
+    """Путь к кэшу проверок ссылок."""
+    return Path(directory or records.records_dir()) / CACHE_NAME
+
+
+def load_cache(path):
+    """Загружает кэш {адрес: результат} (пустой, если файла нет)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path):
+    """Сохраняет кэш проверок."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(result, now):
+    """Не истёк ли срок годности результата из кэша."""
+    ttl = TTL_OK if result.get("ok") else TTL_BROKEN
+    return now - result.get("checked_at", 0) < ttl
+
+
+def extract_links(value):
+    """Собирает все http(s)-адреса из данных страницы (строки, списки, словари на любой глубине)."""
+    links = []
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            links.extend(url.rstrip(".,;:") for url in _URL_RE.findall(item))
+        # В стек в обратном порядке, чтобы ссылки шли в порядке страницы
+        elif isinstance(item, dict):
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, (list, tuple)):
+            stack.extend(reversed(item))
+    return links
+
+
+def check_link(url, limiter):
+    """Проверяет ссылку: HEAD, а при отказе сервера от HEAD — GET первого байта."""
+    session = get_session()
+    host = urlsplit(url).hostname
+    result = {"checked_at": time.time()}
+    try:
+        limiter.wait(host)
+        response = session.head(url, allow_redirects=True, timeout=TIMEOUT)
+        if response.status_code in HEAD_UNSUPPORTED:
+            limiter.wait(host)
+            with session.get(url, headers={"Range": "bytes=0-0"}, stream=True,
+                             allow_redirects=True, timeout=TIMEOUT) as response:
+                pass
+        result["status"] = response.status_code
+        result["ok"] = response.status_code < 400 or response.status_code in INCONCLUSIVE
+        if response.url != url:
+            result["final_url"] = response.url
+    except Exception as e:
+        result["status"] = None
+        result["ok"] = False
+        result["error"] = type(e).__name__
+    return url, result
+
+
+def check_links(urls, cache, workers=None):
+    """Проверяет адреса параллельно, используя свежие результаты из кэша. Возвращает {адрес: результат}."""
+    now = time.time()
+    results = {url: cache[url] for url in urls if url in cache and is_fresh(cache[url], now)}
+    pending = [url for url in urls if url not in results]
+    if pending:
+        workers = workers or site_profiles.get_profile().get("http_pool_size", 10)
+        limiter = HostRateLimiter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for url, result in pool.map(lambda url: check_link(url, limiter), pending):
+                results[url] = result
+                if result.get("status") not in INCONCLUSIVE:
+                    cache[url] = result
+    return results
+
+
+def format_report(pages, results, title):
+    """Markdown-отчёт о нерабочих ссылках по страницам."""
+    broken_total = sum(len(broken) for broken in pages.values())
+    lines = [f"# {title}", "",
+             f"Проверено ссылок: {len(results)}, нерабочих: {sum(1 for r in results.values() if not r['ok'])}, "
+             f"вхождений на страницах: {broken_total}", ""]
+    for page, broken in pages.items():
+        if not broken:
+            continue
+        lines.append(f"## {page}")
+        for url in broken:
+            result = results[url]
+            lines.append(f"- {url}: {result.get('status') or result.get('error', 'нет ответа')}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def check_site_links(report_path, title="Проверка ссылок", directory=None, workers=None):
+    """Проверяет все ссылки из записей страниц, отмечает нерабочие в записях и пишет отчёт.
+
+    Адреса проверяются один раз за запуск, даже если встречаются на нескольких страницах.
+    Запись страницы перезаписывается, только если изменился набор её нерабочих ссылок.
+    """
+    directory = Path(directory or records.records_dir())
+    page_links = {}
+    previous = {}
+    for name, record in records.iter_records(directory):
+        page_links[name] = list(dict.fromkeys(extract_links(record.get("data"))))
+        previous[name] = record.get("links")
+    urls = list(dict.fromkeys(url for links in page_links.values() for url in links))
+
+    path = cache_path(directory)
+    cache = load_cache(path)
+    started = time.monotonic()
+    results = check_links(urls, cache, workers)
+    save_cache(cache, path)
+    logging.info(f"Проверено ссылок: {len(urls)} за {time.monotonic() - started:.1f} с")
+
+    # Нерабочие ссылки отмечаются в структурированных записях страниц
+    pages = {}
+    changed = 0
+    for name, links in page_links.items():
+        broken = [url for url in links if not results[url]["ok"]]
+        pages[name] = broken
+        known = previous[name] or {}
+        if known.get("checked") == len(links) and \
+                [entry.get("url") for entry in known.get("broken", [])] == broken:
+            continue
+        record = records.load_record(name, directory)
+        record["links"] = {
+            "checked": len(links),
+            "broken": [{"url": url, **{k: v for k, v in results[url].items() if k != "checked_at"}} for url in broken],
+        }
+        records.save_record(name, record, directory)
+        changed += 1
+    logging.info(f"Записей с изменившимися нерабочими ссылками: {changed} из {len(page_links)}")
+
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(format_report(pages, results, title))
+    return pages
@@ -1,26 +1,43 @@
 import os
+import time
 import subprocess
-import glob
 import datetime
+import importlib.util
 import sys
 import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
-# Настройка кодировки консоли на UTF-8
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
+import browser_monitor
+import browser_profile
+import cdp_driver
+import change_detection
+import command_stats
+import link_check
+import metrics
+import profiling
+import publish
+import records
+import retry
+import site_profiles
+import tab_host
+import timings
+import work_queue
+from console import setup_console
 
-# Настройка логирования
+# Журнал запуска; консоль и логирование настраивает setup_logging() из точки входа, а не импорт модуля
 LOG_FILE = Path(r"D:\python_work\dpo\dpo") / f"parser_log_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s: %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding='utf-8'),
-        logging.StreamHandler(sys.stdout),
-    ]
-)
 
+
+def setup_logging():
+    """Настраивает консоль и логирование оркестратора (в файл журнала и stdout)."""
+    setup_console(logging.FileHandler(LOG_FILE, encoding='utf-8'), log_format='%(asctime)s - %(levelname)s: %(message)s')
+
+# Каталог со скриптами DPO_*.py; каталог результатов задаётся профилем сайта
 BASE_DIR = Path(r"D:\python_work\dpo\dpo")
 SCRIPTS = [
     "DPO_aktsii.py",
@@ -58,124 +75,692 @@ SCRIPTS = [
 
 ]
 TIMESTAMP = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-OUTPUT_FILE = BASE_DIR / f"Раздел_1_{TIMESTAMP}.md"
 
+# Общий пул браузеров: одновременно по всем сайтам работает не больше MAX_BROWSERS скриптов
+BROWSER_SLOTS = threading.BoundedSemaphore(site_profiles.MAX_BROWSERS)
 
-def run_scripts():
-    """Запускает все скрипты из списка и проверяет создание Markdown-файлов."""
-    successful_scripts = []
-    missing_files = []
 
-    # Проверка пути к Python из виртуального окружения
-    python_exe = BASE_DIR.parent / "venv" / "Scripts" / "python.exe"
-    if not python_exe.exists():
-        logging.error(f"Python из виртуального окружения не найден: {python_exe}")
-        return successful_scripts, missing_files
+def output_file(site):
+    """Путь к объединённому файлу раздела для сайта."""
+    return site_profiles.output_root(site) / f"Раздел_1_{TIMESTAMP}.md"
 
-    # Проверка существующих файлов
-    available_scripts = {f.name.lower(): f for f in BASE_DIR.glob("*.py")}
-    logging.info(f"Найдено Python-скриптов в {BASE_DIR}: {len(available_scripts)}")
 
-    for script in SCRIPTS:
-        script_path = BASE_DIR / script
-        expected_md = BASE_DIR / script.replace(".py", ".md")
-
-        # Проверка наличия скрипта
-        if not script_path.exists():
-            # Проверяем с учетом регистра
-            script_lower = script.lower()
-            if script_lower in available_scripts:
-                logging.warning(f"Скрипт {script} не найден, но найден {available_scripts[script_lower]}. Исправьте регистр в SCRIPTS.")
-                script_path = available_scripts[script_lower]
-            else:
-                logging.error(f"Скрипт {script} не найден в {BASE_DIR}")
-                missing_files.append(expected_md)
-                continue
+def changes_file(site):
+    """Путь к отчёту об изменениях (в подкаталоге, чтобы не попадать в объединённый файл)."""
+    return site_profiles.output_root(site) / "reports" / f"Изменения_{TIMESTAMP}.md"
+
+
+def links_file(site):
+    """Путь к отчёту о нерабочих ссылках."""
+    return site_profiles.output_root(site) / "reports" / f"Ссылки_{TIMESTAMP}.md"
+
+
+def resources_file(site):
+    """Путь к отчёту о ресурсах, потреблённых браузерами по страницам."""
+    return site_profiles.output_root(site) / "reports" / f"Ресурсы_{TIMESTAMP}.md"
+
+
+def commands_file(site):
+    """Путь к отчёту о командах драйвера по страницам и местам вызова."""
+    return site_profiles.output_root(site) / "reports" / f"Команды_{TIMESTAMP}.md"
+
+
+# Защищает историю длительностей, которую обновляют параллельные потоки
+HISTORY_LOCK = threading.Lock()
+
+# Замеры ресурсов по страницам: {сайт: {скрипт: сводка монитора}}
+RESOURCE_USAGE = {}
+# Команды драйвера по страницам: {сайт: {скрипт: сводка command_stats}} (под RESOURCE_LOCK)
+COMMAND_STATS = {}
+# Счётчики загрузок и кэшей по страницам: {сайт: {скрипт: счётчики metrics}} (под RESOURCE_LOCK)
+PAGE_COUNTERS = {}
+# Длительность успешных страниц в этом запуске для манифеста: {сайт: {скрипт: секунды}} (под HISTORY_LOCK)
+PAGE_SECONDS = {}
+RESOURCE_LOCK = threading.Lock()
+
+# Автоматы отключения по хостам, общие для всех сайтов запуска
+BREAKERS = {}
+BREAKERS_LOCK = threading.Lock()
+
+
+def host_breaker(host):
+    """Автомат отключения для хоста (создаётся при первом обращении)."""
+    with BREAKERS_LOCK:
+        if host not in BREAKERS:
+            BREAKERS[host] = retry.CircuitBreaker()
+        return BREAKERS[host]
+
+
+def site_variables(site):
+    """Переменные окружения, по которым скрипты страниц находят профиль сайта и его каталоги."""
+    return {
+        "DPO_SITE": site,
+        "DPO_OUTPUT_ROOT": str(site_profiles.output_root(site)),
+        "DPO_RECORDS_DIR": str(site_profiles.records_dir(site)),
+    }
+
+
+def script_env(site, deadline, browser_address=None, staging=None, stats_path=None, counters_path=None):
+    """Окружение дочернего скрипта: профиль сайта, его каталоги, дедлайн страницы, общий браузер для вкладки,
+    каталог подготовки запуска, куда пишется Markdown, и файлы для сводки команд драйвера и счётчиков страницы."""
+    env = os.environ.copy()
+    env.update(site_variables(site))
+    env["DPO_PAGE_DEADLINE"] = str(deadline)
+    env.pop(command_stats.ENV_STATS, None)
+    if stats_path is not None:
+        env[command_stats.ENV_STATS] = str(stats_path)
+    env.pop(metrics.ENV_COUNTERS, None)
+    if counters_path is not None:
+        env[metrics.ENV_COUNTERS] = str(counters_path)
+    env.pop(publish.ENV_STAGING, None)
+    if staging is not None:
+        env[publish.ENV_STAGING] = str(staging)
+    env.pop(cdp_driver.ENV_BROWSER, None)
+    if browser_address:
+        env[cdp_driver.ENV_BROWSER] = browser_address
+    return env
 
-        logging.info(f"Запуск скрипта: {script}")
+
+@contextmanager
+def browser_slot(tabs=None):
+    """Место для страницы: вкладка общего браузера (адрес DevTools) или свой Chrome в общем пуле (None)."""
+    if tabs is not None:
+        with tabs.lease() as address:
+            yield address
+    else:
+        with BROWSER_SLOTS:
+            yield None
+
+
+def make_run_id(site):
+    """Идентификатор запуска сайта: имя каталога подготовки и запуска в общей очереди."""
+    return f"{site}-{TIMESTAMP}-{os.getpid()}"
+
+
+def run_script(site, script, python_exe, available_scripts, history, tabs=None, staging=None, profile_dir=None):
+    """Запускает один скрипт для сайта; с tabs скрипт работает во вкладке общего браузера пула.
+    С staging Markdown пишется в каталог подготовки запуска и публикуется после всех страниц,
+    с profile_dir скрипт выполняется под профилировщиком (profiling.py), профиль сохраняется в этот каталог.
+
+    Возвращает (успех, не созданный Markdown-файл или None, имеет ли смысл повтор).
+    """
+    out_dir = site_profiles.output_root(site)
+    script_path = BASE_DIR / script
+    expected_md = out_dir / script.replace(".py", ".md")
+
+    # Проверка наличия скрипта
+    if not script_path.exists():
+        # Проверяем с учетом регистра
+        script_lower = script.lower()
+        if script_lower in available_scripts:
+            logging.warning(f"[{site}] Скрипт {script} не найден, но найден {available_scripts[script_lower]}. Исправьте регистр в SCRIPTS.")
+            script_path = available_scripts[script_lower]
+        else:
+            logging.error(f"[{site}] Скрипт {script} не найден в {BASE_DIR}")
+            return False, expected_md, False
+
+    # Дедлайн по истории прошлых запусков: зависшая страница не держит поток по пять минут
+    with HISTORY_LOCK:
+        deadline = timings.page_deadline(history, script)
+
+    with browser_slot(tabs) as browser_address:
+        logging.info(f"[{site}] Запуск скрипта: {script} (дедлайн {deadline} с)")
+        started = time.monotonic()
+        command = [str(python_exe), str(script_path)]
+        if profile_dir is not None:
+            command[1:1] = [str(BASE_DIR / "profiling.py"), "--output", str(profile_dir), "--no-summary"]
+        # Сводку команд драйвера и счётчики скрипт записывает при выходе в свои временные файлы
+        stats_fd, stats_path = tempfile.mkstemp(prefix="dpo-commands-", suffix=".json")
+        os.close(stats_fd)
+        counters_fd, counters_path = tempfile.mkstemp(prefix="dpo-counters-", suffix=".json")
+        os.close(counters_fd)
         try:
-            result = subprocess.run(
-                [str(python_exe), str(script_path)],
-                capture_output=True,
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=300,
                 encoding='utf-8',
                 errors='replace',
+                cwd=out_dir,
+                env=script_env(site, deadline, browser_address, staging, stats_path, counters_path),
             )
-            if result.returncode == 0:
-                logging.info(f"Скрипт {script} успешно выполнен")
-                successful_scripts.append(script)
-                if expected_md.exists():
-                    logging.info(f"Создан файл: {expected_md}")
-                else:
-                    logging.error(f"Файл {expected_md} не создан")
-                    missing_files.append(expected_md)
-            else:
-                logging.error(f"Ошибка при выполнении {script}: {result.stderr}")
-                missing_files.append(expected_md)
-        except subprocess.TimeoutExpired:
-            logging.error(f"Скрипт {script} превысил время выполнения (5 минут)")
-            missing_files.append(expected_md)
         except Exception as e:
-            logging.error(f"Исключение при выполнении {script}: {str(e)}")
-            missing_files.append(expected_md)
+            logging.error(f"[{site}] Исключение при выполнении {script}: {str(e)}")
+            command_stats.collect(stats_path)
+            metrics.collect(counters_path)
+            return False, expected_md, True
+        # Монитор видит chromedriver и Chrome скрипта и завершает их, если скрипт их не закрыл
+        monitor = browser_monitor.ProcessMonitor(process.pid)
+        timed_out = False
+        try:
+            _, stderr = process.communicate(timeout=deadline)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        finally:
+            usage = monitor.stop()
+            if process.poll() is None:
+                process.kill()
+            if timed_out:
+                process.communicate()
+        commands = command_stats.collect(stats_path)
+        counters = metrics.collect(counters_path)
+        with RESOURCE_LOCK:
+            if usage is not None:
+                RESOURCE_USAGE.setdefault(site, {})[script] = usage
+            if commands is not None:
+                COMMAND_STATS.setdefault(site, {})[script] = commands
+            if counters:
+                PAGE_COUNTERS.setdefault(site, {})[script] = counters
+        if timed_out:
+            logging.error(f"[{site}] Скрипт {script} превысил время выполнения ({deadline} с)")
+            return False, expected_md, True
+
+    if process.returncode == retry.EXIT_RETRY:
+        logging.warning(f"[{site}] Скрипт {script} не получил контент страницы, Markdown-файл не публикуется")
+        return False, expected_md, True
+    if process.returncode != 0:
+        logging.error(f"[{site}] Ошибка при выполнении {script}: {stderr}")
+        return False, expected_md, True
+    duration = time.monotonic() - started
+    with HISTORY_LOCK:
+        timings.record_duration(history, script, duration)
+        PAGE_SECONDS.setdefault(site, {})[script] = round(duration, 1)
+    logging.info(f"[{site}] Скрипт {script} успешно выполнен за {duration:.1f} с")
+    # Новый файл лежит в каталоге подготовки; неизменившуюся страницу скрипт отмечает сам (publish.mark_unchanged),
+    # а успешный выход без файла и без отметки — сбой, который повторяется
+    created_md = staging / expected_md.name if staging is not None else expected_md
+    if not created_md.exists():
+        if staging is not None and publish.unchanged_marker(staging, expected_md.name).exists() \
+                and expected_md.exists():
+            logging.info(f"[{site}] Страница {script} не изменилась, остаётся файл {expected_md}")
+            return True, None, False
+        logging.error(f"[{site}] Скрипт {script} завершился без ошибки, но файл {expected_md.name} не создан")
+        return False, expected_md, True
+    logging.info(f"[{site}] Создан файл: {created_md}")
+    return True, None, False
+
+
+def remaining_seconds(expected, scripts, outcomes, running, workers, now):
+    """Оценка оставшегося времени: ожидаемая работа по незавершённым страницам, делённая на число потоков.
+
+    У выполняющихся страниц вычитается уже прошедшее время; страницы без истории считаются средними.
+    """
+    known = [seconds for seconds in expected.values() if seconds is not None]
+    fallback = sum(known) / len(known) if known else timings.MIN_DEADLINE
+    left = 0.0
+    for script in scripts:
+        if script in outcomes:
+            continue
+        duration = expected.get(script) or fallback
+        if script in running:
+            duration = max(0.0, duration - (now - running[script]))
+        left += duration
+    return left / max(1, workers)
+
+
+def run_queue(site, scripts, max_workers, run, expected=None):
+    """Выполняет скрипты из очереди с повторами. Возвращает {скрипт: (успех, не созданный файл)}.
+
+    Первыми запускаются самые долгие по истории страницы (страницы без истории — раньше всех), чтобы
+    параллельный запуск не заканчивался одной длинной страницей. Неудачная страница возвращается в очередь
+    с экспоненциальной задержкой и не задерживает остальные; пока автомат отключения хоста разомкнут,
+    страницы сайта откладываются без траты попыток.
+    """
+    expected = expected or {}
+    queue = retry.RetryQueue()
+    priority = {script: -(expected.get(script) or float("inf")) for script in scripts}
+    for script in scripts:
+        queue.put((script, 1), priority=priority[script])
+    breaker = host_breaker(site_profiles.site_host(site))
+    outcomes = {}
+    running = {}
+    progress_lock = threading.Lock()
+
+    def report_progress():
+        with progress_lock:
+            eta = remaining_seconds(expected, scripts, outcomes, running, max_workers, time.monotonic())
+            logging.info(f"[{site}] Готово страниц: {len(outcomes)} из {len(scripts)}, "
+                         f"выполняется: {len(running)}, осталось примерно {eta:.0f} с")
+
+    def worker():
+        while True:
+            job = queue.get()
+            if job is None:
+                return
+            script, attempt = job
+            try:
+                pause = breaker.remaining()
+                if pause > 0:
+                    queue.put(job, delay=pause, priority=priority[script])
+                    continue
+                with progress_lock:
+                    running[script] = time.monotonic()
+                try:
+                    succeeded, missing_md, retryable = run(script)
+                finally:
+                    with progress_lock:
+                        running.pop(script, None)
+                if missing_md is None:
+                    breaker.record_success()
+                elif retryable and breaker.record_failure():
+                    logging.warning(f"[{site}] Слишком много неудач подряд, запросы к сайту приостановлены на {breaker.cooldown:.0f} с")
+                if retryable and attempt < retry.MAX_ATTEMPTS:
+                    delay = retry.backoff_delay(attempt, retry.QUEUE_BASE_DELAY, retry.QUEUE_MAX_DELAY)
+                    logging.warning(f"[{site}] Скрипт {script} будет повторён через {delay:.1f} с "
+                                    f"(попытка {attempt + 1} из {retry.MAX_ATTEMPTS})")
+                    queue.put((script, attempt + 1), delay=delay, priority=priority[script])
+                    continue
+                with progress_lock:
+                    outcomes[script] = (succeeded, missing_md)
+                report_progress()
+            except Exception as e:
+                logging.error(f"[{site}] Исключение при обработке {script}: {e}")
+                with progress_lock:
+                    outcomes[script] = (False, site_profiles.output_root(site) / script.replace(".py", ".md"))
+            finally:
+                queue.task_done()
+
+    workers = [threading.Thread(target=worker, name=f"{site}-worker-{n}") for n in range(max_workers)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return outcomes
+
+
+def find_python():
+    """Python из виртуального окружения, которым запускаются скрипты (None, если его нет)."""
+    python_exe = BASE_DIR.parent / "venv" / "Scripts" / "python.exe"
+    if not python_exe.exists():
+        logging.error(f"Python из виртуального окружения не найден: {python_exe}")
+        return None
+    return python_exe
+
+
+def find_scripts():
+    """Скрипты в BASE_DIR по имени в нижнем регистре (для подсказки при ошибке в регистре имени)."""
+    available_scripts = {f.name.lower(): f for f in BASE_DIR.glob("*.py")}
+    logging.info(f"Найдено Python-скриптов в {BASE_DIR}: {len(available_scripts)}")
+    return available_scripts
+
+
+def run_distributed(site, scripts, expected, queue_path, history, run_id):
+    """Ставит страницы сайта в общую очередь и ждёт, пока их выполнят исполнители (worker.py).
+
+    Длительности успешных страниц попадают в историю, замеры ресурсов — в отчёт, как при локальном запуске.
+    Если work_queue.IDLE_TIMEOUT секунд ни одно задание не выполняется и не завершается, оставшиеся страницы
+    снимаются с очереди и считаются неудачными. Возвращает {скрипт: (успех, не созданный файл)}.
+    """
+    queue = work_queue.WorkQueue(queue_path)
+    # Как и в локальной очереди, первыми берутся самые долгие страницы
+    queue.enqueue(run_id, site, scripts,
+                  {script: -(expected.get(script) or float("inf")) for script in scripts})
+    logging.info(f"[{site}] Страниц в общей очереди {queue_path}: {len(scripts)} (запуск {run_id})")
+    outcomes = {}
+    reported = -1
+    last_activity = time.monotonic()
+    try:
+        while len(outcomes) < len(scripts):
+            time.sleep(work_queue.POLL_INTERVAL)
+            jobs = queue.jobs(run_id)
+            running = {job["script"]: job["started_at"] for job in jobs if job["status"] == "leased"}
+            # Живая аренда или новый результат — исполнители работают; иначе ждать их можно бесконечно
+            now = time.time()
+            if any(job["status"] == "leased" and (job["lease_until"] or 0) >= now for job in jobs) \
+                    or sum(job["status"] == "done" for job in jobs) > len(outcomes):
+                last_activity = time.monotonic()
+            elif time.monotonic() - last_activity > work_queue.IDLE_TIMEOUT:
+                queue.cancel(run_id)
+                left = [script for script in scripts if script not in outcomes]
+                logging.error(f"[{site}] Нет активных исполнителей {work_queue.IDLE_TIMEOUT:.0f} с, "
+                              f"страницы считаются неудачными: {', '.join(left)}")
+                for script in left:
+                    outcomes[script] = (False, site_profiles.output_root(site) / script.replace(".py", ".md"))
+                break
+            for job in jobs:
+                if job["status"] != "done" or job["script"] in outcomes:
+                    continue
+                result = job["result"] or {}
+                missing_md = None if result.get("succeeded") and not result.get("missing_md") else \
+                    site_profiles.output_root(site) / job["script"].replace(".py", ".md")
+                outcomes[job["script"]] = (bool(result.get("succeeded")), missing_md)
+                if result.get("seconds"):
+                    with HISTORY_LOCK:
+                        timings.record_duration(history, job["script"], result["seconds"])
+                        PAGE_SECONDS.setdefault(site, {})[job["script"]] = round(result["seconds"], 1)
+                with RESOURCE_LOCK:
+                    if result.get("usage"):
+                        RESOURCE_USAGE.setdefault(site, {})[job["script"]] = result["usage"]
+                    if result.get("commands"):
+                        COMMAND_STATS.setdefault(site, {})[job["script"]] = result["commands"]
+                    if result.get("counters"):
+                        PAGE_COUNTERS.setdefault(site, {})[job["script"]] = result["counters"]
+                if result.get("lost"):
+                    logging.error(f"[{site}] Скрипт {job['script']}: исполнитель {result['lost']} перестал отвечать, "
+                                  f"попытки исчерпаны")
+            if len(outcomes) != reported:
+                reported = len(outcomes)
+                workers = len({job["worker"] for job in jobs if job["status"] == "leased"})
+                eta = remaining_seconds(expected, scripts, outcomes, running, workers, time.time())
+                logging.info(f"[{site}] Готово страниц: {len(outcomes)} из {len(scripts)}, "
+                             f"выполняется: {len(running)}, осталось примерно {eta:.0f} с")
+    finally:
+        if len(outcomes) < len(scripts):
+            queue.cancel(run_id)
+    return outcomes
+
+
+def tabs_per_browser(site, tabs=None):
+    """Сколько вкладок держать в общем браузере: аргумент --tabs или ключ tabs_per_browser профиля сайта."""
+    if tabs is None:
+        tabs = site_profiles.get_profile(site).get("tabs_per_browser", tab_host.TABS_PER_BROWSER)
+    return max(1, tabs)
+
+
+def run_scripts(site=site_profiles.DEFAULT_SITE, queue_path=None, tabs=None, profile=False):
+    """Запускает все скрипты из списка для сайта, публикует их Markdown-файлы и манифест запуска.
+
+    С queue_path страницы выполняются не здесь, а исполнителями общей очереди (распределённый режим).
+    Если в браузере больше одной вкладки, страницы работают во вкладках общих браузеров: max_workers
+    браузеров по tabs вкладок, и одновременно выполняется столько страниц, сколько всего вкладок.
+    С profile страницы профилируются, а после запуска пишется сводка профилей.
+    Возвращает (успешные скрипты, не созданные файлы, манифест).
+    """
+    successful_scripts = []
+    missing_files = []
+
+    site_profiles.output_root(site).mkdir(parents=True, exist_ok=True)
+    scripts = [script for script in SCRIPTS if site_profiles.page_enabled(script, site)]
+    max_workers = site_profiles.get_profile(site).get("max_workers", 1)
+    history_path = timings.history_path(site_profiles.records_dir(site))
+    history = timings.load_history(history_path)
+
+    expected = {script: timings.expected_duration(history, script) for script in scripts}
+    # Скрипты пишут в каталог подготовки запуска; в каталог сайта файлы попадают только при публикации
+    run_id = make_run_id(site)
+    staging = publish.staging_dir(site, run_id)
+    pages_profile_dir = profiling.profile_dir(site, run_id) if profile else None
+
+    if queue_path is not None:
+        outcomes = run_distributed(site, scripts, expected, queue_path, history, run_id)
+    else:
+        python_exe = find_python()
+        if python_exe is None:
+            outcomes = {script: (False, site_profiles.output_root(site) / script.replace(".py", ".md"))
+                        for script in scripts}
+        else:
+            available_scripts = find_scripts()
+            tabs = tabs_per_browser(site, tabs)
+            pool = tab_host.TabPool(site, max_workers, tabs, BROWSER_SLOTS) if tabs > 1 else None
+            if pool is not None:
+                logging.info(f"[{site}] Режим вкладок: до {max_workers} браузеров по {tabs} вкладок")
+            try:
+                outcomes = run_queue(site, scripts, pool.capacity if pool is not None else max_workers,
+                                     lambda script: run_script(site, script, python_exe, available_scripts,
+                                                               history, pool, staging, pages_profile_dir),
+                                     expected)
+            finally:
+                if pool is not None:
+                    pool.close()
+                    with RESOURCE_LOCK:
+                        RESOURCE_USAGE.setdefault(site, {}).update(pool.usage)
+
+    # Результаты собираются в порядке SCRIPTS, даже если скрипты завершаются в другом порядке
+    for script in scripts:
+        succeeded, missing_md = outcomes[script]
+        if succeeded:
+            successful_scripts.append(script)
+        if missing_md is not None:
+            missing_files.append(missing_md)
+
+    timings.save_history(history, history_path)
+    manifest = publish_run(site, run_id, scripts, outcomes)
+    if pages_profile_dir is not None:
+        summary = profiling.summarize(pages_profile_dir)
+        logging.info(f"[{site}] Профили страниц: {pages_profile_dir}, сводка: {summary}")
+    return successful_scripts, missing_files, manifest
+
+
+def publish_run(site, run_id, scripts, outcomes):
+    """Переносит файлы запуска из каталога подготовки в каталог сайта и записывает манифест.
+
+    Страница считается готовой, если её скрипт создал файл; адрес страницы берётся из её записи.
+    """
+    directory = site_profiles.records_dir(site)
+    pages = []
+    for script in scripts:
+        record = records.load_record(script, directory) or {}
+        with HISTORY_LOCK:
+            seconds = PAGE_SECONDS.get(site, {}).get(script)
+        pages.append((script.replace(".py", ".md"),
+                      {"succeeded": outcomes[script][1] is None, "url": record.get("url"), "seconds": seconds}))
+    manifest = publish.publish(site, run_id, pages)
+    updated = sum(1 for entry in manifest["pages"] if entry["status"] == "updated")
+    logging.info(f"[{site}] Опубликовано страниц: {len(manifest['pages'])} (обновлено {updated}, "
+                 f"без изменений {len(manifest['pages']) - updated}), пропущено: {len(manifest['missing'])}, "
+                 f"манифест: {publish.manifest_path(site)}")
+    return manifest
 
-    return successful_scripts, missing_files
 
+def combine_markdown_files(manifest, site=site_profiles.DEFAULT_SITE):
+    """Объединяет Markdown-файлы из манифеста запуска в один и записывает список пропущенных страниц.
 
-def combine_markdown_files(missing_files):
-    """Объединяет все Markdown-файлы в один и записывает информацию о пропущенных файлах."""
-    markdown_files = list(BASE_DIR.glob("*.md"))
-    logging.info(f"Найдено Markdown-файлов: {len(markdown_files)}")
-    logging.info(f"Список файлов: {[str(f) for f in markdown_files]}")
+    Читаются ровно файлы манифеста: незавершённые и оставшиеся от прошлых запусков файлы в каталоге не попадают.
+    """
+    out_dir = site_profiles.output_root(site)
+    combined_file = output_file(site)
+    pages = sorted(manifest["pages"], key=lambda entry: entry["file"])
+    logging.info(f"[{site}] Файлов в манифесте: {len(pages)}")
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as outfile:
+    tmp_file = combined_file.with_name(combined_file.name + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as outfile:
         outfile.write("# Раздел 1\n\n")
         outfile.write(f"Дата создания: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
 
-        if not markdown_files:
+        if not pages:
             outfile.write("Ошибка: Markdown-файлы не найдены.\n")
-            logging.error("Markdown-файлы не найдены")
-            return
+            logging.error(f"[{site}] Markdown-файлы не найдены")
 
-        added_files = []
-        for md_file in sorted(markdown_files):
-            if md_file == OUTPUT_FILE:
-                continue
+        for entry in pages:
+            md_file = out_dir / entry["file"]
             try:
                 with open(md_file, "r", encoding="utf-8") as infile:
                     outfile.write(f"## Данные из файла: {md_file.name}\n\n")
                     outfile.write(infile.read())
                     outfile.write("\n\n---\n\n")
-                logging.info(f"Файл {md_file} добавлен в итоговый отчет")
-                added_files.append(md_file)
+                logging.info(f"[{site}] Файл {md_file} добавлен в итоговый отчет")
             except Exception as e:
-                logging.error(f"Ошибка при обработке {md_file}: {str(e)}")
+                logging.error(f"[{site}] Ошибка при обработке {md_file}: {str(e)}")
                 outfile.write(f"## Ошибка: файл {md_file.name} не добавлен\n\n")
                 outfile.write(f"Причина: {str(e)}\n\n---\n\n")
 
-        if missing_files:
+        if manifest["missing"]:
             outfile.write("## Пропущенные или не созданные файлы\n\n")
-            for missing_file in missing_files:
-                if missing_file not in added_files:
-                    outfile.write(f"- {missing_file.name}: не создан или не добавлен\n")
-                    logging.error(f"Файл {missing_file} не был создан или добавлен")
-            for md_file in markdown_files:
-                expected_mds = [script.replace(".py", ".md") for script in SCRIPTS]
-                if md_file.name not in expected_mds and md_file != OUTPUT_FILE:
-                    outfile.write(f"- {md_file.name}: найден, но не ожидался\n")
-                    logging.warning(f"Файл {md_file} найден, но не ожидался")
-
-
-def main():
-    logging.info("Запуск обработки скриптов...")
-    successful_scripts, missing_files = run_scripts()
-    logging.info(f"Успешно выполнено скриптов: {len(successful_scripts)} из {len(SCRIPTS)}")
-    logging.info(f"Пропущенные файлы: {len(missing_files)}")
-    logging.info("Объединение Markdown-файлов...")
-    combine_markdown_files(missing_files)
-    logging.info(f"Итоговый файл создан: {OUTPUT_FILE}")
+            for name in manifest["missing"]:
+                outfile.write(f"- {name}: не создан или не добавлен\n")
+                logging.error(f"[{site}] Файл {out_dir / name} не был создан или добавлен")
+    os.replace(tmp_file, combined_file)
+
+
+def run_site(site, queue_path=None, tabs=None, profile=False):
+    """Полный цикл для одного сайта: запуск скриптов, объединение, отчёты и метрики запуска."""
+    started = time.monotonic()
+    # Свободные профили браузера чистятся до запуска, пока их не заняли скрипты
+    freed = browser_profile.prune_profiles(site)
+    if freed:
+        logging.info(f"[{site}] Очищено кэша браузеров: {freed / 2 ** 20:.0f} МБ")
+    logging.info(f"[{site}] Запуск обработки скриптов...")
+    successful_scripts, missing_files, manifest = run_scripts(site, queue_path, tabs, profile)
+    logging.info(f"[{site}] Успешно выполнено скриптов: {len(successful_scripts)} из {len(SCRIPTS)}")
+    logging.info(f"[{site}] Пропущенные файлы: {len(missing_files)}")
+    logging.info(f"[{site}] Объединение Markdown-файлов...")
+    combine_markdown_files(manifest, site)
+    logging.info(f"[{site}] Итоговый файл создан: {output_file(site)}")
+    logging.info(f"[{site}] Поиск изменений относительно прошлого запуска...")
+    diff = change_detection.write_change_report(
+        changes_file(site),
+        title=f"Изменения в разделе 1 ({site}, {TIMESTAMP})",
+        directory=site_profiles.records_dir(site),
+    )
+    changed_sections = sum(len(v["changed"]) + len(v["added"]) + len(v["removed"]) for v in diff["changed"].values())
+    logging.info(f"[{site}] Изменено страниц: {len(diff['changed'])}, разделов: {changed_sections}, "
+                 f"новых страниц: {len(diff['added'])}, пропавших: {len(diff['removed'])}")
+    logging.info(f"[{site}] Отчёт об изменениях: {changes_file(site)}")
+    logging.info(f"[{site}] Проверка ссылок со всех страниц...")
+    pages = link_check.check_site_links(
+        links_file(site),
+        title=f"Нерабочие ссылки в разделе 1 ({site}, {TIMESTAMP})",
+        directory=site_profiles.records_dir(site),
+        workers=site_profiles.get_profile(site).get("http_pool_size", 10),
+    )
+    logging.info(f"[{site}] Страниц с нерабочими ссылками: {sum(1 for broken in pages.values() if broken)}, "
+                 f"отчёт: {links_file(site)}")
+    usage = RESOURCE_USAGE.get(site, {})
+    browser_monitor.write_report(resources_file(site), usage, title=f"Ресурсы браузеров ({site}, {TIMESTAMP})")
+    logging.info(f"[{site}] Завершено осиротевших процессов браузера: "
+                 f"{sum(item['orphans_killed'] for item in usage.values())}, отчёт: {resources_file(site)}")
+    commands = COMMAND_STATS.get(site, {})
+    command_stats.write_report(commands_file(site), commands, title=f"Команды драйвера ({site}, {TIMESTAMP})")
+    logging.info(f"[{site}] Команд драйвера: {sum(item['count'] for item in commands.values())}, "
+                 f"отчёт: {commands_file(site)}")
+    with HISTORY_LOCK:
+        page_seconds = dict(PAGE_SECONDS.get(site, {}))
+    metrics.write_textfile(site, len(successful_scripts), manifest, page_seconds, PAGE_COUNTERS.get(site, {}),
+                           commands, time.monotonic() - started)
+
+
+# Скрипты страниц, загруженные как модули для перерисовки Markdown: {скрипт: модуль}
+PAGE_MODULES = {}
+
+
+def load_page_module(script):
+    """Импортирует скрипт страницы как модуль, не запуская парсер (импорт не тянет selenium и не открывает браузер)."""
+    if script not in PAGE_MODULES:
+        spec = importlib.util.spec_from_file_location(f"page_{Path(script).stem}", BASE_DIR / script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        PAGE_MODULES[script] = module
+    return PAGE_MODULES[script]
+
+
+def render_page(script, record):
+    """Перерисовывает Markdown страницы по её записи. Возвращает путь к файлу или None при ошибке."""
+    module = load_page_module(script)
+    if hasattr(module, "render_record"):
+        return module.render_record(record)
+    return module.save_to_markdown(record["data"], record["url"], record["metadata"])
+
+
+@contextmanager
+def site_environment(site, staging=None):
+    """Переменные окружения сайта в самом оркестраторе — на время перерисовки, как у дочерних скриптов."""
+    variables = site_variables(site)
+    if staging is not None:
+        variables[publish.ENV_STAGING] = str(staging)
+    saved = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def render_site(site):
+    """Режим --render-only: Markdown всех страниц и итоговый файл по записям прошлого запуска, без браузера и сети.
+
+    Перерисованные файлы публикуются так же, как после обычного запуска: через каталог подготовки и манифест.
+    """
+    started = time.monotonic()
+    out_dir = site_profiles.output_root(site)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    scripts = [script for script in SCRIPTS if site_profiles.page_enabled(script, site)]
+    run_id = make_run_id(site)
+    outcomes = {}
+    with site_environment(site, publish.staging_dir(site, run_id)):
+        for script in scripts:
+            expected_md = out_dir / script.replace(".py", ".md")
+            record = records.load_record(script, site_profiles.records_dir(site))
+            if record is None:
+                logging.warning(f"[{site}] Нет сохранённой записи страницы {script}, Markdown не перерисован")
+                outcomes[script] = (False, expected_md)
+                continue
+            try:
+                rendered = render_page(script, record)
+            except Exception as e:
+                logging.error(f"[{site}] Ошибка при перерисовке {script}: {e}")
+                rendered = None
+            outcomes[script] = (True, None) if rendered else (False, expected_md)
+    manifest = publish_run(site, run_id, scripts, outcomes)
+    combine_markdown_files(manifest, site)
+    logging.info(f"[{site}] Перерисовано страниц: {len(manifest['pages'])} из {len(scripts)} "
+                 f"за {(time.monotonic() - started) * 1000:.0f} мс, итоговый файл: {output_file(site)}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Запуск парсеров раздела 1 и объединение результатов")
+    parser.add_argument("--site", action="append", choices=sorted(site_profiles.SITE_PROFILES),
+                        help="профиль сайта (можно указать несколько раз)")
+    parser.add_argument("--all-sites", action="store_true", help="обработать все профили сайтов")
+    parser.add_argument("--queue", type=Path,
+                        help="распределённый режим: файл общей очереди на общем хранилище (страницы выполняет worker.py)")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="сколько исполнителей worker.py запустить на этой машине (только с --queue)")
+    parser.add_argument("--render-only", action="store_true",
+                        help="только перерисовать Markdown и итоговый файл по записям прошлого запуска (без браузера и сети)")
+    parser.add_argument("--tabs", type=int,
+                        help="режим вкладок: сколько страниц одновременно открывать в одном браузере "
+                             "(по умолчанию tabs_per_browser профиля сайта, 1 — у каждой страницы свой браузер)")
+    parser.add_argument("--profile", action="store_true",
+                        help="профилировать страницы: cProfile и стеки для флеймграфа в profiles/<запуск> "
+                             "каталога сайта, сводка по запуску — summary.txt")
+    return parser.parse_args(argv)
+
+
+def start_local_workers(queue_path, count, profile=False):
+    """Запускает исполнители общей очереди на этой машине."""
+    worker_script = Path(__file__).with_name("worker.py")
+    command = [sys.executable, str(worker_script), "--queue", str(queue_path)] + (["--profile"] if profile else [])
+    return [subprocess.Popen(command) for _ in range(count)]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.all_sites:
+        sites = sorted(site_profiles.SITE_PROFILES)
+    else:
+        sites = args.site or [site_profiles.DEFAULT_SITE]
+    logging.info(f"Сайты для обработки: {', '.join(sites)}")
+    if args.render_only:
+        # Перерисовка идёт в этом процессе и меняет его окружение, поэтому сайты обрабатываются по очереди
+        for site in sites:
+            try:
+                render_site(site)
+            except Exception as e:
+                logging.error(f"[{site}] Ошибка при перерисовке сайта: {e}")
+        return
+    local_workers = start_local_workers(args.queue, args.local_workers, args.profile) if args.queue else []
+    # Сайты обрабатываются параллельно и делят общий пул браузеров BROWSER_SLOTS
+    try:
+        with ThreadPoolExecutor(max_workers=len(sites)) as pool:
+            for site, future in [(site, pool.submit(run_site, site, args.queue, args.tabs, args.profile)) for site in sites]:
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"[{site}] Ошибка при обработке сайта: {e}")
+    finally:
+        for process in local_workers:
+            process.terminate()
+        for process in local_workers:
+            process.wait()
+        # Браузеры, пережившие свои скрипты (в том числе при прерывании запуска), не остаются в системе
+        browser_monitor.kill_all()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    setup_logging()
+    main()
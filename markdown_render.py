@@ -0,0 +1,117 @@
+# Потоковая запись Markdown-страниц по общим шаблонам: все скрипты DPO_*.py оформляют страницы одинаково
+import os
+
+from frontmatter import dump_front_matter
+from publish import staged_path
+
+# Шаблоны элементов страницы; формат меняется здесь и сразу для всех страниц
+TEMPLATES = {
+    "front_matter": "---\n{yaml}---",
+    "heading": "{marks} {text}",
+    "page_link": "[{label}]({url})",
+    "item": "- {text}",
+    "link_item": "- [{text}]({url})",
+    "table_row": "| {cells} |",
+}
+# Подпись ссылки на исходную страницу под заголовком
+PAGE_LINK_LABEL = "Перейти к странице"
+# Буфер записи: строки копятся в нём и уходят на диск крупными блоками
+BUFFER_SIZE = 64 * 1024
+
+
+class MarkdownWriter:
+    """Пишет страницу строка за строкой через буфер во временный файл и заменяет им итоговый при закрытии.
+
+    Пустые строки пропускаются, строки разделяются одним переводом строки (как "\\n".join по непустым строкам).
+    Если при записи возникло исключение, прежний файл остаётся нетронутым. В запуске оркестратора файл
+    пишется в каталог подготовки запуска и публикуется вместе с остальными страницами.
+    """
+
+    def __init__(self, path, buffer_size=BUFFER_SIZE):
+        self.path = staged_path(path)
+        self.buffer_size = buffer_size
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = None
+        self._started = False
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._tmp_path, "w", encoding="utf-8", buffering=self.buffer_size)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is not None:
+            self._tmp_path.unlink(missing_ok=True)
+            return False
+        os.replace(self._tmp_path, self.path)
+        return False
+
+    def line(self, text):
+        """Строка текста (пустая пропускается)."""
+        if not text or not text.strip():
+            return
+        if self._started:
+            self._file.write("\n")
+        self._file.write(text)
+        self._started = True
+
+    def lines(self, texts):
+        for text in texts:
+            self.line(text)
+
+    def blank(self):
+        """Пустая строка-разделитель."""
+        if self._started:
+            self._file.write("\n")
+        self._started = True
+
+    def front_matter(self, metadata, width=None):
+        self.line(TEMPLATES["front_matter"].format(yaml=dump_front_matter(metadata, width=width)))
+
+    def heading(self, text, level=1):
+        if text and text.strip():
+            self.line(TEMPLATES["heading"].format(marks="#" * level, text=text))
+
+    def page_link(self, url, label=PAGE_LINK_LABEL):
+        self.line(TEMPLATES["page_link"].format(label=label, url=url))
+
+    def title(self, text, url):
+        """Заголовок страницы и ссылка на неё."""
+        self.heading(text, 1)
+        self.page_link(url)
+
+    def section(self, title, content, level=2):
+        """Раздел: заголовок и его строки."""
+        self.heading(title, level)
+        self.lines(content)
+
+    def item(self, text, url=None):
+        """Пункт списка; со ссылкой, если передан url (пустой пункт пропускается)."""
+        if not text or not text.strip():
+            return
+        if url:
+            self.line(TEMPLATES["link_item"].format(text=text, url=url))
+        else:
+            self.line(TEMPLATES["item"].format(text=text))
+
+    def items(self, texts):
+        """Маркированный список."""
+        for text in texts:
+            self.item(text)
+
+    def link_items(self, links):
+        """Список ссылок из словарей с ключами text и url."""
+        for link in links:
+            self.item(link["text"], link.get("url"))
+
+    def table(self, headers, rows):
+        """Таблица; символ | в ячейках экранируется."""
+
+        def row(cells):
+            return TEMPLATES["table_row"].format(cells=" | ".join(str(cell).replace("|", "\\|") for cell in cells))
+
+        self.line(row(headers))
+        self.line("|" + "|".join("---" for _ in headers) + "|")
+        for cells in rows:
+            self.line(row(cells))
@@ -0,0 +1,143 @@
+# Метрики запуска для мониторинга: счётчики загрузок и кэшей в скриптах страниц и файл для textfile collector
+# node_exporter (Prometheus), который оркестратор пишет после каждого запуска сайта
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import site_profiles
+
+# Файл, в который скрипт страницы записывает свои счётчики при выходе (задаёт оркестратор)
+ENV_COUNTERS = "DPO_PAGE_COUNTERS"
+# Каталог textfile collector; по умолчанию — metrics_dir профиля сайта или metrics в каталоге сайта
+ENV_METRICS_DIR = "DPO_METRICS_DIR"
+METRICS_DIR_NAME = "metrics"
+# Кэши, для которых считается доля попаданий: счётчики <кэш>_cache_hits и <кэш>_cache_misses
+CACHES = ("documents", "assets")
+
+# Счётчики этого процесса (один скрипт — одна страница)
+COUNTERS = {}
+_lock = threading.Lock()
+_registered = False
+
+
+def count(name, value=1):
+    """Увеличивает счётчик страницы; при выходе скрипта счётчики уходят оркестратору."""
+    global _registered
+    with _lock:
+        COUNTERS[name] = COUNTERS.get(name, 0) + value
+        if not _registered:
+            atexit.register(dump)
+            _registered = True
+
+
+def dump():
+    """Сохраняет счётчики для оркестратора, если скрипт запущен им."""
+    path = os.environ.get(ENV_COUNTERS)
+    if not path:
+        return
+    with _lock:
+        counters = dict(COUNTERS)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(counters, f)
+    os.replace(tmp_path, path)
+
+
+def collect(path):
+    """Читает счётчики, записанные скриптом, и удаляет файл. None, если скрипт их не оставил."""
+    path = Path(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def metrics_dir(site):
+    """Каталог, который читает textfile collector."""
+    if os.environ.get(ENV_METRICS_DIR):
+        return Path(os.environ[ENV_METRICS_DIR])
+    configured = site_profiles.get_profile(site).get("metrics_dir")
+    return Path(configured) if configured else site_profiles.output_root(site) / METRICS_DIR_NAME
+
+
+def _number(value):
+    return str(value) if isinstance(value, int) else repr(round(float(value), 3))
+
+
+def _labels(**labels):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def format_metrics(site, succeeded, manifest, page_seconds, page_counters, page_commands, run_seconds):
+    """Текст метрик запуска сайта в формате Prometheus (все значения — gauge последнего запуска).
+
+    Запущенные страницы — это страницы манифеста и пропущенные; страница в метках — имя скрипта без расширения.
+    """
+    families = []
+
+    def family(name, help_text, samples):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        lines.extend(f"{name}{_labels(**labels)} {_number(value)}" for labels, value in samples)
+        families.append("\n".join(lines))
+
+    totals = {}
+    for counters in page_counters.values():
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+    unchanged = sum(1 for entry in manifest["pages"] if entry["status"] == "unchanged")
+
+    family("dpo_run_timestamp_seconds", "Время окончания последнего запуска (Unix).", [({"site": site}, time.time())])
+    family("dpo_run_duration_seconds", "Длительность последнего запуска, с.", [({"site": site}, run_seconds)])
+    family("dpo_pages_attempted", "Страниц запущено.", [({"site": site}, len(manifest["pages"]) + len(manifest["missing"]))])
+    family("dpo_pages_succeeded", "Страниц, скрипт которых завершился успешно.", [({"site": site}, succeeded)])
+    family("dpo_pages_published", "Страниц в манифесте запуска.", [({"site": site}, len(manifest["pages"]))])
+    family("dpo_pages_missing", "Страниц без опубликованного Markdown-файла.", [({"site": site}, len(manifest["missing"]))])
+    family("dpo_page_duration_seconds", "Длительность скрипта успешной страницы, с.",
+           [({"site": site, "page": Path(page).stem}, seconds) for page, seconds in sorted(page_seconds.items())])
+    family("dpo_page_size_bytes", "Размер опубликованного Markdown-файла страницы, байт.",
+           [({"site": site, "page": Path(entry["file"]).stem}, entry["size"]) for entry in manifest["pages"]])
+    family("dpo_page_driver_commands", "Команд драйвера браузера на странице.",
+           [({"site": site, "page": Path(page).stem}, item["count"]) for page, item in sorted(page_commands.items())])
+    family("dpo_bytes_fetched", "Байт загружено вне браузера (документы, изображения).",
+           [({"site": site}, totals.get("bytes_fetched", 0))])
+    family("dpo_pdf_pages_parsed", "Страниц PDF разобрано (без взятых из кэша).",
+           [({"site": site}, totals.get("pdf_pages_parsed", 0))])
+
+    # Страница — тоже кэш: неизменившаяся страница не перерисовывается
+    caches = {"pages": (unchanged, len(manifest["pages"]) - unchanged)}
+    for cache in CACHES:
+        caches[cache] = (totals.get(f"{cache}_cache_hits", 0), totals.get(f"{cache}_cache_misses", 0))
+    family("dpo_cache_hits", "Попаданий в кэш.",
+           [({"site": site, "cache": cache}, hits) for cache, (hits, _) in caches.items()])
+    family("dpo_cache_requests", "Обращений к кэшу.",
+           [({"site": site, "cache": cache}, hits + misses) for cache, (hits, misses) in caches.items()])
+    family("dpo_cache_hit_ratio", "Доля обращений, обслуженных кэшем.",
+           [({"site": site, "cache": cache}, hits / (hits + misses))
+            for cache, (hits, misses) in caches.items() if hits + misses])
+    return "\n".join(families) + "\n"
+
+
+def write_textfile(site, succeeded, manifest, page_seconds, page_counters, page_commands, run_seconds):
+    """Записывает метрики запуска в dpo_<сайт>.prom каталога textfile collector.
+
+    Файл заменяется целиком: collector не увидит его наполовину записанным. Возвращает путь к файлу.
+    """
+    directory = metrics_dir(site)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"dpo_{site}.prom"
+    # Временный файл без расширения .prom, чтобы collector его не читал
+    tmp_path = directory / f".dpo_{site}.prom.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(format_metrics(site, succeeded, manifest, page_seconds, page_counters, page_commands,
+                               run_seconds))
+    os.replace(tmp_path, path)
+    logging.info(f"[{site}] Метрики запуска: {path}")
+    return path
@@ -0,0 +1,140 @@
+# Метаданные страницы из <head> за одно обращение к браузеру
+import json
+import logging
+import re
+from datetime import datetime
+
+# Длина описания, собранного из текста страницы, когда в <head> его нет
+DESCRIPTION_LIMIT = 160
+
+# Скрипт читает весь <head> и запасные селекторы страницы одним вызовом execute_script.
+# Запасной селектор передаётся как [способ поиска Selenium, значение, объединять ли все совпадения]
+_HEAD_SCRIPT = """
+const fallbacks = arguments[0] || {};
+const text = el => (el.innerText || el.textContent || "").trim();
+const content = selector => {
+    const el = document.querySelector(selector);
+    return el ? (el.getAttribute("content") || el.getAttribute("href") || "").trim() : "";
+};
+const find = (by, value) => {
+    if (by === "xpath") {
+        const found = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        return Array.from({length: found.snapshotLength}, (_, i) => found.snapshotItem(i));
+    }
+    if (by === "tag name") return Array.from(document.getElementsByTagName(value));
+    if (by === "class name") return Array.from(document.getElementsByClassName(value));
+    if (by === "id") return [document.getElementById(value)].filter(Boolean);
+    return Array.from(document.querySelectorAll(value));
+};
+const properties = {};
+document.querySelectorAll("meta[property]").forEach(m => {
+    properties[m.getAttribute("property")] = (m.getAttribute("content") || "").trim();
+});
+const fallback = {};
+for (const [key, specs] of Object.entries(fallbacks)) {
+    const texts = [];
+    let join = false;
+    for (const [by, value, all] of specs) {
+        join = join || all;
+        find(by, value).forEach(el => { const found = text(el); if (found) texts.push(found); });
+    }
+    fallback[key] = join ? texts.join(" ") : (texts[0] || "");
+}
+const titleEl = document.querySelector("title");
+return {
+    title: titleEl ? text(titleEl) : "",
+    description: content("meta[name='description']"),
+    canonical: content("link[rel='canonical']"),
+    last_modified: content("meta[name='last-modified']") || content("meta[http-equiv='last-modified' i]"),
+    properties: properties,
+    json_ld: Array.from(document.querySelectorAll("script[type='application/ld+json']"), s => s.textContent),
+    fallback: fallback,
+};
+"""
+
+
+def _fallback_specs(selectors, join):
+    """Приводит селектор (By, значение) или их список к виду, понятному скрипту."""
+    if not selectors:
+        return None
+    if isinstance(selectors, tuple):
+        selectors = [selectors]
+    return [[by, value, join] for by, value in selectors]
+
+
+def _json_ld_items(blocks):
+    """Разбирает блоки JSON-LD в плоский список объектов (включая содержимое @graph)."""
+    items = []
+    for block in blocks:
+        try:
+            value = json.loads(block)
+        except ValueError:
+            continue
+        stack = value if isinstance(value, list) else [value]
+        while stack:
+            item = stack.pop(0)
+            if isinstance(item, dict):
+                items.append(item)
+                stack.extend(item.get("@graph", []))
+    return items
+
+
+def read_head(driver, title_fallback=None, description_fallback=None, description_join=False):
+    """Читает <head> страницы: title, description, canonical, OpenGraph, JSON-LD, дату изменения.
+
+    Запасные селекторы (By, значение) вычисляются в том же обращении к браузеру.
+    """
+    fallbacks = {}
+    if _fallback_specs(title_fallback, False):
+        fallbacks["title"] = _fallback_specs(title_fallback, False)
+    if _fallback_specs(description_fallback, description_join):
+        fallbacks["description"] = _fallback_specs(description_fallback, description_join)
+    head = driver.execute_script(_HEAD_SCRIPT, fallbacks)
+    head["json_ld"] = _json_ld_items(head.get("json_ld", []))
+    head["opengraph"] = {k: v for k, v in head.pop("properties", {}).items() if v}
+    head["lastmod"] = (
+        head["opengraph"].get("article:modified_time")
+        or head["opengraph"].get("og:updated_time")
+        or next((item["dateModified"] for item in head["json_ld"] if item.get("dateModified")), "")
+        or head.get("last_modified", "")
+    )
+    return head
+
+
+def read_metadata(driver, url, categories, tags, title_fallback=None, description_fallback=None, description_join=False):
+    """Собирает метаданные страницы для front matter.
+
+    Порядок полей прежний (title, description, url, date, categories, tags); canonical и lastmod
+    добавляются, только если страница их объявляет.
+    """
+    try:
+        head = read_head(driver, title_fallback, description_fallback, description_join)
+    except Exception as e:
+        logging.warning(f"Ошибка при чтении <head> страницы: {e}")
+        head = {"title": "", "description": "", "canonical": "", "lastmod": "", "opengraph": {}, "fallback": {}}
+    opengraph = head["opengraph"]
+    fallback = head.get("fallback", {})
+
+    title = head["title"] or opengraph.get("og:title") or fallback.get("title") or "Без названия"
+    description = head["description"] or opengraph.get("og:description")
+    if not description:
+        logging.warning(f"На странице {url} нет meta description, используется текст страницы")
+        intro_text = fallback.get("description", "")
+        if intro_text:
+            description = re.sub(r'[#*\[\]]', '', intro_text)[:DESCRIPTION_LIMIT].strip() + "..."
+        else:
+            description = "Описание отсутствует"
+
+    metadata = {
+        "title": title,
+        "description": description,
+        "url": url,
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "categories": list(categories),
+        "tags": list(tags),
+    }
+    if head["canonical"]:
+        metadata["canonical"] = head["canonical"]
+    if head["lastmod"]:
+        metadata["lastmod"] = head["lastmod"]
+    return metadata
@@ -0,0 +1,156 @@
+# Профилирование страниц: скрипт страницы выполняется под cProfile, а параллельно снимаются стеки для флеймграфа.
+# Запуск одной страницы: python profiling.py DPO_FAQ.py; в запуске сайта — python main.py --profile
+import argparse
+import collections
+import cProfile
+import io
+import pstats
+import re
+import runpy
+import sys
+import threading
+import time
+from pathlib import Path
+
+import site_profiles
+
+BASE_DIR = Path(__file__).resolve().parent
+# Каталог профилей в каталоге сайта: profiles/<запуск>
+PROFILE_DIR_NAME = "profiles"
+# Интервал снятия стеков для флеймграфа, секунды
+SAMPLE_INTERVAL = 0.005
+# Сколько функций показывать в сводке
+TOP_FUNCTIONS = 30
+# Встроенные функции, в которых скрипт ждёт браузер или сеть, а не работает сам
+WAIT_FUNCTIONS = re.compile(r"_socket|_ssl|select|poll|time\.sleep|_thread\.lock")
+
+
+def profile_dir(site, run_id):
+    """Каталог профилей запуска run_id."""
+    return site_profiles.output_root(site) / PROFILE_DIR_NAME / run_id
+
+
+class StackSampler:
+    """Раз в interval снимает стек потока, запустившего профилирование, и считает одинаковые стеки.
+
+    Сохраняет их в формате collapsed ("функция;функция;... число"), который читают flamegraph.pl и speedscope.
+    Стеки снимаются по настенному времени, поэтому ожидание браузера тоже попадает во флеймграф.
+    Кадры до root (сам профилировщик и runpy) в стек не входят.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, root=None):
+        self.interval = interval
+        self.root = root
+        self.counts = collections.Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and frame.f_code is not self.root:
+                if not frame.f_code.co_filename.startswith("<frozen"):
+                    stack.append(f"{Path(frame.f_code.co_filename).name}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def profile_script(script_path, out_dir):
+    """Выполняет скрипт страницы как __main__ под профилировщиком.
+
+    Сохраняет <страница>.prof (cProfile, для pstats и snakeviz) и <страница>.collapsed (стеки для флеймграфа)
+    и при выходе скрипта через sys.exit тоже; код выхода скрипта сохраняется.
+    """
+    script_path = Path(script_path).resolve()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sys.argv = [str(script_path)]
+    sys.path[0] = str(script_path.parent)
+    profiler = cProfile.Profile()
+    sampler = StackSampler(root=profile_script.__code__)
+    sampler.start()
+    profiler.enable()
+    try:
+        runpy.run_path(str(script_path), run_name="__main__")
+    finally:
+        profiler.disable()
+        sampler.stop()
+        profiler.dump_stats(str(out_dir / f"{script_path.stem}.prof"))
+        sampler.write(out_dir / f"{script_path.stem}.collapsed")
+
+
+def split_time(stats):
+    """(всё время, время ожидания браузера и сети) профиля в секундах."""
+    waiting = sum(tottime for (filename, _, name), (_, _, tottime, _, _) in stats.stats.items()
+                  if filename == "~" and WAIT_FUNCTIONS.search(name))
+    return stats.total_tt, waiting
+
+
+def summarize(directory, top=TOP_FUNCTIONS):
+    """Сводка профилей запуска в summary.txt и общий флеймграф всех страниц в run.collapsed.
+
+    В сводке — доля ожидания браузера и сети по страницам и самые затратные функции за весь запуск,
+    отдельно — функции скриптов этого репозитория. Возвращает путь к сводке или None, если профилей нет.
+    """
+    directory = Path(directory)
+    files = sorted(directory.glob("*.prof"))
+    if not files:
+        return None
+    out = io.StringIO()
+    out.write(f"{'Страница':<60} {'Всего, с':>9} {'Ожидание, с':>12} {'Python, с':>10}\n")
+    for path in files:
+        total, waiting = split_time(pstats.Stats(str(path)))
+        out.write(f"{path.stem:<60} {total:>9.2f} {waiting:>12.2f} {total - waiting:>10.2f}\n")
+
+    stats = pstats.Stats(*(str(path) for path in files), stream=out)
+    out.write("\nСамые затратные функции за запуск (собственное время):\n")
+    stats.sort_stats("tottime").print_stats(top)
+    out.write("\nФункции скриптов страниц и общих модулей (накопленное время):\n")
+    stats.sort_stats("cumulative").print_stats(re.escape(str(BASE_DIR)), top)
+
+    summary = directory / "summary.txt"
+    summary.write_text(out.getvalue(), encoding="utf-8")
+    # Общий флеймграф: стеки каждой страницы под её именем
+    with open(directory / "run.collapsed", "w", encoding="utf-8") as combined:
+        for path in sorted(directory.glob("*.collapsed")):
+            if path.name == "run.collapsed":
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    combined.write(f"{path.stem};{line}")
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Профилирование скрипта страницы (cProfile и стеки для флеймграфа)")
+    parser.add_argument("script", type=Path, help="скрипт страницы DPO_*.py")
+    parser.add_argument("--output", type=Path,
+                        help="каталог профилей (по умолчанию profiles/<время> в каталоге сайта)")
+    parser.add_argument("--no-summary", action="store_true",
+                        help="не писать сводку (её пишет оркестратор после всех страниц)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    output = args.output or profile_dir(site_profiles.current_site(), time.strftime("%Y%m%d_%H%M%S"))
+    try:
+        profile_script(args.script, output)
+    finally:
+        if not args.no_summary:
+            print(f"Профиль страницы: {output}, сводка: {summarize(output)}")
@@ -0,0 +1,151 @@
+# Публикация результатов запуска: скрипты пишут Markdown в каталог подготовки запуска, а оркестратор переносит
+# готовые файлы в каталог сайта и записывает манифест. Объединение читает ровно файлы из манифеста
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+import site_profiles
+
+# Каталоги подготовки запусков в каталоге сайта: .staging/<запуск>
+STAGING_DIR_NAME = ".staging"
+# Манифест последнего опубликованного запуска в каталоге сайта
+MANIFEST_NAME = "_manifest.json"
+# Каталог подготовки текущего запуска для скриптов страниц (задаёт оркестратор)
+ENV_STAGING = "DPO_STAGING_DIR"
+# Каталоги подготовки прерванных запусков старше стольких часов удаляются
+STALE_STAGING_HOURS = 24
+# Отметка скрипта в каталоге подготовки: страница не изменилась, опубликованный файл остаётся (<файл>.unchanged)
+UNCHANGED_SUFFIX = ".unchanged"
+# Размер блока при подсчёте хеша файла
+CHUNK_SIZE = 1024 * 1024
+
+
+def staging_dir(site, run_id):
+    """Каталог подготовки запуска run_id."""
+    return site_profiles.output_root(site) / STAGING_DIR_NAME / run_id
+
+
+def staged_path(path):
+    """Куда на самом деле писать файл страницы: в каталог подготовки запуска, если он задан, иначе по месту."""
+    staging = os.environ.get(ENV_STAGING)
+    if not staging:
+        return Path(path)
+    return Path(staging) / Path(path).name
+
+
+def unchanged_marker(staging, name):
+    """Отметка о неизменившейся странице name в каталоге подготовки."""
+    return Path(staging) / f"{name}{UNCHANGED_SUFFIX}"
+
+
+def mark_unchanged(path):
+    """Сообщает оркестратору, что файл страницы path не перезаписывается, потому что страница не изменилась.
+
+    Без каталога подготовки (ручной запуск) ничего не делает.
+    """
+    staging = os.environ.get(ENV_STAGING)
+    if not staging:
+        return None
+    marker = unchanged_marker(staging, Path(path).name)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    return marker
+
+
+def manifest_path(site):
+    return site_profiles.output_root(site) / MANIFEST_NAME
+
+
+def load_manifest(site):
+    """Манифест последнего опубликованного запуска или None."""
+    path = manifest_path(site)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def file_digest(path):
+    """SHA-256 содержимого файла."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _carried_entry(path, previous):
+    """Запись манифеста для страницы, которая не изменилась: хеш берётся из прошлого манифеста,
+    если файл с тех пор не менялся (тот же размер и время изменения), иначе считается заново."""
+    stat = path.stat()
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+        return dict(previous)
+    return {"sha256": file_digest(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def publish(site, run_id, pages):
+    """Публикует запуск и записывает манифест. Возвращает манифест.
+
+    pages — [(имя Markdown-файла, {"succeeded", "url", "seconds"})] в порядке раздела. Новые файлы переносятся
+    из каталога подготовки в каталог сайта; успешные страницы, отмеченные скриптом как неизменившиеся
+    (mark_unchanged), остаются прежними; остальные попадают в список пропущенных. Манифест записывается последним.
+    """
+    out_dir = site_profiles.output_root(site)
+    staging = staging_dir(site, run_id)
+    previous = {entry["file"]: entry for entry in (load_manifest(site) or {}).get("pages", [])}
+    entries = []
+    missing = []
+    for name, page in pages:
+        staged = staging / name
+        published = out_dir / name
+        if staged.exists():
+            os.replace(staged, published)
+            stat = published.stat()
+            entry = {"sha256": file_digest(published), "size": stat.st_size, "mtime": stat.st_mtime,
+                     "status": "updated"}
+        elif page.get("succeeded") and unchanged_marker(staging, name).exists() and published.exists():
+            entry = {**_carried_entry(published, previous.get(name)), "status": "unchanged"}
+        else:
+            missing.append(name)
+            continue
+        entry.update(file=name, url=page.get("url"), seconds=page.get("seconds"))
+        entries.append(entry)
+
+    manifest = {
+        "site": site,
+        "run_id": run_id,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "pages": entries,
+        "missing": missing,
+    }
+    path = manifest_path(site)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+    shutil.rmtree(staging, ignore_errors=True)
+    prune_staging(site)
+    return manifest
+
+
+def prune_staging(site):
+    """Удаляет каталоги подготовки прерванных запусков."""
+    root = site_profiles.output_root(site) / STAGING_DIR_NAME
+    if not root.exists():
+        return
+    cutoff = time.time() - STALE_STAGING_HOURS * 3600
+    for path in root.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                logging.info(f"Удалён каталог подготовки прерванного запуска {path.name}")
+        except OSError:
+            continue
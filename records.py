@@ -0,0 +1,61 @@
+# Хранилище структурированных записей страниц между запусками
+import json
+import os
+from pathlib import Path
+
+import site_profiles
+
+
+def records_dir():
+    """Каталог с записями: задаётся оркестратором через DPO_RECORDS_DIR, иначе берётся из профиля сайта."""
+    if os.environ.get("DPO_RECORDS_DIR"):
+        return Path(os.environ["DPO_RECORDS_DIR"])
+    return site_profiles.records_dir()
+
+
+def page_name(script):
+    """Возвращает имя страницы по пути к скрипту (DPO_FAQ.py -> DPO_FAQ)."""
+    return Path(script).stem
+
+
+def record_path(script, directory=None):
+    """Путь к JSON-файлу с записями страницы."""
+    return Path(directory or records_dir()) / f"{page_name(script)}.json"
+
+
+def load_record(script, directory=None):
+    """Загружает записи страницы, сохранённые в прошлом запуске, или None."""
+    path = record_path(script, directory)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_record(script, record, directory=None):
+    """Сохраняет записи страницы (через временный файл, чтобы не оставить обрезанный JSON)."""
+    path = record_path(script, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+    return path
+
+
+def iter_records(directory=None):
+    """Перебирает все сохранённые записи страниц в порядке имён."""
+    directory = Path(directory or records_dir())
+    if not directory.exists():
+        return
+    for path in sorted(directory.glob("*.json")):
+        if path.name.startswith("_"):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                yield path.stem, json.load(f)
+        except (OSError, ValueError):
+            continue
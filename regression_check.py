@@ -0,0 +1,270 @@
+# Регрессионная проверка парсеров без живого сайта: каждый скрипт DPO_*.py запускается против сохранённой копии
+# своей страницы (фикстуры), которую отдаёт локальный HTTP-сервер. Запись страницы сравнивается с эталоном,
+# а время и число команд драйвера — с бюджетом страницы.
+# Запуск: python regression_check.py [DPO_FAQ ...]; сохранить страницы с сайта: --capture;
+# принять текущий результат как эталон и пересчитать бюджеты: --update
+import argparse
+import difflib
+import functools
+import importlib.util
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import change_detection
+import command_stats
+import site_profiles
+
+BASE_DIR = Path(__file__).resolve().parent
+# Фикстуры страниц: fixtures/<страница>/site — копия сайта, golden.json — эталон записи, budget.json — бюджет
+FIXTURES_DIR = BASE_DIR / "fixtures"
+# Бюджет при --update: измеренное значение с запасом; время не меньше MIN_SECONDS
+SECONDS_MARGIN = 1.5
+COMMANDS_MARGIN = 1.1
+MIN_SECONDS = 10
+# Сколько строк расхождения с эталоном показывать
+DIFF_LINES = 40
+# Chrome, в котором скрипты страниц открывают копию сайта: имена в PATH и обычные места установки
+CHROME_COMMANDS = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+CHROME_PATHS = (
+    Path(os.environ.get("PROGRAMFILES", r"C:\Program Files")) / "Google/Chrome/Application/chrome.exe",
+    Path(os.environ.get("PROGRAMFILES(X86)", r"C:\Program Files (x86)")) / "Google/Chrome/Application/chrome.exe",
+    Path(os.environ.get("LOCALAPPDATA", "~")).expanduser() / "Google/Chrome/Application/chrome.exe",
+    Path("/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"),
+)
+# Адрес страницы в скрипте: site_url("https://academydpo.org/...", __file__)
+_URL_RE = re.compile(r"site_url\(\s*[\"']([^\"']+)[\"']")
+# Ссылки на файлы того же сайта, которые сохраняются вместе со страницей (документы, изображения, стили, скрипты)
+_RESOURCE_RE = re.compile(r"""(?:href|src)=["']([^"'#?]+\.(?:pdf|docx?|xlsx?|png|jpe?g|gif|svg|webp|css|js))["']""",
+                          re.IGNORECASE)
+# Абсолютные адреса эталонного сайта в сохранённой странице заменяются на адреса от корня
+_REFERENCE_RE = re.compile(r"(?:https?:)?//" + re.escape(urlsplit(site_profiles.REFERENCE_BASE_URL).netloc))
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Отдаёт копию сайта: адрес страницы без расширения — её index.html, без перенаправления на адрес со слешем."""
+
+    def translate_path(self, path):
+        local = super().translate_path(path)
+        if os.path.isdir(local):
+            return os.path.join(local, "index.html")
+        return local
+
+    def log_message(self, format, *args):
+        pass
+
+
+def missing_browser():
+    """Чего не хватает, чтобы запустить скрипты страниц (selenium или Chrome), или None."""
+    if importlib.util.find_spec("selenium") is None:
+        return "не установлен selenium"
+    if not any(shutil.which(command) for command in CHROME_COMMANDS) and not any(p.exists() for p in CHROME_PATHS):
+        return "не найден Chrome"
+    return None
+
+
+def page_url(script):
+    """Адрес страницы скрипта на эталонном сайте."""
+    match = _URL_RE.search((BASE_DIR / script).read_text(encoding="utf-8"))
+    return match.group(1) if match else None
+
+
+def fixture_dir(page):
+    return FIXTURES_DIR / page
+
+
+def local_path(root, url):
+    """Файл копии сайта для адреса: страница — <путь>/index.html, файл — по своему пути."""
+    path = urlsplit(url).path.strip("/")
+    if not path or not Path(path).suffix:
+        return root / path / "index.html"
+    return root / path
+
+
+def capture(script):
+    """Сохраняет страницу скрипта и файлы сайта, на которые она ссылается, в fixtures/<страница>/site."""
+    from http_pool import get_session
+
+    url = page_url(script)
+    root = fixture_dir(Path(script).stem) / "site"
+    session = get_session()
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+    html = response.text
+    resources = {urljoin(url, link) for link in _RESOURCE_RE.findall(html)}
+    reference_host = urlsplit(site_profiles.REFERENCE_BASE_URL).netloc
+    saved = 0
+    for resource in sorted(resources):
+        if urlsplit(resource).netloc != reference_host:
+            continue
+        try:
+            content = session.get(resource, timeout=30)
+            content.raise_for_status()
+        except Exception as e:
+            print(f"  {resource}: не сохранён ({e})")
+            continue
+        target = local_path(root, resource)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content.content)
+        saved += 1
+    target = local_path(root, url)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(_REFERENCE_RE.sub("", html), encoding="utf-8")
+    return saved
+
+
+def run_page(script, root, timeout):
+    """Запускает скрипт против копии сайта из root. Возвращает (запись или None, секунды, команд драйвера, ошибка)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(FixtureHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory(prefix="dpo-regression-") as work:
+            work = Path(work)
+            env = os.environ.copy()
+            for name in ("DPO_BROWSER_ADDRESS", "DPO_STAGING_DIR", "DPO_PAGE_COUNTERS"):
+                env.pop(name, None)
+            env.update({
+                "DPO_BASE_URL": base_url,
+                "DPO_OUTPUT_ROOT": str(work),
+                "DPO_RECORDS_DIR": str(work / "records"),
+                "DPO_PAGE_DEADLINE": str(timeout),
+                command_stats.ENV_STATS: str(work / "commands.json"),
+            })
+            started = time.monotonic()
+            try:
+                result = subprocess.run([sys.executable, str(BASE_DIR / script)], cwd=work, env=env, timeout=timeout,
+                                        capture_output=True, text=True, encoding="utf-8", errors="replace")
+            except subprocess.TimeoutExpired:
+                return None, time.monotonic() - started, 0, f"не завершился за {timeout} с"
+            seconds = time.monotonic() - started
+            commands = (command_stats.collect(work / "commands.json") or {}).get("count", 0)
+            error = None
+            if result.returncode != 0:
+                lines = result.stderr.strip().splitlines() or result.stdout.strip().splitlines()
+                error = f"код возврата {result.returncode}" + (f": {lines[-1]}" if lines else "")
+            record_path = work / "records" / f"{Path(script).stem}.json"
+            record = json.loads(record_path.read_text(encoding="utf-8")) if record_path.exists() else None
+            return normalize(record, base_url) if record else None, seconds, commands, error
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def normalize(record, base_url):
+    """Запись страницы в виде для сравнения: без меняющихся полей, с адресами эталонного сайта."""
+    comparable = {
+        "url": record.get("url"),
+        "metadata": {k: v for k, v in (record.get("metadata") or {}).items()
+                     if k not in change_detection.VOLATILE_METADATA},
+        "data": record.get("data"),
+    }
+    text = json.dumps(comparable, ensure_ascii=False, indent=1, sort_keys=True)
+    return text.replace(base_url, site_profiles.REFERENCE_BASE_URL) + "\n"
+
+
+def load_budget(page):
+    path = fixture_dir(page) / "budget.json"
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def check_page(script, update=False):
+    """Проверяет страницу по её фикстуре. Возвращает (секунды, команды, список нарушений) или None без фикстуры."""
+    page = Path(script).stem
+    directory = fixture_dir(page)
+    if not (directory / "site").exists():
+        return None
+    budget = load_budget(page)
+    timeout = max(MIN_SECONDS, int(budget.get("seconds", 60) * 3))
+    output, seconds, commands, error = run_page(script, directory / "site", timeout)
+    problems = [error] if error else []
+    if output is None:
+        problems.append("запись страницы не создана")
+        return seconds, commands, problems
+
+    golden_path = directory / "golden.json"
+    # Упавший запуск не становится эталоном
+    if update and not problems:
+        golden_path.write_text(output, encoding="utf-8")
+        budget = {"seconds": max(MIN_SECONDS, round(seconds * SECONDS_MARGIN, 1)),
+                  "commands": math.ceil(commands * COMMANDS_MARGIN)}
+        (directory / "budget.json").write_text(json.dumps(budget, indent=1) + "\n", encoding="utf-8")
+        return seconds, commands, problems
+
+    if not golden_path.exists():
+        problems.append("нет эталона (golden.json), запустите с --update")
+    else:
+        golden = golden_path.read_text(encoding="utf-8")
+        if output != golden:
+            diff = list(difflib.unified_diff(golden.splitlines(), output.splitlines(),
+                                             "golden.json", "результат", lineterm="", n=1))
+            problems.append("запись отличается от эталона:\n      " + "\n      ".join(diff[:DIFF_LINES]))
+    if budget.get("seconds") and seconds > budget["seconds"]:
+        problems.append(f"дольше бюджета {budget['seconds']} с")
+    if budget.get("commands") and commands > budget["commands"]:
+        problems.append(f"команд драйвера больше бюджета {budget['commands']}")
+    return seconds, commands, problems
+
+
+def default_scripts():
+    return sorted(path.name for path in BASE_DIR.glob("DPO_*.py"))
+
+
+def fixture_scripts():
+    """Скрипты страниц, для которых сохранена фикстура."""
+    return [script for script in default_scripts() if (fixture_dir(Path(script).stem) / "site").exists()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка парсеров на сохранённых страницах: эталоны и бюджеты")
+    parser.add_argument("pages", nargs="*", help="скрипты страниц (по умолчанию все, у которых есть фикстура)")
+    parser.add_argument("--capture", action="store_true", help="сохранить страницы с живого сайта в fixtures/")
+    parser.add_argument("--update", action="store_true",
+                        help="принять текущий результат как эталон и пересчитать бюджеты по замеру")
+    args = parser.parse_args(argv)
+    scripts = [page if page.endswith(".py") else f"{page}.py" for page in args.pages] or default_scripts()
+
+    if args.capture:
+        for script in scripts:
+            saved = capture(script)
+            print(f"{Path(script).stem}: страница и файлов {saved} сохранены в {fixture_dir(Path(script).stem)}")
+        return 0
+
+    reason = missing_browser()
+    if reason:
+        print(f"Проверка невозможна: {reason}")
+        return 1
+    failures = checked = 0
+    for script in scripts:
+        result = check_page(script, args.update)
+        if result is None:
+            if args.pages:
+                print(f"{'':>20}  {script}  <- нет фикстуры (сохраните её с --capture)")
+                failures += 1
+            continue
+        seconds, commands, problems = result
+        checked += 1
+        failures += bool(problems)
+        print(f"{seconds:7.1f} с {commands:6d} ком.  {script}" + (f"  <- {'; '.join(problems)}" if problems else ""))
+    print(f"Страниц проверено: {checked}, с нарушениями: {failures}" + (" (эталоны обновлены)" if args.update else ""))
+    # Пустой набор фикстур — не успешная проверка: сохраните страницы с --capture и эталоны с --update
+    if not checked:
+        print(f"Нет ни одной фикстуры в {FIXTURES_DIR}")
+        return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# Повторные попытки: экспоненциальная задержка с джиттером, очередь повторов и автомат отключения по хосту
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+# Код выхода скрипта, когда страница не получена и её нужно повторить, а не публиковать пустой файл
+EXIT_RETRY = 75
+
+# Повторы загрузки внутри скрипта
+FETCH_ATTEMPTS = 3
+FETCH_BASE_DELAY = 1.0
+FETCH_MAX_DELAY = 10.0
+
+# Повторы страницы в оркестраторе
+MAX_ATTEMPTS = 3
+QUEUE_BASE_DELAY = 5.0
+QUEUE_MAX_DELAY = 120.0
+
+# Автомат отключения: после стольких подряд неудач хост отдыхает BREAKER_COOLDOWN секунд
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 60.0
+
+
+def backoff_delay(attempt, base, cap):
+    """Задержка перед попыткой attempt (с 1): «полный джиттер» от 0 до base * 2^(attempt-1), не больше cap."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def fetch_page(driver, url, attempts=FETCH_ATTEMPTS):
+    """Открывает страницу в браузере, повторяя неудачные попытки с экспоненциальной задержкой."""
+    for attempt in range(1, attempts + 1):
+        try:
+            driver.get(url)
+            return
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt, FETCH_BASE_DELAY, FETCH_MAX_DELAY)
+            logging.warning(f"Не удалось открыть {url} (попытка {attempt} из {attempts}): {e}. Повтор через {delay:.1f} с")
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """Автомат отключения для хоста: после серии неудач временно перестаёт пропускать запросы."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Сколько секунд хост ещё закрыт (0 — запросы разрешены)."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        """Учитывает неудачу; возвращает True, если автомат только что разомкнулся."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold and (
+                    self.opened_at is None or time.monotonic() >= self.opened_at + self.cooldown):
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+class RetryQueue:
+    """Очередь заданий с отложенным повтором и приоритетами.
+
+    Из готовых заданий первым выдаётся задание с меньшим priority, при равенстве — добавленное раньше,
+    поэтому без приоритетов повтор уходит в конец очереди и не задерживает исправные страницы.
+    Отложенное задание становится готовым по истечении delay.
+    get() возвращает None, когда очередь пуста и ни одно задание не выполняется.
+    """
+
+    def __init__(self, items=()):
+        self._delayed = []
+        self._ready = []
+        self._counter = itertools.count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        for item in items:
+            self.put(item)
+
+    def put(self, item, delay=0.0, priority=0):
+        with self._cond:
+            entry = (priority, next(self._counter), item)
+            if delay > 0:
+                heapq.heappush(self._delayed, (time.monotonic() + delay, entry))
+            else:
+                heapq.heappush(self._ready, entry)
+            self._cond.notify_all()
+
+    def get(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    heapq.heappush(self._ready, heapq.heappop(self._delayed)[1])
+                if self._ready:
+                    self._in_flight += 1
+                    return heapq.heappop(self._ready)[2]
+                if self._delayed:
+                    self._cond.wait(self._delayed[0][0] - now)
+                elif self._in_flight:
+                    self._cond.wait()
+                else:
+                    return None
+
+    def task_done(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
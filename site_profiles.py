@@ -0,0 +1,98 @@
+# Профили сайтов: базовый URL, каталог результатов, переопределения страниц и лимиты параллельности
+import os
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Адрес, под который написаны скрипты DPO_*.py; для других сайтов он подменяется на base_url профиля
+REFERENCE_BASE_URL = "https://academydpo.org"
+
+DEFAULT_SITE = "academydpo"
+
+# Общий на все сайты лимит одновременно запущенных браузеров (один скрипт — один Chrome)
+MAX_BROWSERS = 4
+
+# Профили сайтов.
+# pages: переопределения для отдельных страниц по имени скрипта без .py:
+#   url — другой адрес страницы, categories/tags — значения метаданных, enabled=False — не запускать страницу
+# persistent_browser: браузеры работают на постоянных профилях с дисковым кэшем (см. browser_profile.py)
+# driver_backend: "webdriver" (по умолчанию) или "cdp" — извлечение напрямую по DevTools (см. cdp_driver.py)
+# tabs_per_browser: сколько страниц одновременно работают вкладками одного общего браузера (см. tab_host.py);
+#   1 — у каждой страницы свой Chrome
+# metrics_dir: каталог textfile collector node_exporter, куда пишутся метрики запуска (см. metrics.py);
+#   по умолчанию metrics в каталоге сайта
+SITE_PROFILES = {
+    "academydpo": {
+        "base_url": "https://academydpo.org",
+        "output_root": r"D:\python_work\dpo\dpo",
+        "max_workers": 4,
+        "http_pool_size": 10,
+        "persistent_browser": True,
+        "pages": {},
+    },
+}
+
+
+def current_site():
+    """Имя профиля, с которым запущен процесс (задаётся оркестратором через DPO_SITE)."""
+    return os.environ.get("DPO_SITE", DEFAULT_SITE)
+
+
+def get_profile(site=None):
+    """Возвращает профиль сайта; неизвестное имя — ошибка конфигурации."""
+    site = site or current_site()
+    if site not in SITE_PROFILES:
+        raise KeyError(f"Неизвестный профиль сайта: {site}. Доступные: {', '.join(sorted(SITE_PROFILES))}")
+    return SITE_PROFILES[site]
+
+
+def output_root(site=None):
+    """Каталог для Markdown-файлов сайта (DPO_OUTPUT_ROOT имеет приоритет над профилем)."""
+    if site is None and os.environ.get("DPO_OUTPUT_ROOT"):
+        return Path(os.environ["DPO_OUTPUT_ROOT"])
+    return Path(get_profile(site)["output_root"])
+
+
+def records_dir(site=None):
+    """Каталог хранилища записей сайта."""
+    return output_root(site) / "records"
+
+
+def page_overrides(script, site=None):
+    """Переопределения профиля для страницы скрипта."""
+    return get_profile(site).get("pages", {}).get(Path(script).stem, {})
+
+
+def page_enabled(script, site=None):
+    """Нужно ли запускать страницу для сайта."""
+    return page_overrides(script, site).get("enabled", True)
+
+
+def base_url(site=None):
+    """Базовый адрес сайта (DPO_BASE_URL имеет приоритет над профилем, например для локальной копии страниц)."""
+    if site is None and os.environ.get("DPO_BASE_URL"):
+        return os.environ["DPO_BASE_URL"]
+    return get_profile(site)["base_url"]
+
+
+def site_url(url, script=None, site=None):
+    """Переносит адрес страницы с эталонного сайта на сайт профиля."""
+    if script is not None and page_overrides(script, site).get("url"):
+        return page_overrides(script, site)["url"]
+    base = base_url(site).rstrip("/")
+    if url.startswith(REFERENCE_BASE_URL):
+        return base + url[len(REFERENCE_BASE_URL):]
+    return url
+
+
+def site_host(site=None):
+    """Имя хоста сайта профиля."""
+    return urlsplit(base_url(site)).hostname
+
+
+def apply_page_overrides(script, metadata, site=None):
+    """Подменяет categories/tags в метаданных значениями из профиля."""
+    overrides = page_overrides(script, site)
+    for key in ("categories", "tags"):
+        if key in overrides and metadata:
+            metadata[key] = list(overrides[key])
+    return metadata
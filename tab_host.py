@@ -0,0 +1,178 @@
+# Режим вкладок: оркестратор держит несколько общих браузеров, а скрипты страниц открывают в них свои вкладки
+# (cdp_driver.open_tab) вместо запуска собственного Chrome. Вкладка стоит заметно меньше памяти, чем браузер
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.request import urlopen
+
+import browser_monitor
+import browser_profile
+from lazy_selenium import webdriver, Options, Service, ChromeDriverManager
+
+# Вкладок в одном браузере по умолчанию (ключ tabs_per_browser профиля сайта, 1 — режим выключен)
+TABS_PER_BROWSER = 1
+# После стольких страниц браузер перезапускается, как только в нём не останется открытых вкладок:
+# память, которую Chrome накапливает за долгую работу, возвращается системе
+RECYCLE_AFTER = 40
+# Проверка, что браузер ещё отвечает, секунд
+HEALTH_TIMEOUT = 5
+
+# Настройки общего браузера: как у скриптов, плюс без замедления фоновых вкладок
+CHROME_ARGUMENTS = (
+    "--headless",
+    "--disable-gpu",
+    "--no-sandbox",
+    "--window-size=1920,1080",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+)
+
+
+class BrowserHost:
+    """Один общий Chrome: адрес DevTools для вкладок скриптов и учёт занятых вкладок."""
+
+    def __init__(self, site, number):
+        self.name = f"Общий браузер {number}"
+        self.active = 0
+        self.served = 0
+        self.retiring = False
+        chrome_options = Options()
+        for argument in CHROME_ARGUMENTS:
+            chrome_options.add_argument(argument)
+        # Профиль принадлежит браузеру, а не потоку, который его запустил
+        browser_profile.apply_browser_profile(chrome_options, site, key=self)
+        try:
+            self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        except Exception:
+            browser_profile.release_profile(self)
+            raise
+        self.address = self.driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        self.monitor = browser_monitor.ProcessMonitor(self.driver.service.process.pid)
+        logging.info(f"{self.name} запущен: {self.address}")
+
+    def alive(self):
+        """Отвечает ли браузер по DevTools."""
+        try:
+            with urlopen(f"http://{self.address}/json/version", timeout=HEALTH_TIMEOUT):
+                return True
+        except Exception:
+            return False
+
+    def close(self):
+        """Закрывает браузер. Возвращает сводку ресурсов за время его работы (None без psutil)."""
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logging.warning(f"{self.name}: ошибка при закрытии: {e}")
+        finally:
+            browser_profile.release_profile(self)
+        usage = self.monitor.stop()
+        logging.info(f"{self.name} закрыт, обслужено страниц: {self.served}")
+        return usage
+
+
+class TabPool:
+    """Вкладки общих браузеров сайта: до browsers браузеров по tabs вкладок.
+
+    Новая страница попадает в самый загруженный браузер со свободной вкладкой: страницы плотнее
+    упаковываются в уже запущенные браузеры, а новый Chrome запускается, только когда заняты все вкладки.
+    Каждый запуск браузера занимает место в slots — общем пуле браузеров оркестратора.
+    """
+
+    def __init__(self, site, browsers, tabs, slots):
+        self.site = site
+        self.browsers = browsers
+        self.tabs = tabs
+        self.slots = slots
+        self.usage = {}
+        self._hosts = []
+        self._starting = 0
+        self._started = 0
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self):
+        return self.browsers * self.tabs
+
+    @contextmanager
+    def lease(self):
+        """Занимает вкладку на время работы скрипта; возвращает адрес DevTools браузера.
+
+        Если общий браузер не запустился, возвращает None: скрипт запускает свой Chrome в общем пуле браузеров.
+        """
+        host = self._acquire()
+        if host is None:
+            with self.slots:
+                yield None
+            return
+        try:
+            yield host.address
+        finally:
+            self._release(host)
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                free = [host for host in self._hosts if not host.retiring and host.active < self.tabs]
+                if free:
+                    host = max(free, key=lambda item: item.active)
+                    host.active += 1
+                    return host
+                if len(self._hosts) + self._starting < self.browsers:
+                    self._starting += 1
+                    self._started += 1
+                    number = self._started
+                    break
+                self._cond.wait()
+        # Браузер запускается вне блокировки: остальные потоки тем временем получают вкладки в готовых браузерах
+        try:
+            self.slots.acquire()
+            try:
+                host = BrowserHost(self.site, number)
+            except Exception:
+                self.slots.release()
+                raise
+        except Exception as e:
+            logging.error(f"[{self.site}] Не удалось запустить общий браузер: {e}")
+            with self._cond:
+                self._starting -= 1
+                self._cond.notify_all()
+            return None
+        with self._cond:
+            self._starting -= 1
+            host.active = 1
+            self._hosts.append(host)
+            self._cond.notify_all()
+        return host
+
+    def _release(self, host):
+        healthy = host.alive()
+        with self._cond:
+            host.active -= 1
+            host.served += 1
+            if not healthy:
+                logging.warning(f"[{self.site}] {host.name} не отвечает и будет перезапущен")
+            if not healthy or host.served >= RECYCLE_AFTER:
+                host.retiring = True
+            close = host.retiring and host.active == 0
+            if close:
+                self._hosts.remove(host)
+            self._cond.notify_all()
+        if close:
+            self._close(host)
+
+    def _close(self, host):
+        try:
+            usage = host.close()
+            if usage is not None:
+                self.usage[host.name] = usage
+        finally:
+            self.slots.release()
+
+    def close(self):
+        """Закрывает все браузеры пула."""
+        with self._cond:
+            hosts, self._hosts = self._hosts, []
+        for host in hosts:
+            self._close(host)
@@ -0,0 +1,78 @@
+# dump_front_matter должен давать побайтно тот же текст, что yaml.dump с теми же параметрами
+import pytest
+
+yaml = pytest.importorskip("yaml")
+
+import frontmatter  # noqa: E402
+
+STRINGS = [
+    # Обычный текст и кавычки
+    "Академия ДПО",
+    "Курсы повышения квалификации",
+    "",
+    "it's",
+    "'в кавычках'",
+    '"в двойных"',
+    "ключ: значение",
+    "текст #комментарий",
+    "заканчивается двоеточием:",
+    " пробел в начале",
+    "пробел в конце ",
+    # Зарезервированные слова и значения других типов
+    "yes", "no", "Yes", "NO", "on", "off", "true", "False", "null", "Null", "~", "y", "n",
+    # Индикаторы в начале строки
+    "- пункт", "-пункт", "-", ": значение", ":значение", ":", "#хэштег", "&якорь", "*ссылка", "!тег",
+    "? вопрос", "?вопрос", "|блок", ">свёрнутый", "%процент", "@автор", "`код`", "[список]", "{словарь}",
+    ",запятая", "---", "--- документ", "...", "... конец",
+    # Строки, похожие на числа и даты
+    "123", "-5", "0.5", "1e3", ".inf", "-.Inf", ".nan", "0x1F", "0o17", "1_000", "12:30", "2024-01-15",
+    "2024-01-15 10:00:00", "+7 (495) 123-45-67",
+    # Длинные строки
+    "слово " * 30,
+    "https://academydpo.org/" + "a" * 120,
+    "Очень длинная строка без пробелов" * 5,
+    # Управляющие символы и переводы строк
+    "строка\nперенос",
+    "табуляция\tвнутри",
+    "звонок\x07",
+    "возврат\rкаретки",
+    "\x00ноль",
+    "удаление\x7f",
+    "неразрывный\xa0пробел",
+    "разделитель\u2028строк",
+    "\ufeffBOM",
+    # Символы вне BMP
+    "эмодзи 🎓",
+    "\U0001D518\U0001D52B\U0001D526",
+    "😀",
+]
+
+METADATA = [
+    {"title": value, "description": value, "keywords": [value, "ДПО"]} for value in STRINGS
+] + [
+    {"title": "Главная", "url": "https://academydpo.org/", "keywords": []},
+    {"title": "Документы", "keywords": STRINGS},
+    {"title": "Числа", "count": 3, "ratio": 0.5, "flag": True, "empty": None},
+    {"title": "Вложенный", "og": {"title": "yes", "image": "https://academydpo.org/logo.png"}},
+    {"yes": "ключ-слово", "123": "ключ-число", "ключ: с двоеточием": "значение"},
+    {},
+]
+
+WIDTHS = [None, float("inf")]
+
+
+def _ids(value):
+    return repr(value)[:40]
+
+
+@pytest.mark.parametrize("width", WIDTHS, ids=["width=None", "width=inf"])
+@pytest.mark.parametrize("metadata", METADATA, ids=_ids)
+def test_identical_to_yaml_dump(metadata, width):
+    kwargs = {} if width is None else {"width": width}
+    expected = yaml.dump(metadata, allow_unicode=True, sort_keys=False, **kwargs)
+    assert frontmatter.dump_front_matter(metadata, width=width).encode("utf-8") == expected.encode("utf-8")
+
+
+@pytest.mark.parametrize("value", STRINGS, ids=_ids)
+def test_scalar_reads_back(value):
+    assert yaml.safe_load(frontmatter.dump_front_matter({"title": value})) == {"title": value}
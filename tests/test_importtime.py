@@ -0,0 +1,11 @@
+# Скрипты страниц и точки входа импортируются без тяжёлых зависимостей (importtime_check.py)
+import pytest
+
+import importtime_check
+
+
+@pytest.mark.parametrize("module", importtime_check.default_modules())
+def test_no_heavy_imports(module):
+    _, imported, error = importtime_check.measure(module)
+    assert error is None
+    assert importtime_check.heavy_imports(imported) == []
@@ -0,0 +1,46 @@
+# Публикация запуска: новые файлы переносятся из каталога подготовки, неизменившаяся страница остаётся
+# только по отметке скрипта, остальные страницы попадают в пропущенные
+import pytest
+
+import change_detection
+import publish
+import records
+
+
+@pytest.fixture
+def site_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(publish.site_profiles, "output_root", lambda site=None: tmp_path)
+    return tmp_path
+
+
+def test_publish_statuses(site_root):
+    staging = publish.staging_dir("academydpo", "run")
+    staging.mkdir(parents=True)
+    (staging / "new.md").write_text("новый", encoding="utf-8")
+    for name in ("same.md", "silent.md"):
+        (site_root / name).write_text("прежний", encoding="utf-8")
+    publish.unchanged_marker(staging, "same.md").touch()
+    pages = [(name, {"succeeded": True}) for name in ("new.md", "same.md", "silent.md")]
+
+    manifest = publish.publish("academydpo", "run", pages)
+
+    assert {entry["file"]: entry["status"] for entry in manifest["pages"]} == {"new.md": "updated",
+                                                                             "same.md": "unchanged"}
+    assert manifest["missing"] == ["silent.md"]
+    assert (site_root / "new.md").read_text(encoding="utf-8") == "новый"
+    assert not staging.exists()
+
+
+def test_store_page_marks_unchanged(tmp_path, monkeypatch):
+    staging = tmp_path / "staging"
+    output = tmp_path / "DPO_FAQ.md"
+    monkeypatch.setenv("DPO_RECORDS_DIR", str(tmp_path / "records"))
+    monkeypatch.setenv(publish.ENV_STAGING, str(staging))
+    data = [("title", "Вопросы")]
+
+    assert change_detection.store_page("DPO_FAQ.py", data, "https://academydpo.org/faq", {}, output)
+    assert not publish.unchanged_marker(staging, output.name).exists()
+    output.write_text("прежний", encoding="utf-8")
+    assert not change_detection.store_page("DPO_FAQ.py", data, "https://academydpo.org/faq", {}, output)
+    assert publish.unchanged_marker(staging, output.name).exists()
+    assert records.load_record("DPO_FAQ.py") is not None
@@ -0,0 +1,24 @@
+# Регрессионная проверка парсеров на сохранённых страницах (regression_check.py): запись совпадает с эталоном,
+# время и число команд драйвера укладываются в бюджет страницы
+import pytest
+
+import regression_check
+
+SCRIPTS = regression_check.fixture_scripts()
+
+# Скрипты страниц запускаются по-настоящему, в браузере
+MISSING = regression_check.missing_browser()
+pytestmark = pytest.mark.skipif(MISSING is not None, reason=f"нужен браузер: {MISSING}")
+
+
+def test_fixtures_present():
+    assert SCRIPTS, (f"нет фикстур в {regression_check.FIXTURES_DIR}: "
+                     "python regression_check.py --capture, затем --update")
+
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_page_matches_golden_and_budget(script):
+    result = regression_check.check_page(script)
+    assert result is not None
+    seconds, commands, problems = result
+    assert problems == [], f"{script}: {seconds:.1f} с, {commands} ком."
@@ -0,0 +1,121 @@
+# Общая очередь распределённого запуска: аренда, её истечение и повтор заданий, ожидание оркестратора
+import pytest
+
+import main
+import retry
+import work_queue
+
+
+class Clock:
+    """Управляемое время для аренды и задержек очереди."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue, "time", clock)
+    monkeypatch.setattr(retry, "backoff_delay", lambda attempt, base, cap: 5.0)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = work_queue.WorkQueue(tmp_path / "queue.sqlite")
+    queue.enqueue("run", "academydpo", ["DPO_FAQ.py", "DPO_kontakty.py"], {"DPO_kontakty.py": -10})
+    return queue
+
+
+def statuses(queue):
+    return {job["script"]: (job["status"], job["attempt"]) for job in queue.jobs("run")}
+
+
+def test_claim_by_priority_once(queue):
+    first = queue.claim("a")
+    second = queue.claim("b")
+    assert (first["script"], second["script"]) == ("DPO_kontakty.py", "DPO_FAQ.py")
+    assert queue.claim("c") is None
+    assert statuses(queue) == {"DPO_FAQ.py": ("leased", 1), "DPO_kontakty.py": ("leased", 1)}
+
+
+def test_heartbeat_keeps_lease(queue, clock):
+    job = queue.claim("a", lease=60)
+    clock.now += 50
+    assert queue.heartbeat(job["id"], "a", lease=60)
+    clock.now += 50
+    assert queue.claim("b")["script"] == "DPO_FAQ.py"
+    assert queue.claim("b") is None
+
+
+def test_expired_lease_moves_to_another_worker(queue, clock):
+    lost = queue.claim("a", lease=60)
+    queue.claim("a", lease=60)
+    clock.now += 61
+    taken = queue.claim("b", lease=60)
+    assert (taken["id"], taken["attempt"], taken["worker"]) == (lost["id"], 2, "b")
+    # Исполнитель, потерявший аренду, не продлевает её и не записывает результат
+    assert not queue.heartbeat(lost["id"], "a")
+    assert not queue.complete(lost, {"succeeded": True})
+    assert queue.complete(taken, {"succeeded": True})
+    assert statuses(queue)["DPO_kontakty.py"] == ("done", 2)
+
+
+def test_expired_lease_exhausts_attempts(queue, clock):
+    for _ in range(retry.MAX_ATTEMPTS):
+        queue.claim("a", lease=60)
+        queue.claim("a", lease=60)
+        clock.now += 61
+    assert queue.claim("b") is None
+    jobs = queue.jobs("run")
+    assert [job["status"] for job in jobs] == ["done", "done"]
+    assert all(job["result"] == {"succeeded": False, "retryable": True, "lost": "a"} for job in jobs)
+
+
+def test_retryable_failure_is_requeued_with_delay(queue, clock):
+    job = queue.claim("a")
+    assert queue.complete(job, {"succeeded": False, "retryable": True})
+    assert statuses(queue)["DPO_kontakty.py"] == ("pending", 2)
+    assert queue.claim("a")["script"] == "DPO_FAQ.py"
+    assert queue.claim("a") is None
+    clock.now += 5
+    again = queue.claim("a")
+    assert (again["script"], again["attempt"]) == ("DPO_kontakty.py", 2)
+
+
+def test_last_attempt_failure_is_final(queue, clock):
+    for attempt in range(1, retry.MAX_ATTEMPTS + 1):
+        job = queue.claim("a")
+        assert (job["script"], job["attempt"]) == ("DPO_kontakty.py", attempt)
+        queue.complete(job, {"succeeded": False, "retryable": True})
+        clock.now += 5
+    assert statuses(queue)["DPO_kontakty.py"] == ("done", retry.MAX_ATTEMPTS)
+
+
+def test_postpone_keeps_attempt(queue, clock):
+    job = queue.claim("a")
+    queue.postpone(job, 30)
+    assert statuses(queue)["DPO_kontakty.py"] == ("pending", 1)
+    clock.now += 30
+    assert queue.claim("a")["attempt"] == 1
+
+
+def test_cancel_finishes_open_jobs(queue):
+    queue.complete(queue.claim("a"), {"succeeded": True})
+    queue.cancel("run")
+    results = {job["script"]: job["result"] for job in queue.jobs("run")}
+    assert results["DPO_kontakty.py"] == {"succeeded": True}
+    assert results["DPO_FAQ.py"]["cancelled"]
+
+
+def test_orchestrator_stops_without_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(work_queue, "POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(work_queue, "IDLE_TIMEOUT", 0.05)
+    path = tmp_path / "queue.sqlite"
+    outcomes = main.run_distributed("academydpo", ["DPO_FAQ.py"], {}, path, {}, "run")
+    assert outcomes["DPO_FAQ.py"][0] is False
+    assert work_queue.WorkQueue(path).jobs("run")[0]["result"]["cancelled"]
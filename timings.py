@@ -0,0 +1,87 @@
+# Адаптивные таймауты страниц по истории длительностей прошлых запусков
+import json
+import math
+import os
+import time
+from pathlib import Path
+
+# Сколько последних длительностей хранить для каждой страницы
+HISTORY_SIZE = 50
+# Минимум замеров, после которого таймаут считается по истории
+MIN_SAMPLES = 5
+# Дедлайн страницы = перцентиль длительностей × коэффициент, в пределах [MIN_DEADLINE, MAX_DEADLINE]
+PERCENTILE = 99
+DEADLINE_FACTOR = 3.0
+MIN_DEADLINE = 30
+MAX_DEADLINE = 300
+# Ожидания внутри скрипта не короче этого значения, даже если дедлайн почти исчерпан
+MIN_WAIT = 1
+
+HISTORY_NAME = "_timings.json"
+
+# Момент запуска процесса скрипта: от него отсчитывается дедлайн DPO_PAGE_DEADLINE
+_STARTED = time.monotonic()
+
+
+def history_path(directory):
+    """Путь к файлу истории длительностей в каталоге записей сайта."""
+    return Path(directory) / HISTORY_NAME
+
+
+def load_history(path):
+    """Загружает историю {страница: [секунды, ...]} (пустую, если файла нет)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_history(history, path):
+    """Сохраняет историю длительностей."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def record_duration(history, page, seconds):
+    """Добавляет длительность успешного запуска страницы в скользящее окно."""
+    samples = history.setdefault(Path(page).stem, [])
+    samples.append(round(seconds, 3))
+    del samples[:-HISTORY_SIZE]
+
+
+def percentile(samples, pct):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def expected_duration(history, page):
+    """Ожидаемая длительность страницы (медиана истории) или None, если замеров нет."""
+    samples = history.get(Path(page).stem, [])
+    if not samples:
+        return None
+    return percentile(samples, 50)
+
+
+def page_deadline(history, page):
+    """Дедлайн страницы в секундах; без достаточной истории — MAX_DEADLINE."""
+    samples = history.get(Path(page).stem, [])
+    if len(samples) < MIN_SAMPLES:
+        return MAX_DEADLINE
+    deadline = percentile(samples, PERCENTILE) * DEADLINE_FACTOR
+    return int(min(MAX_DEADLINE, max(MIN_DEADLINE, math.ceil(deadline))))
+
+
+def wait_timeout(default):
+    """Таймаут ожидания внутри скрипта: не дольше default и не дольше остатка дедлайна страницы."""
+    deadline = os.environ.get("DPO_PAGE_DEADLINE")
+    if not deadline:
+        return default
+    remaining = float(deadline) - (time.monotonic() - _STARTED)
+    return max(MIN_WAIT, min(default, remaining))
@@ -0,0 +1,177 @@
+# Общая очередь страниц для распределённого запуска: SQLite-файл на общем хранилище, без отдельного брокера
+import json
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+
+import retry
+
+# Аренда задания: исполнитель продлевает её каждые HEARTBEAT_INTERVAL секунд.
+# Задание, аренда которого истекла (исполнитель умер или потерял связь), забирает другой исполнитель
+LEASE_SECONDS = 60
+HEARTBEAT_INTERVAL = 20
+# Ожидание блокировки базы другими исполнителями, секунд
+BUSY_TIMEOUT = 30
+# Как часто оркестратор и свободные исполнители опрашивают очередь
+POLL_INTERVAL = 2.0
+# Оркестратор перестаёт ждать, если столько секунд ни одно задание запуска не арендовано живым исполнителем
+# и ни одно не завершилось (исполнителей нет или все пропали); дольше задержки повтора и срока аренды
+IDLE_TIMEOUT = retry.QUEUE_MAX_DELAY + 2 * LEASE_SECONDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    site TEXT NOT NULL,
+    script TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    attempt INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'pending',
+    ready_at REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    started_at REAL,
+    lease_until REAL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs (run_id);
+"""
+
+
+def worker_id():
+    """Имя исполнителя: хост и номер процесса."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Очередь заданий «сайт + скрипт» с арендой.
+
+    Статусы: pending — ждёт исполнителя, leased — выполняется, done — результат записан.
+    Все изменения идут в транзакциях BEGIN IMMEDIATE, поэтому одно задание не достанется двум исполнителям.
+    Журнал базы — обычный (не WAL): WAL не работает на сетевых дисках.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return _Transaction(db)
+
+    def enqueue(self, run_id, site, scripts, priorities=None):
+        """Ставит страницы сайта в очередь запуска run_id."""
+        priorities = priorities or {}
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO jobs (run_id, site, script, priority) VALUES (?, ?, ?, ?)",
+                [(run_id, site, script, priorities.get(script, 0)) for script in scripts],
+            )
+
+    def claim(self, worker, lease=None):
+        """Забирает следующее готовое задание (или задание с истёкшей арендой). None, если брать нечего.
+
+        Забранное после чужой истёкшей аренды задание тратит попытку; исчерпавшее попытки считается неудачным.
+        """
+        now = time.time()
+        lease = lease or LEASE_SECONDS
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE (status = 'pending' AND ready_at <= ?) "
+                "OR (status = 'leased' AND lease_until < ?) ORDER BY priority, id",
+                (now, now),
+            ).fetchall()
+            for row in rows:
+                attempt = row["attempt"] + (1 if row["status"] == "leased" else 0)
+                if attempt > retry.MAX_ATTEMPTS:
+                    db.execute("UPDATE jobs SET status = 'done', result = ? WHERE id = ?",
+                               (json.dumps({"succeeded": False, "retryable": True, "lost": row["worker"]}), row["id"]))
+                    continue
+                db.execute(
+                    "UPDATE jobs SET status = 'leased', attempt = ?, worker = ?, started_at = ?, lease_until = ? "
+                    "WHERE id = ?",
+                    (attempt, worker, now, now + lease, row["id"]),
+                )
+                job = dict(row)
+                job.update(attempt=attempt, worker=worker)
+                return job
+        return None
+
+    def heartbeat(self, job_id, worker, lease=None):
+        """Продлевает аренду. False, если задание уже отдано другому исполнителю."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + (lease or LEASE_SECONDS), job_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job, result):
+        """Записывает результат задания; повторяемую неудачу возвращает в очередь с экспоненциальной задержкой.
+
+        Результат исполнителя, потерявшего аренду, отбрасывается. Возвращает True, если результат принят.
+        """
+        with self._connect() as db:
+            if result.get("retryable") and job["attempt"] < retry.MAX_ATTEMPTS:
+                delay = retry.backoff_delay(job["attempt"], retry.QUEUE_BASE_DELAY, retry.QUEUE_MAX_DELAY)
+                cursor = db.execute(
+                    "UPDATE jobs SET status = 'pending', attempt = attempt + 1, ready_at = ?, worker = NULL, "
+                    "lease_until = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (time.time() + delay, job["id"], job["worker"]),
+                )
+            else:
+                cursor = db.execute(
+                    "UPDATE jobs SET status = 'done', lease_until = NULL, result = ? "
+                    "WHERE id = ? AND worker = ? AND status = 'leased'",
+                    (json.dumps(result, ensure_ascii=False), job["id"], job["worker"]),
+                )
+            return cursor.rowcount == 1
+
+    def postpone(self, job, delay):
+        """Возвращает задание в очередь на delay секунд, не тратя попытку (например, пока хост отключён)."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'pending', ready_at = ?, worker = NULL, lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + delay, job["id"], job["worker"]),
+            )
+
+    def cancel(self, run_id):
+        """Снимает невыполненные задания запуска (оркестратор завершился, не дождавшись их)."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'done', result = ? WHERE run_id = ? AND status != 'done'",
+                       (json.dumps({"succeeded": False, "retryable": False, "cancelled": True}), run_id))
+
+    def jobs(self, run_id):
+        """Задания запуска: список словарей с разобранным результатом."""
+        with self._connect() as db:
+            rows = [dict(row) for row in db.execute("SELECT * FROM jobs WHERE run_id = ? ORDER BY id", (run_id,))]
+        for row in rows:
+            row["result"] = json.loads(row["result"]) if row["result"] else None
+        return rows
+
+
+class _Transaction:
+    """Соединение как контекстный менеджер: BEGIN IMMEDIATE на входе, COMMIT/ROLLBACK и закрытие на выходе."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.db.close()
+        return False
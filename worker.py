@@ -0,0 +1,132 @@
+# Исполнитель распределённого запуска: берёт страницы из общей очереди и запускает их скрипты.
+# Запуск на каждой машине: python worker.py --queue <файл очереди на общем хранилище>
+# Каталоги результатов сайтов (output_root профиля) тоже должны быть на общем хранилище
+import argparse
+import logging
+import threading
+import time
+from pathlib import Path
+
+import browser_monitor
+import main
+import profiling
+import publish
+import site_profiles
+import timings
+import work_queue
+
+# Истории длительностей сайтов (только для дедлайнов; сохраняет их оркестратор)
+_HISTORIES = {}
+_HISTORIES_LOCK = threading.Lock()
+
+
+def site_history(site):
+    """История длительностей сайта, загруженная один раз на процесс."""
+    with _HISTORIES_LOCK:
+        if site not in _HISTORIES:
+            _HISTORIES[site] = timings.load_history(timings.history_path(site_profiles.records_dir(site)))
+        return _HISTORIES[site]
+
+
+def run_job(queue, job, python_exe, available_scripts, profile=False):
+    """Выполняет одно задание, продлевая аренду, пока работает скрипт, и записывает результат в очередь."""
+    site, script = job["site"], job["script"]
+    breaker = main.host_breaker(site_profiles.site_host(site))
+    pause = breaker.remaining()
+    if pause > 0:
+        queue.postpone(job, pause)
+        return
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(work_queue.HEARTBEAT_INTERVAL):
+            if not queue.heartbeat(job["id"], job["worker"]):
+                logging.warning(f"[{site}] Аренда {script} потеряна: задание передано другому исполнителю")
+                return
+
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+    history = site_history(site)
+    try:
+        succeeded, missing_md, retryable = main.run_script(site, script, python_exe, available_scripts, history,
+                                                            staging=publish.staging_dir(site, job["run_id"]),
+                                                            profile_dir=profiling.profile_dir(site, job["run_id"])
+                                                            if profile else None)
+    finally:
+        stop.set()
+        beat.join()
+
+    if missing_md is None:
+        breaker.record_success()
+    elif retryable:
+        breaker.record_failure()
+    with main.RESOURCE_LOCK:
+        usage = main.RESOURCE_USAGE.get(site, {}).pop(script, None)
+        commands = main.COMMAND_STATS.get(site, {}).pop(script, None)
+        counters = main.PAGE_COUNTERS.get(site, {}).pop(script, None)
+    with main.HISTORY_LOCK:
+        seconds = history.get(Path(script).stem, [None])[-1] if succeeded else None
+    result = {
+        "succeeded": succeeded,
+        "missing_md": str(missing_md) if missing_md is not None else None,
+        "retryable": retryable,
+        "seconds": seconds,
+        "usage": usage,
+        "commands": commands,
+        "counters": counters,
+        "worker": job["worker"],
+    }
+    if not queue.complete(job, result):
+        logging.warning(f"[{site}] Результат {script} отброшен: задание уже выполняет другой исполнитель")
+
+
+def serve(queue_path, threads, profile=False):
+    """Цикл исполнителя: threads потоков забирают задания, пока процесс не остановят."""
+    queue = work_queue.WorkQueue(queue_path)
+    python_exe = main.find_python()
+    if python_exe is None:
+        return 1
+    available_scripts = main.find_scripts()
+    name = work_queue.worker_id()
+    logging.info(f"Исполнитель {name} ({threads} потоков) подключён к очереди {queue_path}")
+
+    def loop(number):
+        worker = f"{name}/{number}"
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                time.sleep(work_queue.POLL_INTERVAL)
+                continue
+            logging.info(f"[{job['site']}] {worker}: {job['script']} (попытка {job['attempt']})")
+            try:
+                run_job(queue, job, python_exe, available_scripts, profile)
+            except Exception as e:
+                logging.error(f"[{job['site']}] Исключение при обработке {job['script']}: {e}")
+                queue.complete(job, {"succeeded": False, "retryable": True, "worker": worker})
+
+    workers = [threading.Thread(target=loop, args=(n,), daemon=True) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            thread.join()
+    finally:
+        browser_monitor.kill_all()
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Исполнитель страниц из общей очереди распределённого запуска")
+    parser.add_argument("--queue", type=Path, required=True, help="файл общей очереди (SQLite)")
+    parser.add_argument("--threads", type=int, default=site_profiles.MAX_BROWSERS,
+                        help="сколько страниц выполнять одновременно")
+    parser.add_argument("--profile", action="store_true",
+                        help="профилировать страницы (профили — в каталоге профилей запуска сайта)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main.setup_logging()
+    args = parse_args()
+    raise SystemExit(serve(args.queue, args.threads, args.profile))